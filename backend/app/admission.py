@@ -0,0 +1,184 @@
+"""
+Bounded executors for the heavy order routes.
+
+Sync FastAPI endpoints all share Starlette's threadpool, so a burst of
+packet streams or deletes could leave /quote/preview and /health waiting
+for a thread. Endpoints decorated with @limited("<route class>") run on
+that class's own small thread pool instead, and streamed response bodies
+created with limited_stream() are produced there too.
+
+Each class admits at most `workers` running plus `max_waiting` queued
+requests (a streamed body counts until it's finished). Beyond that the
+request is turned away at once with 503 and a Retry-After header, rather
+than queueing without limit. Limits are per process and configured in
+ROUTE_LIMITS.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+
+from .metrics import ADMISSION_REJECTED
+from .profiling import hand_off_to_thread, run_profiled
+
+
+@dataclass
+class RouteLimit:
+    workers: int
+    max_waiting: int
+    retry_after_s: int
+
+
+ROUTE_LIMITS: Dict[str, RouteLimit] = {
+    # POST /checkout/start: CSV/JSON/GeoJSON writes
+    "checkout": RouteLimit(workers=4, max_waiting=16, retry_after_s=2),
+    # DELETE /orders/{quote_id}: rmtree + index updates
+    "delete": RouteLimit(workers=2, max_waiting=8, retry_after_s=2),
+    # GET /orders/{quote_id}/onboarding/stream: zip built while streaming
+    "packet": RouteLimit(workers=2, max_waiting=4, retry_after_s=5),
+    # Order detail, file downloads, per-field GeoJSON
+    "files": RouteLimit(workers=4, max_waiting=32, retry_after_s=1),
+    # /exports/*: every order in one response
+    "bulk_export": RouteLimit(workers=2, max_waiting=2, retry_after_s=10),
+    # /orders/bulk/*: status updates / deletes of up to BULK_MAX_ORDERS orders
+    "bulk_orders": RouteLimit(workers=1, max_waiting=2, retry_after_s=10),
+}
+
+
+class Slot:
+    """
+    One admitted request. Released when the endpoint returns, unless a
+    streamed body took it over.
+    """
+
+    def __init__(self, executor: "RouteExecutor"):
+        self.executor = executor
+        self.streaming = False
+        self._released = False
+
+    def release(self) -> None:
+        self.executor.release(self)
+
+
+CURRENT_SLOT: contextvars.ContextVar[Optional[Slot]] = contextvars.ContextVar("admission_slot", default=None)
+
+
+class RouteExecutor:
+    def __init__(self, route_class: str, limit: RouteLimit):
+        self.route_class = route_class
+        self.limit = limit
+        self.pool = ThreadPoolExecutor(max_workers=limit.workers, thread_name_prefix=f"route-{route_class}")
+        self._admitted = 0
+        self._lock = threading.Lock()
+
+    @property
+    def admitted(self) -> int:
+        return self._admitted
+
+    def admit(self) -> Slot:
+        with self._lock:
+            if self._admitted >= self.limit.workers + self.limit.max_waiting:
+                ADMISSION_REJECTED.inc(route_class=self.route_class)
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Server busy ({self.route_class}), retry shortly",
+                    headers={"Retry-After": str(self.limit.retry_after_s)},
+                )
+            self._admitted += 1
+        return Slot(self)
+
+    def release(self, slot: Slot) -> None:
+        with self._lock:
+            if not slot._released:
+                slot._released = True
+                self._admitted -= 1
+
+    async def run(self, slot: Slot, fn: Callable, *args, **kwargs) -> Any:
+        # Context carries the slot (for limited_stream) and any profiling capture
+        hand_off_to_thread()
+        ctx = contextvars.copy_context()
+        ctx.run(CURRENT_SLOT.set, slot)
+        call = functools.partial(ctx.run, run_profiled, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+
+
+_executors: Dict[str, RouteExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def route_executor(route_class: str) -> RouteExecutor:
+    with _executors_lock:
+        executor = _executors.get(route_class)
+        if executor is None:
+            executor = _executors[route_class] = RouteExecutor(route_class, ROUTE_LIMITS[route_class])
+        return executor
+
+
+def limited(route_class: str) -> Callable:
+    """
+    Run a sync endpoint on its route class's executor, answering 503 when
+    the class is saturated.
+    """
+    if route_class not in ROUTE_LIMITS:
+        raise KeyError(f"Unknown route class {route_class!r}")
+
+    def decorate(endpoint: Callable) -> Callable:
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            slot = route_executor(route_class).admit()
+            try:
+                return await slot.executor.run(slot, endpoint, *args, **kwargs)
+            except BaseException:
+                slot.release()
+                raise
+            finally:
+                if not slot.streaming:
+                    slot.release()
+
+        return wrapper
+
+    return decorate
+
+
+def limited_stream(body: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Produce a response body on the executor of the @limited endpoint that
+    created it, keeping that request's slot until the body is finished.
+    Outside a limited endpoint, chunks are produced on the event loop's
+    default executor.
+    """
+    slot = CURRENT_SLOT.get()
+    if slot is not None:
+        slot.streaming = True
+
+    async def iterate() -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        pool = slot.executor.pool if slot is not None else None
+        iterator = iter(body)
+        done = object()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(pool, next, iterator, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await loop.run_in_executor(pool, close)
+            if slot is not None:
+                slot.release()
+
+    stream = iterate()
+    if slot is not None:
+        # A body that's never iterated (client gone first) still frees its slot
+        weakref.finalize(stream, slot.release)
+    return stream
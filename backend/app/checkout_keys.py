@@ -0,0 +1,212 @@
+"""
+Idempotent checkout submission and collision-free quote IDs.
+
+Every POST /checkout/start claims a key before doing any work: the
+client's Idempotency-Key header, or without one a SHA-256 of the request
+body. The claim stores the quote ID allocated for the submission, and
+the response once the exports are written. A retry with the same key
+(a client that timed out, a double click) gets that stored response back
+instead of a second order; one arriving while the first is still being
+saved waits for it. Reusing a key for a different body is an error.
+
+Header keys are remembered for IDEMPOTENCY_KEY_TTL_S, body hashes for the
+shorter PAYLOAD_KEY_TTL_S (an identical order placed again later on
+purpose is a new order). At most MAX_KEYS keys are kept, oldest dropped
+first.
+
+Quote IDs end in a number from a sequence in the same SQLite file: the
+current time in milliseconds, or the previous number + 1 if that's not
+larger. Allocation happens inside a write transaction, so IDs are unique
+and increasing across all worker processes sharing the file.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+IDEMPOTENCY_KEY_TTL_S = 24 * 3600
+PAYLOAD_KEY_TTL_S = 10 * 60
+MAX_KEYS = 10000
+MAX_KEY_LENGTH = 255
+# A claim still pending after this long belonged to a request that died
+PENDING_TIMEOUT_S = 120.0
+WAIT_POLL_S = 0.1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkout_keys (
+    key          TEXT PRIMARY KEY,
+    payload_hash TEXT NOT NULL,
+    quote_id     TEXT NOT NULL,
+    response     TEXT,
+    created_at   REAL NOT NULL,
+    expires_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_checkout_keys_expires ON checkout_keys (expires_at);
+CREATE INDEX IF NOT EXISTS ix_checkout_keys_created ON checkout_keys (created_at);
+CREATE TABLE IF NOT EXISTS quote_sequence (
+    id   INTEGER PRIMARY KEY CHECK (id = 0),
+    last INTEGER NOT NULL
+);
+"""
+
+
+class KeyReused(Exception):
+    """
+    The key was already used for a submission with a different body.
+    """
+
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Claim:
+    key: str
+    quote_id: str
+    # The stored response of a finished submission; None while pending
+    response: Optional[Dict[str, Any]] = None
+    # True if this request owns the claim and must do the work
+    owner: bool = False
+
+
+class CheckoutKeys:
+    """
+    Thin wrapper around a SQLite file, a fresh connection per call (like
+    OrderIndex).
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=10.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def ensure(self) -> None:
+        if self._ready:
+            return
+        with self._init_lock:
+            if self._ready:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            self._ready = True
+
+    def _next_number(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT last FROM quote_sequence WHERE id = 0").fetchone()
+        number = int(time.time() * 1000)
+        if row is not None and number <= row["last"]:
+            number = row["last"] + 1
+        conn.execute("INSERT OR REPLACE INTO quote_sequence (id, last) VALUES (0, ?)", (number,))
+        return number
+
+    def claim(
+        self,
+        key: str,
+        body_hash: str,
+        ttl_s: float,
+        new_quote_id: Callable[[int], Optional[str]],
+    ) -> Claim:
+        """
+        Claim key for a submission with this body. Returns the existing
+        claim (finished or pending) if there is one; otherwise a new one
+        owned by the caller, with a quote ID made by new_quote_id from the
+        next sequence number (None from it means that ID is taken; the
+        next number is tried). Raises KeyReused if the key was claimed for
+        a different body.
+        """
+        self.ensure()
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM checkout_keys WHERE expires_at < ?", (now,))
+                row = conn.execute("SELECT * FROM checkout_keys WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if row["payload_hash"] != body_hash:
+                        raise KeyReused(key)
+                    if row["response"] is not None:
+                        conn.execute("COMMIT")
+                        return Claim(key, row["quote_id"], json.loads(row["response"]))
+                    if now - row["created_at"] < PENDING_TIMEOUT_S:
+                        conn.execute("COMMIT")
+                        return Claim(key, row["quote_id"])
+                    # Abandoned: take it over under the same quote ID
+                    conn.execute("UPDATE checkout_keys SET created_at = ? WHERE key = ?", (now, key))
+                    conn.execute("COMMIT")
+                    return Claim(key, row["quote_id"], owner=True)
+
+                quote_id = None
+                while quote_id is None:
+                    quote_id = new_quote_id(self._next_number(conn))
+                conn.execute(
+                    "INSERT INTO checkout_keys (key, payload_hash, quote_id, response, created_at, expires_at) "
+                    "VALUES (?, ?, ?, NULL, ?, ?)",
+                    (key, body_hash, quote_id, now, now + ttl_s),
+                )
+                self._trim(conn)
+                conn.execute("COMMIT")
+                return Claim(key, quote_id, owner=True)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM checkout_keys").fetchone()
+        if count > MAX_KEYS:
+            conn.execute(
+                "DELETE FROM checkout_keys WHERE key IN "
+                "(SELECT key FROM checkout_keys WHERE response IS NOT NULL ORDER BY created_at LIMIT ?)",
+                (count - MAX_KEYS,),
+            )
+
+    def complete(self, claim: Claim, response: Dict[str, Any]) -> None:
+        self.ensure()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE checkout_keys SET response = ? WHERE key = ? AND quote_id = ?",
+                (json.dumps(response), claim.key, claim.quote_id),
+            )
+
+    def release(self, claim: Claim) -> None:
+        """
+        Drop a claim whose submission failed (or whose order was deleted
+        since), so the next attempt starts over.
+        """
+        self.ensure()
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM checkout_keys WHERE key = ? AND quote_id = ?", (claim.key, claim.quote_id))
+
+    def wait(self, claim: Claim, timeout_s: float) -> Optional[Claim]:
+        """
+        Wait for a pending claim to finish. Returns the finished claim, or
+        None if it's still pending after timeout_s or was released.
+        """
+        self.ensure()
+        deadline = time.monotonic() + timeout_s
+        while True:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT quote_id, response FROM checkout_keys WHERE key = ?", (claim.key,)
+                ).fetchone()
+            if row is None or row["quote_id"] != claim.quote_id:
+                return None
+            if row["response"] is not None:
+                return Claim(claim.key, row["quote_id"], json.loads(row["response"]))
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(WAIT_POLL_S)
@@ -0,0 +1,107 @@
+"""
+Staged, parallel export of an order folder.
+
+Writers run concurrently on a bounded thread pool, each writing its files
+into a hidden staging directory next to the final order folder. Only when
+every writer has succeeded is the staging directory renamed into place,
+so a crash or a failed writer never leaves a half-written order behind.
+
+Staging and retired directories start with "." so the order index and
+listing code skip them; leftovers from a crash can be removed safely.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from .metrics import time_stage
+
+EXPORT_WORKERS = 4
+
+STAGING_PREFIX = ".staging-"
+RETIRED_PREFIX = ".retired-"
+
+# (name, writer) — writer gets the staging directory and may return a value
+ExportWriter = Tuple[str, Callable[[Path], Any]]
+
+_pool = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+
+
+def is_internal_dir(path: Path) -> bool:
+    return path.name.startswith(".")
+
+
+def publish_directory(staging_dir: Path, final_dir: Path) -> None:
+    """
+    Move a fully written staging directory to final_dir. If final_dir
+    already exists it's renamed aside first and removed afterwards. Each
+    rename is atomic, so readers never see a mix of old and new files,
+    but the swap is two renames: between them final_dir does not exist
+    and a reader may briefly get "not found".
+    """
+    if not final_dir.exists():
+        os.rename(staging_dir, final_dir)
+        return
+
+    retired = final_dir.parent / f"{RETIRED_PREFIX}{final_dir.name}-{uuid.uuid4().hex[:8]}"
+    os.rename(final_dir, retired)
+    try:
+        os.rename(staging_dir, final_dir)
+    except OSError:
+        os.rename(retired, final_dir)
+        raise
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def run_export_pipeline(
+    final_dir: Path,
+    writers: List[ExportWriter],
+    carry_over: Tuple[str, ...] = (),
+    operation: str = "export",
+) -> Dict[str, Any]:
+    """
+    Run all writers in parallel into a fresh staging directory, then
+    publish it as final_dir. Files named in carry_over are copied from an
+    existing final_dir first (e.g. a status that must survive a re-save).
+
+    Returns {writer name: writer result}. If any writer fails, the staging
+    directory is removed and the first error is raised; final_dir is left
+    untouched. Each writer and the publish step are timed as stages of
+    `operation` (see app/metrics.py).
+    """
+    final_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging_dir = final_dir.parent / f"{STAGING_PREFIX}{final_dir.name}-{uuid.uuid4().hex[:8]}"
+    staging_dir.mkdir()
+
+    try:
+        for name in carry_over:
+            src = final_dir / name
+            if src.is_file():
+                shutil.copy2(src, staging_dir / name)
+
+        def timed(name: str, writer: Callable[[Path], Any]) -> Any:
+            with time_stage(operation, name):
+                return writer(staging_dir)
+
+        futures = [(name, _pool.submit(timed, name, writer)) for name, writer in writers]
+        results: Dict[str, Any] = {}
+        errors = []
+        for name, future in futures:
+            try:
+                results[name] = future.result()
+            except Exception as e:  # collect all, raise the first
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+        with time_stage(operation, "publish"):
+            publish_directory(staging_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    return results
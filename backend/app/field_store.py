@@ -0,0 +1,150 @@
+"""
+Single-file container for per-field GeoJSON.
+
+Instead of one small fields_geojson/<id>.geojson file per field, an order
+keeps two files:
+
+- fields_geojson.ndjson: append-only, one line per record, each line
+  being exactly what <id>.geojson used to contain (minified);
+- fields_geojson.idx.json: {field_id: [offset, length]} into it, plus
+  the container size it was written for.
+
+A field is read with one seek, and expanding the container back into
+individual files is a matter of slicing out the recorded byte ranges.
+Appending a field that already exists adds a new record and repoints the
+index, so the last write wins like overwriting a file did. If the index
+is missing or doesn't match the container size, it's rebuilt by scanning
+the container.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Write per-field GeoJSON into the container instead of fields_geojson/
+PER_FIELD_CONTAINER = True
+
+CONTAINER_FILENAME = "fields_geojson.ndjson"
+INDEX_FILENAME = "fields_geojson.idx.json"
+INDEX_VERSION = 1
+
+_append_lock = threading.Lock()
+
+
+def record_field_id(record: bytes) -> Optional[str]:
+    try:
+        features = json.loads(record).get("features") or []
+    except ValueError:
+        return None
+    if not features:
+        return None
+    field_id = (features[0].get("properties") or {}).get("field_id")
+    return str(field_id or "field")
+
+
+class FieldContainer:
+    def __init__(self, order_dir: Path):
+        self.order_dir = order_dir
+        self.path = order_dir / CONTAINER_FILENAME
+        self.index_path = order_dir / INDEX_FILENAME
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def files(self) -> List[Path]:
+        return [p for p in (self.path, self.index_path) if p.exists()]
+
+    # ---------------------------------------------------------------
+    # Writing
+    # ---------------------------------------------------------------
+
+    def write_all(self, records: List[Tuple[str, bytes]]) -> None:
+        """
+        Write a fresh container from (field_id, record) pairs. Records must
+        not contain newlines (minified JSON never does).
+        """
+        entries: Dict[str, List[int]] = {}
+        offset = 0
+        with self.path.open("wb") as f:
+            for field_id, record in records:
+                f.write(record + b"\n")
+                entries[str(field_id)] = [offset, len(record)]
+                offset += len(record) + 1
+        self._save_index(entries, offset)
+
+    def append(self, field_id: str, record: bytes) -> None:
+        with _append_lock:
+            entries = self.load_index()
+            with self.path.open("ab") as f:
+                offset = f.tell()
+                f.write(record + b"\n")
+                size = f.tell()
+            entries.pop(str(field_id), None)
+            entries[str(field_id)] = [offset, len(record)]
+            self._save_index(entries, size)
+
+    def _save_index(self, entries: Dict[str, List[int]], size: int) -> None:
+        tmp = self.index_path.with_name(f".{INDEX_FILENAME}.tmp")
+        tmp.write_text(
+            json.dumps({"version": INDEX_VERSION, "size": size, "entries": entries},
+                       separators=(",", ":")),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.index_path)
+
+    # ---------------------------------------------------------------
+    # Reading
+    # ---------------------------------------------------------------
+
+    def load_index(self) -> Dict[str, List[int]]:
+        """
+        {field_id: [offset, length]} in write order; rebuilt from the
+        container when the index file is missing or stale.
+        """
+        if not self.path.exists():
+            return {}
+        size = self.path.stat().st_size
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION and index.get("size") == size:
+                return index["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return self.reindex()
+
+    def reindex(self) -> Dict[str, List[int]]:
+        entries: Dict[str, List[int]] = {}
+        offset = 0
+        with self.path.open("rb") as f:
+            for line in f:
+                record = line.rstrip(b"\n")
+                field_id = record_field_id(record)
+                if field_id is not None:
+                    entries.pop(field_id, None)
+                    entries[field_id] = [offset, len(record)]
+                offset += len(line)
+        self._save_index(entries, offset)
+        return entries
+
+    def get(self, field_id: str) -> Optional[bytes]:
+        entry = self.load_index().get(str(field_id))
+        if entry is None:
+            return None
+        offset, length = entry
+        with self.path.open("rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def iter_records(self) -> Iterator[Tuple[str, bytes]]:
+        """
+        Current (field_id, record) pairs, one sequential pass over the file.
+        """
+        entries = sorted(self.load_index().items(), key=lambda item: item[1][0])
+        with self.path.open("rb") as f:
+            for field_id, (offset, length) in entries:
+                f.seek(offset)
+                yield field_id, f.read(length)
@@ -0,0 +1,561 @@
+"""
+Server-side field acreage from GeoJSON.
+
+Areas are exact on the WGS84 ellipsoid for rings whose edges are straight
+in Lambert's cylindrical equal-area projection. For field-sized polygons
+that is indistinguishable from geodesic edges. Polygons, MultiPolygons
+and holes are supported. Every ring of every field in a request is
+concatenated into one coordinate array and processed in a single
+vectorized pass.
+
+Geometries we can't measure (Points from Leaflet circles, lines,
+malformed coordinates) come back as NaN so the caller can fall back to
+the client's number.
+"""
+from __future__ import annotations
+
+import json
+from itertools import chain
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# WGS84
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_E = np.sqrt(WGS84_E2)
+
+SQ_METERS_PER_ACRE = 4046.8564224
+ACRES_DECIMALS = 2
+
+
+def unwrap_geometry(obj: Any) -> Optional[dict]:
+    """
+    Accept a Feature (as Leaflet exports it) or a bare geometry.
+    """
+    if not isinstance(obj, dict):
+        return None
+    if obj.get("type") == "Feature":
+        obj = obj.get("geometry")
+        if not isinstance(obj, dict):
+            return None
+    return obj
+
+
+def polygons_of(geom: dict) -> Optional[list]:
+    """
+    List of polygons (each a list of rings) or None if not areal.
+    """
+    gtype = geom.get("type")
+    coords = geom.get("coordinates")
+    if not isinstance(coords, list):
+        return None
+    if gtype == "Polygon":
+        return [coords]
+    if gtype == "MultiPolygon":
+        return coords
+    return None
+
+
+def ring_to_array(ring: Any) -> np.ndarray:
+    """
+    (n, 2) lon/lat array for one ring. Flattening through fromiter is about
+    twice as fast as np.asarray on nested lists; fall back when vertices
+    carry a third (altitude) value.
+    """
+    if not isinstance(ring, list):
+        raise ValueError("ring must be a list")
+    flat = np.fromiter(chain.from_iterable(ring), dtype=np.float64)
+    if flat.shape[0] == 2 * len(ring):
+        return flat.reshape(-1, 2)
+
+    arr = np.asarray(ring, dtype=np.float64)
+    if arr.ndim != 2 or arr.shape[1] < 2:
+        raise ValueError("bad ring")
+    return arr[:, :2]
+
+
+def authalic_y(lat_rad: np.ndarray) -> np.ndarray:
+    """
+    Northing of the ellipsoidal cylindrical equal-area projection
+    (a^2 / 2 * q(phi)), so that shoelace area over (lon_rad, y) is
+    area on the ellipsoid in square metres.
+    """
+    s = np.sin(lat_rad)
+    es = WGS84_E * s
+    q = (1 - WGS84_E2) * (
+        s / (1 - WGS84_E2 * s * s)
+        - (1 / (2 * WGS84_E)) * np.log((1 - es) / (1 + es))
+    )
+    return 0.5 * WGS84_A * WGS84_A * q
+
+
+def ring_areas(lon_deg: np.ndarray, lat_deg: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Unsigned area (m^2) of each ring. Rings are stored back to back:
+    ring k owns lengths[k] consecutive vertices. A closing vertex equal to
+    the first is harmless (its edge has zero length).
+    """
+    n_rings = lengths.shape[0]
+    if n_rings == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    starts = np.zeros(n_rings, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    ring_of = np.repeat(np.arange(n_rings), lengths)
+
+    x = np.radians(lon_deg)
+    y = authalic_y(np.radians(lat_deg))
+
+    # Centre each ring before the shoelace so the products stay small
+    x = x - np.repeat(np.add.reduceat(x, starts) / lengths, lengths)
+    y = y - np.repeat(np.add.reduceat(y, starts) / lengths, lengths)
+
+    nxt = np.arange(x.shape[0]) + 1
+    ends = starts + lengths
+    nxt[ends - 1] = starts  # wrap each ring onto its own first vertex
+
+    cross = x * y[nxt] - x[nxt] * y
+    return 0.5 * np.abs(np.bincount(ring_of, weights=cross, minlength=n_rings))
+
+
+def geometry_acres(geometries: Sequence[Any]) -> np.ndarray:
+    """
+    Acreage for each geometry (Feature or bare Polygon/MultiPolygon).
+    Outer rings add, holes subtract. NaN where area can't be computed.
+    """
+    n = len(geometries)
+    result = np.full(n, np.nan, dtype=np.float64)
+
+    ring_arrays: List[np.ndarray] = []
+    ring_owner: List[int] = []
+    ring_sign: List[float] = []
+
+    for i, obj in enumerate(geometries):
+        geom = unwrap_geometry(obj)
+        polygons = polygons_of(geom) if geom else None
+        if polygons is None:
+            continue
+
+        try:
+            rings = []
+            for polygon in polygons:
+                if not isinstance(polygon, list) or not polygon:
+                    continue
+                outer = ring_to_array(polygon[0])
+                if outer.shape[0] < 3:
+                    # Degenerate outer ring: its holes don't count either
+                    continue
+                rings.append((outer, 1.0))
+                for ring in polygon[1:]:
+                    arr = ring_to_array(ring)
+                    if arr.shape[0] >= 3:
+                        rings.append((arr, -1.0))
+        except (TypeError, ValueError):
+            continue
+
+        if not rings:
+            # Nothing measurable (empty or 1-2 vertex rings): stays NaN
+            continue
+        result[i] = 0.0
+        for arr, sign in rings:
+            ring_arrays.append(arr)
+            ring_owner.append(i)
+            ring_sign.append(sign)
+
+    if ring_arrays:
+        lengths = np.fromiter((a.shape[0] for a in ring_arrays), dtype=np.int64, count=len(ring_arrays))
+        coords = np.concatenate(ring_arrays)
+        areas = ring_areas(coords[:, 0], coords[:, 1], lengths) * np.asarray(ring_sign)
+        per_field = np.bincount(np.asarray(ring_owner), weights=areas, minlength=n)
+        measured = ~np.isnan(result)
+        result[measured] = np.maximum(per_field[measured], 0.0) / SQ_METERS_PER_ACRE
+
+    return result
+
+
+def single_geometry_acres(obj: Any) -> Optional[float]:
+    value = float(geometry_acres([obj])[0])
+    return None if np.isnan(value) else value
+
+
+def field_acres(geometries: Sequence[Any]) -> List[Optional[float]]:
+    """
+    Rounded authoritative acreage per geometry, None where it couldn't be
+    measured.
+    """
+    return [
+        None if np.isnan(v) else round(float(v), ACRES_DECIMALS)
+        for v in geometry_acres(geometries)
+    ]
+
+
+# -------------------------------------------------------------------
+# Compaction: simplification + coordinate quantization
+# -------------------------------------------------------------------
+
+# Rough metres per degree, used only to express the simplification
+# tolerance in metres; areas above never use this.
+METERS_PER_DEG_LAT = 110574.0
+METERS_PER_DEG_LON_EQUATOR = 111320.0
+
+# Crossing tests bucket edges into a grid whose cells are this many
+# median edge lengths wide (at least the mean edge length)
+CROSSING_CELL_EDGES = 2
+
+
+def closed_ring(coords: np.ndarray) -> np.ndarray:
+    return coords if np.array_equal(coords[0], coords[-1]) else np.vstack([coords, coords[:1]])
+
+
+def geometry_frame(rings: Sequence[np.ndarray]) -> Tuple[float, np.ndarray]:
+    """
+    (cos of the mean latitude, mean lon/lat) of a set of rings: one local
+    plane shared by all rings of a geometry, so they can be tested against
+    each other.
+    """
+    coords = np.concatenate(rings)
+    return float(np.cos(np.radians(coords[:, 1].mean()))), coords.mean(axis=0)
+
+
+def local_xy(coords: np.ndarray, frame: Optional[Tuple[float, np.ndarray]] = None) -> np.ndarray:
+    """
+    Project lon/lat to a local metric plane, by default around the ring's
+    own centroid.
+    """
+    cos_lat, origin = frame if frame is not None else geometry_frame([coords])
+    d = coords - origin
+    return np.column_stack([d[:, 0] * METERS_PER_DEG_LON_EQUATOR * cos_lat, d[:, 1] * METERS_PER_DEG_LAT])
+
+
+def douglas_peucker_mask(xy: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Boolean mask of vertices kept by Douglas-Peucker on an open polyline.
+    Each split's distances are computed as one array operation.
+    """
+    n = xy.shape[0]
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        seg = xy[j] - xy[i]
+        pts = xy[i + 1:j] - xy[i]
+        seg_len2 = float(seg @ seg)
+        if seg_len2 == 0.0:
+            dist = np.hypot(pts[:, 0], pts[:, 1])
+        else:
+            dist = np.abs(pts[:, 0] * seg[1] - pts[:, 1] * seg[0]) / np.sqrt(seg_len2)
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+
+    return keep
+
+
+def planar_ring_area(xy: np.ndarray) -> float:
+    x, y = xy[:, 0], xy[:, 1]
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)))
+
+
+def points_in_rings(points: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    """
+    Even-odd test of (k, 2) points against a polygon's rings (holes
+    included). Points exactly on an edge may go either way.
+    """
+    inside = np.zeros(len(points), dtype=bool)
+    px = points[:, 0][:, None]
+    py = points[:, 1][:, None]
+    for ring in rings:
+        x0, y0 = ring[:-1, 0][None, :], ring[:-1, 1][None, :]
+        x1, y1 = ring[1:, 0][None, :], ring[1:, 1][None, :]
+        straddles = (y0 > py) != (y1 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        crossings = np.count_nonzero(straddles & (px < x_cross), axis=1)
+        inside ^= (crossings % 2).astype(bool)
+    return inside
+
+
+def crossing_rings(rings: Sequence[np.ndarray]) -> Set[Tuple[int, int]]:
+    """
+    Pairs (i, j), i <= j, of closed rings with edges that properly cross;
+    (i, i) for a ring crossing itself. Adjacent edges of a ring and edges
+    that only touch don't count. Edges are bucketed into a grid and only
+    edges sharing a cell are compared; long edges are bucketed in pieces
+    no longer than a cell, so the work stays close to linear in the number
+    of vertices.
+    """
+    edges = [r.shape[0] - 1 for r in rings]
+    if sum(edges) < 2:
+        return set()
+    a = np.concatenate([r[:-1] for r in rings])
+    b = np.concatenate([r[1:] for r in rings])
+    ring_id = np.repeat(np.arange(len(rings)), edges)
+    pos = np.arange(a.shape[0]) - np.repeat(np.cumsum(edges) - edges, edges)
+    ring_edges = np.asarray(edges)[ring_id]
+    n = a.shape[0]
+
+    lengths = np.hypot(*(b - a).T)
+    cell = max(CROSSING_CELL_EDGES * float(np.median(lengths)), float(lengths.mean()), 1e-9)
+    pieces = np.maximum(np.ceil(lengths / cell), 1).astype(np.int64)
+    piece_edge = np.repeat(np.arange(n), pieces)
+    step = np.arange(piece_edge.shape[0]) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    delta = (b - a)[piece_edge] / pieces[piece_edge][:, None]
+    # Computed the same way on both sides of a joint, so pieces meet exactly
+    p0 = a[piece_edge] + delta * step[:, None]
+    p1 = a[piece_edge] + delta * (step + 1)[:, None]
+    origin = np.minimum(a, b).min(axis=0)
+    c0 = np.floor((np.minimum(p0, p1) - origin) / cell).astype(np.int64)
+    c1 = np.floor((np.maximum(p0, p1) - origin) / cell).astype(np.int64)
+    w = c1[:, 0] - c0[:, 0] + 1
+    counts = w * (c1[:, 1] - c0[:, 1] + 1)
+
+    # One entry per (edge piece, cell it overlaps), sorted by cell
+    entry = np.repeat(np.arange(piece_edge.shape[0]), counts)
+    k = np.arange(entry.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = c0[entry, 0] + k % w[entry]
+    cy = c0[entry, 1] + k // w[entry]
+    cell_key = cx * (int(c1[:, 1].max()) + 1) + cy
+    order = np.argsort(cell_key, kind="stable")
+    cell_key, edge = cell_key[order], piece_edge[entry[order]]
+
+    # Pair every two entries of a cell: entries d apart for d = 1, 2, ...
+    # until no cell has more than d entries
+    first, second = [], []
+    d = 1
+    while d < cell_key.shape[0]:
+        same = cell_key[d:] == cell_key[:-d]
+        if not same.any():
+            break
+        first.append(edge[:-d][same])
+        second.append(edge[d:][same])
+        d += 1
+    if not first:
+        return set()
+    i = np.concatenate(first)
+    j = np.concatenate(second)
+    i, j = i[i != j], j[i != j]
+    pair = np.unique(np.minimum(i, j) * n + np.maximum(i, j))
+    i, j = pair // n, pair % n
+
+    gap = np.abs(pos[i] - pos[j])
+    adjacent = (ring_id[i] == ring_id[j]) & ((gap <= 1) | (gap == ring_edges[i] - 1))
+    i, j = i[~adjacent], j[~adjacent]
+
+    def orient(p, q, r):
+        return np.sign((q[:, 0] - p[:, 0]) * (r[:, 1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (r[:, 0] - p[:, 0]))
+
+    crosses = ((orient(a[i], b[i], a[j]) * orient(a[i], b[i], b[j]) < 0)
+               & (orient(a[j], b[j], a[i]) * orient(a[j], b[j], b[i]) < 0))
+    ri, rj = ring_id[i[crosses]], ring_id[j[crosses]]
+    return set(zip(np.minimum(ri, rj).tolist(), np.maximum(ri, rj).tolist()))
+
+
+def ring_self_intersects(xy: np.ndarray) -> bool:
+    """
+    True if any two non-adjacent edges of a closed ring cross.
+    """
+    return bool(crossing_rings([xy]))
+
+
+def quantize_ring(coords: np.ndarray, precision: int) -> np.ndarray:
+    """
+    Round to `precision` decimals and drop the consecutive duplicates that
+    rounding creates. Keeps the unrounded ring if it would degenerate.
+    """
+    rounded = np.round(coords, precision)
+    dup = np.all(rounded[1:] == rounded[:-1], axis=1)
+    rounded = rounded[np.concatenate([[True], ~dup])]
+    if rounded.shape[0] < 4:
+        return coords
+    return rounded
+
+
+def compact_ring(
+    coords: np.ndarray,
+    tolerance_m: float,
+    precision: Optional[int],
+    max_area_change: float,
+    frame: Tuple[float, np.ndarray],
+) -> np.ndarray:
+    """
+    Douglas-Peucker, then rounding to `precision` decimals, on one ring
+    with two guards on the result: the ring's area may change by at most
+    max_area_change (fraction), and it must not cross itself. On failure
+    the tolerance is halved; after a few tries the ring is only rounded,
+    and if that fails too the original ring is returned unchanged.
+    """
+    if coords.shape[0] < 4:
+        return coords
+    closed = closed_ring(coords)
+    xy = local_xy(closed, frame)
+    area = planar_ring_area(xy)
+
+    candidates = []
+    if tolerance_m > 0 and closed.shape[0] > 4:
+        tol = tolerance_m
+        for _ in range(4):
+            keep = douglas_peucker_mask(xy, tol)
+            if keep.sum() >= 4:
+                candidates.append(closed[keep])
+            tol /= 2
+    if precision is not None:
+        candidates.append(closed)
+
+    for ring in candidates:
+        if precision is not None:
+            ring = quantize_ring(ring, precision)
+        ring_xy = local_xy(ring, frame)
+        if area > 0 and abs(planar_ring_area(ring_xy) - area) / area > max_area_change:
+            continue
+        if ring_self_intersects(ring_xy):
+            continue
+        return ring
+    return coords
+
+
+def polygon_conflicts(polygons: List[List[np.ndarray]]) -> Set[int]:
+    """
+    Indices of the polygons (lists of closed rings, in one local plane;
+    empty lists are skipped) that break the geometry's topology: a ring
+    crossing a ring of the same or another polygon, a hole outside its
+    outer ring, or a polygon lying inside another one without crossing it.
+    """
+    present = [p for p, polygon in enumerate(polygons) if polygon]
+    rings, owner = [], []
+    for p, polygon in enumerate(polygons):
+        for ring in polygon:
+            rings.append(ring)
+            owner.append(p)
+
+    # Self-crossings are already handled ring by ring
+    bad = {owner[i] for pair in crossing_rings(rings) if pair[0] != pair[1] for i in pair}
+
+    for p in present:
+        for hole in polygons[p][1:]:
+            if not points_in_rings(hole[:1], polygons[p][:1])[0]:
+                bad.add(p)
+
+    if len(present) > 1:
+        lo = np.array([polygons[p][0].min(axis=0) for p in present])
+        hi = np.array([polygons[p][0].max(axis=0) for p in present])
+        for p in present:
+            pt = polygons[p][0][0]
+            for k in np.nonzero(np.all((lo <= pt) & (pt <= hi), axis=1))[0]:
+                q = present[k]
+                if q != p and points_in_rings(polygons[p][0][:1], polygons[q])[0]:
+                    bad.update((p, q))
+    return bad
+
+
+def compact_polygons(
+    polygons: List[List[np.ndarray]],
+    tolerance_m: float,
+    precision: Optional[int],
+    max_area_change: float,
+) -> List[List[np.ndarray]]:
+    """
+    Compact every ring of a geometry's polygons (lon/lat arrays, see
+    compact_ring), then give a polygon its original rings back if its
+    compacted rings cross each other or another polygon, a hole ends up
+    outside it, or it ends up inside another polygon.
+    """
+    measured = [ring for polygon in polygons for ring in polygon if ring.shape[0] >= 4]
+    if not measured:
+        return polygons
+    frame = geometry_frame(measured)
+    compacted = [
+        [compact_ring(ring, tolerance_m, precision, max_area_change, frame) for ring in polygon]
+        for polygon in polygons
+    ]
+    if len(measured) == 1:
+        return compacted
+
+    def plane(polygon: List[np.ndarray]) -> List[np.ndarray]:
+        # Rings too short to measure are left out, a polygon without a
+        # measurable outer ring entirely
+        if not polygon or polygon[0].shape[0] < 4:
+            return []
+        return [local_xy(closed_ring(ring), frame) for ring in polygon if ring.shape[0] >= 4]
+
+    reverted = [all(c is o for c, o in zip(cp, op)) for cp, op in zip(compacted, polygons)]
+    while True:
+        bad = [p for p in polygon_conflicts([plane(polygon) for polygon in compacted]) if not reverted[p]]
+        if not bad:
+            return compacted
+        for p in bad:
+            compacted[p] = polygons[p]
+            reverted[p] = True
+
+
+def compact_geometry(
+    obj: Any,
+    tolerance_m: float = 0.0,
+    precision: Optional[int] = None,
+    max_area_change: float = 0.005,
+) -> Any:
+    """
+    Compacted copy of a Feature or bare geometry (see compact_polygons).
+    Non-areal or malformed geometries are returned untouched.
+    """
+    geom = unwrap_geometry(obj)
+    polygons = polygons_of(geom) if geom else None
+    if polygons is None or (tolerance_m <= 0 and precision is None):
+        return obj
+
+    try:
+        arrays = [[ring_to_array(ring) for ring in polygon] for polygon in polygons]
+        compacted = compact_polygons(arrays, tolerance_m, precision, max_area_change)
+    except (TypeError, ValueError):
+        return obj
+
+    new_polygons = [[ring.tolist() for ring in polygon] for polygon in compacted]
+    coords = new_polygons[0] if geom["type"] == "Polygon" else new_polygons
+    new_geom = dict(geom, coordinates=coords)
+    if obj is geom:
+        return new_geom
+    return dict(obj, geometry=new_geom)
+
+
+def count_vertices(obj: Any) -> int:
+    geom = unwrap_geometry(obj)
+    polygons = polygons_of(geom) if geom else None
+    if not polygons:
+        return 0
+    try:
+        return sum(len(ring) for polygon in polygons for ring in polygon)
+    except TypeError:
+        return 0
+
+
+def compaction_report(before: Sequence[Any], after: Sequence[Any]) -> dict:
+    """
+    Size, vertex and acreage deltas between two lists of geometries, so a
+    compaction setting can be checked before it's trusted.
+    """
+    acres_before = geometry_acres(before)
+    acres_after = geometry_acres(after)
+    measured = ~np.isnan(acres_before) & ~np.isnan(acres_after) & (acres_before > 0)
+    rel = np.abs(acres_after[measured] - acres_before[measured]) / acres_before[measured]
+
+    bytes_before = len(json.dumps(list(before), separators=(",", ":")))
+    bytes_after = len(json.dumps(list(after), separators=(",", ":")))
+
+    return {
+        "geometries": len(before),
+        "vertices_before": sum(count_vertices(g) for g in before),
+        "vertices_after": sum(count_vertices(g) for g in after),
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "acres_before": round(float(np.nansum(acres_before)), 4),
+        "acres_after": round(float(np.nansum(acres_after)), 4),
+        "max_field_acres_change_pct": round(float(rel.max()) * 100, 4) if rel.size else 0.0,
+    }
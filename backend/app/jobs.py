@@ -0,0 +1,143 @@
+"""
+In-process background job queue.
+
+Heavy work (onboarding packet builds) is submitted here instead of running
+inside the request. Each queue has its own small worker pool, so a burst
+of builds can only occupy those workers and never the threads serving
+pricing. Submitting a job whose key matches a queued or running job
+returns the existing job instead of starting a second one.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+PACKET_BUILD_WORKERS = 2
+# Queued + running packet builds before POST .../onboarding answers 503
+PACKET_MAX_ACTIVE_JOBS = 32
+MAX_FINISHED_JOBS = 500
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class Job:
+    def __init__(self, kind: str, key: str):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = JOB_QUEUED
+        self.progress_done = 0
+        self.progress_total = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def report_progress(self, done: int, total: int) -> None:
+        self.progress_done = done
+        self.progress_total = total
+
+    def to_dict(self) -> Dict[str, Any]:
+        fraction = (self.progress_done / self.progress_total) if self.progress_total else (
+            1.0 if self.status == JOB_DONE else 0.0
+        )
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "progress": round(fraction, 4),
+            "progress_done": self.progress_done,
+            "progress_total": self.progress_total,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(
+        self,
+        kind: str,
+        max_workers: int,
+        max_finished: int = MAX_FINISHED_JOBS,
+        max_active: Optional[int] = None,
+    ):
+        self.kind = kind
+        self.max_finished = max_finished
+        # Queued + running jobs allowed at once (None = unbounded)
+        self.max_active = max_active
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"job-{kind}")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[[Job], Any]) -> Job:
+        """
+        Queue fn(job) unless a job with the same key is already queued or
+        running, in which case that job is returned. Raises JobQueueFull
+        when max_active jobs are already queued or running.
+        """
+        with self._lock:
+            active_id = self._active_by_key.get(key)
+            if active_id is not None:
+                return self._jobs[active_id]
+            if self.max_active is not None and len(self._active_by_key) >= self.max_active:
+                raise JobQueueFull(self.kind)
+
+            job = Job(self.kind, key)
+            self._jobs[job.job_id] = job
+            self._active_by_key[key] = job.job_id
+            self._prune()
+
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = JOB_DONE
+        except Exception as e:
+            job.error = str(e) or e.__class__.__name__
+            job.status = JOB_FAILED
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active_by_key.get(job.key) == job.job_id:
+                    del self._active_by_key[job.key]
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs beyond the retention limit
+        finished = [j for j in self._jobs.values() if j.finished]
+        for job in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._active_by_key)
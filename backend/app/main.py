@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import health, quotes, orders
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .routers import health, quotes, orders, exports, fields, tiles, metrics, profiles
 
 app = FastAPI(title="TerraNet Client Onboarding API")
 
@@ -19,8 +21,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so timings include CORS and every other middleware
+app.add_middleware(MetricsMiddleware)
 
 # Attach routers
 app.include_router(health.router)
 app.include_router(quotes.router)
 app.include_router(orders.router)
+app.include_router(exports.router)
+app.include_router(fields.router)
+app.include_router(tiles.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
+
+
+@app.on_event("startup")
+def warm_field_index():
+    orders.FIELD_INDEX.warm_in_background()
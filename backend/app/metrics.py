@@ -0,0 +1,287 @@
+"""
+Request and stage metrics, exposed at GET /metrics in the Prometheus text
+format.
+
+MetricsMiddleware records, per route template (e.g. /orders/{quote_id}):
+
+- terranet_http_request_duration_seconds: latency histogram, by status
+- terranet_http_requests_in_flight: requests currently being handled
+- terranet_http_request_size_bytes / _response_size_bytes: body sizes
+
+time_stage() times steps inside a request or job into
+terranet_stage_duration_seconds{operation, stage}, e.g. each export
+written by save_checkout_start or the zip step of the packet builder.
+terranet_admission_rejected_total counts 503s from app/admission.py.
+
+The metric types are a minimal in-process implementation (no client
+library needed); all values are per process.
+"""
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+UNMATCHED_ROUTE = "unmatched"
+
+LabelValues = Tuple[str, ...]
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{escape_label(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# -------------------------------------------------------------------
+# Metric types
+# -------------------------------------------------------------------
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, key)} {format_number(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS_S):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[i] += 1
+            self._sums[key] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            snapshot = [(key, list(counts), self._sums[key]) for key, counts in sorted(self._counts.items())]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class InFlightGauge(Metric):
+    """
+    Requests being handled, by method and route. The route is only known
+    once the router has matched the request, so active requests are
+    tracked by scope and grouped when rendered.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation, ("method", "route"))
+        self._active: Dict[int, Dict[str, Any]] = {}
+        self._seen: set = set()
+
+    def add(self, scope: Dict[str, Any]) -> None:
+        with self._lock:
+            self._active[id(scope)] = scope
+
+    def remove(self, scope: Dict[str, Any]) -> None:
+        with self._lock:
+            self._active.pop(id(scope), None)
+            self._seen.add((scope["method"], route_label(scope)))
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            counts = {key: 0 for key in self._seen}
+            for scope in self._active.values():
+                key = (scope["method"], route_label(scope))
+                counts[key] = counts.get(key, 0) + 1
+        for key, value in sorted(counts.items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "terranet_http_request_duration_seconds",
+    "Time from request start to the last response byte.",
+    ("method", "route", "status"),
+))
+HTTP_IN_FLIGHT = REGISTRY.register(InFlightGauge(
+    "terranet_http_requests_in_flight",
+    "Requests currently being handled.",
+))
+HTTP_REQUEST_BYTES = REGISTRY.register(Histogram(
+    "terranet_http_request_size_bytes",
+    "Request body size.",
+    ("method", "route"),
+    buckets=SIZE_BUCKETS_BYTES,
+))
+HTTP_RESPONSE_BYTES = REGISTRY.register(Histogram(
+    "terranet_http_response_size_bytes",
+    "Response body size as sent (after any content encoding).",
+    ("method", "route"),
+    buckets=SIZE_BUCKETS_BYTES,
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "terranet_admission_rejected_total",
+    "Requests turned away with 503 because their route class was saturated.",
+    ("route_class",),
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "terranet_stage_duration_seconds",
+    "Time spent in one stage of a larger operation (checkout save, packet build).",
+    ("operation", "stage"),
+))
+
+
+@contextlib.contextmanager
+def time_stage(operation: str, stage: str) -> Iterator[None]:
+    """
+    Record how long the block takes, whether or not it raises.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, operation=operation, stage=stage)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+# -------------------------------------------------------------------
+# Middleware
+# -------------------------------------------------------------------
+
+
+def route_label(scope: Dict[str, Any]) -> str:
+    """
+    The path template of the route handling this request, so /orders/q_abc
+    and /orders/q_def are counted together. The router stores the matched
+    route in the scope; requests no route matched are grouped together.
+    """
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (streaming responses pass through untouched).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.add(scope)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - t0
+            HTTP_IN_FLIGHT.remove(scope)
+            route = route_label(scope)
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=str(status["code"]))
+            HTTP_REQUEST_BYTES.observe(sizes["request"], method=method, route=route)
+            HTTP_RESPONSE_BYTES.observe(sizes["response"], method=method, route=route)
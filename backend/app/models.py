@@ -9,11 +9,13 @@ ProgramType = Literal["REMOTE_ONLY", "SPRAYER_PLUS_REMOTE"]
 class FieldInput(BaseModel):
     """
     Minimal info the front-end sends when it wants a quote line
-    for a field.
+    for a field. If geometry (GeoJSON Feature or Polygon/MultiPolygon)
+    is included, acres is recomputed from it on the server.
     """
     field_id: str
     name: str
     acres: float
+    geometry: Optional[dict] = None
 
 
 class QuoteLine(BaseModel):
@@ -0,0 +1,176 @@
+"""
+Append-only journal of order changes, behind the order change feed.
+
+Checkout, status updates and deletes each append one event:
+
+    {"seq": 42, "ts": 1731000000.5, "type": "status", "quote_id": "q_...",
+     "data": {"from": "Quoted", "to": "Paid"}}
+
+- created: data is the order's listing row (as in GET /orders)
+- status:  data is {"from": ..., "to": ...}
+- deleted: data is {}
+
+seq is an SQLite rowid that only ever grows, so it doubles as the feed
+cursor: a client passes the last seq it has seen as `since` and gets only
+what happened after it. Events are never rewritten or removed, which also
+makes the journal the status history of every order.
+
+Waiting for new events is cheap within a process (appends wake waiters
+directly); events appended by another worker process are picked up by
+polling every CROSS_PROCESS_POLL_S.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+EVENT_CREATED = "created"
+EVENT_STATUS = "status"
+EVENT_DELETED = "deleted"
+
+CROSS_PROCESS_POLL_S = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS order_events (
+    seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts       REAL NOT NULL,
+    type     TEXT NOT NULL,
+    quote_id TEXT NOT NULL,
+    data     TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS ix_order_events_quote ON order_events (quote_id, seq);
+"""
+
+
+def event_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "seq": row["seq"],
+        "ts": row["ts"],
+        "type": row["type"],
+        "quote_id": row["quote_id"],
+        "data": json.loads(row["data"]),
+    }
+
+
+class OrderJournal:
+    """
+    Thin wrapper around a SQLite file, a fresh connection per call (like
+    OrderIndex).
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._init_lock = threading.Lock()
+        self._ready = False
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._waiters_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def ensure(self) -> None:
+        if self._ready:
+            return
+        with self._init_lock:
+            if self._ready:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            self._ready = True
+
+    def append(self, event_type: str, quote_id: str, data: Optional[Dict[str, Any]] = None) -> int:
+        self.ensure()
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                "INSERT INTO order_events (ts, type, quote_id, data) VALUES (?, ?, ?, ?)",
+                (time.time(), event_type, quote_id, json.dumps(data or {}, separators=(",", ":"))),
+            )
+            seq = cur.lastrowid
+        self._wake_waiters()
+        return seq
+
+    def append_many(self, events: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+        """
+        Append (type, quote_id, data) events in one transaction.
+        """
+        self.ensure()
+        now = time.time()
+        rows = [(now, t, q, json.dumps(d or {}, separators=(",", ":"))) for t, q, d in events]
+        if not rows:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT INTO order_events (ts, type, quote_id, data) VALUES (?, ?, ?, ?)", rows)
+        self._wake_waiters()
+
+    def latest_seq(self) -> int:
+        self.ensure()
+        with closing(self._connect()) as conn:
+            (seq,) = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM order_events").fetchone()
+        return seq
+
+    def read_since(self, since: int, limit: int) -> List[Dict[str, Any]]:
+        self.ensure()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT * FROM order_events WHERE seq > ? ORDER BY seq LIMIT ?", (since, limit)
+            ).fetchall()
+        return [event_from_row(r) for r in rows]
+
+    def history(self, quote_id: str) -> List[Dict[str, Any]]:
+        self.ensure()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT * FROM order_events WHERE quote_id = ? ORDER BY seq", (quote_id,)
+            ).fetchall()
+        return [event_from_row(r) for r in rows]
+
+    # ---------------------------------------------------------------
+    # Waiting for new events
+    # ---------------------------------------------------------------
+
+    def _wake_waiters(self) -> None:
+        with self._waiters_lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # That loop has been closed
+                pass
+
+    async def wait_since(self, since: int, limit: int, timeout_s: float) -> List[Dict[str, Any]]:
+        """
+        Events after `since`, waiting up to timeout_s for the first one.
+        Returns an empty list on timeout.
+        """
+        deadline = time.monotonic() + timeout_s
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = (loop, asyncio.Event())
+            # Registered before reading, so an append in between still wakes us
+            with self._waiters_lock:
+                self._waiters.add(waiter)
+            try:
+                events = await run_in_threadpool(self.read_since, since, limit)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(remaining, CROSS_PROCESS_POLL_S))
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                with self._waiters_lock:
+                    self._waiters.discard(waiter)
@@ -0,0 +1,328 @@
+"""
+Local SQLite index of order summaries.
+
+The order folders under ORDERS_ROOT stay the source of truth. This index
+only caches the handful of columns GET /orders needs so listing does not
+open every client_info.csv / status.txt on each request.
+
+Rebuild / reconcile from the folder tree (run from backend/):
+
+    python -m app.order_index rebuild
+"""
+from __future__ import annotations
+
+import csv
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .order_layout import iter_order_dirs
+
+STATUS_FILENAME = "status.txt"
+DEFAULT_STATUS = "Quoted"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    quote_id          TEXT PRIMARY KEY,
+    grower_name       TEXT NOT NULL DEFAULT '',
+    program_type      TEXT NOT NULL DEFAULT '',
+    field_count       INTEGER NOT NULL DEFAULT 0,
+    total_acres       REAL NOT NULL DEFAULT 0,
+    total_annual_cost REAL NOT NULL DEFAULT 0,
+    created_at        REAL NOT NULL DEFAULT 0,
+    status            TEXT NOT NULL DEFAULT 'Quoted'
+);
+CREATE INDEX IF NOT EXISTS ix_orders_created_at ON orders (created_at, quote_id);
+CREATE INDEX IF NOT EXISTS ix_orders_status ON orders (status, created_at, quote_id);
+CREATE INDEX IF NOT EXISTS ix_orders_program ON orders (program_type, created_at, quote_id);
+CREATE INDEX IF NOT EXISTS ix_orders_grower ON orders (grower_name, quote_id);
+CREATE INDEX IF NOT EXISTS ix_orders_acres ON orders (total_acres, quote_id);
+CREATE INDEX IF NOT EXISTS ix_orders_annual ON orders (total_annual_cost, quote_id);
+"""
+
+COLUMNS = [
+    "quote_id",
+    "grower_name",
+    "program_type",
+    "field_count",
+    "total_acres",
+    "total_annual_cost",
+    "created_at",
+    "status",
+]
+
+# Columns the listing can be sorted by. quote_id is always the tie-breaker
+# so keyset cursors stay stable when sort values repeat.
+SORT_COLUMNS = {
+    "created_at",
+    "grower_name",
+    "program_type",
+    "status",
+    "field_count",
+    "total_acres",
+    "total_annual_cost",
+    "quote_id",
+}
+# Sort columns holding text; the rest are numeric
+TEXT_SORT_COLUMNS = {"grower_name", "program_type", "status", "quote_id"}
+
+
+# -------------------------------------------------------------------
+# Reading an order folder
+# -------------------------------------------------------------------
+
+
+def read_status_file(order_dir: Path) -> str:
+    status_path = order_dir / STATUS_FILENAME
+    if status_path.exists():
+        text = status_path.read_text(encoding="utf-8").strip()
+        return text or DEFAULT_STATUS
+    return DEFAULT_STATUS
+
+
+def read_order_row(order_dir: Path) -> Optional[Dict]:
+    """
+    Build one index row from an order folder, or None if the folder
+    is not a complete order (no readable client_info.csv).
+    """
+    client_csv = order_dir / "client_info.csv"
+    if not client_csv.exists():
+        return None
+
+    try:
+        with client_csv.open(newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            row = next(reader, None)
+    except Exception:
+        return None
+
+    if not row:
+        return None
+
+    try:
+        field_count = int(row.get("field_count") or 0)
+    except ValueError:
+        field_count = 0
+
+    try:
+        total_acres = float(row.get("total_acres") or 0)
+    except ValueError:
+        total_acres = 0.0
+
+    try:
+        total_annual_cost = float(row.get("total_annual_cost") or 0)
+    except ValueError:
+        total_annual_cost = 0.0
+
+    return {
+        "quote_id": row.get("quote_id") or order_dir.name,
+        "grower_name": row.get("grower_name") or "",
+        "program_type": row.get("program_type") or "",
+        "field_count": field_count,
+        "total_acres": total_acres,
+        "total_annual_cost": total_annual_cost,
+        "created_at": order_dir.stat().st_mtime,
+        "status": read_status_file(order_dir),
+    }
+
+
+# -------------------------------------------------------------------
+# Index
+# -------------------------------------------------------------------
+
+
+class OrderIndex:
+    """
+    Thin wrapper around a SQLite file. A fresh connection is opened per
+    call so the index can be used from any request thread.
+    """
+
+    def __init__(self, db_path: Path, orders_root: Path):
+        self.db_path = Path(db_path)
+        self.orders_root = Path(orders_root)
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def ensure(self) -> None:
+        """
+        Create the schema on first use. If the database file did not exist
+        yet, fill it from the folder tree so existing orders show up; other
+        callers wait for that fill instead of reading a partial index.
+        """
+        if self._ready:
+            return
+        with self._init_lock:
+            if self._ready:
+                return
+            is_new = not self.db_path.exists()
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            if is_new:
+                self._reconcile()
+            self._ready = True
+
+    def upsert(self, row: Dict) -> None:
+        self.ensure()
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO orders ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                [row[c] for c in COLUMNS],
+            )
+
+    def set_status(self, quote_id: str, status: str) -> None:
+        self.ensure()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE orders SET status = ? WHERE quote_id = ?", (status, quote_id))
+
+    def delete(self, quote_id: str) -> None:
+        self.ensure()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM orders WHERE quote_id = ?", (quote_id,))
+
+    def set_status_many(self, quote_ids: Iterable[str], status: str) -> None:
+        """
+        set_status for many orders in one transaction.
+        """
+        self.ensure()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("UPDATE orders SET status = ? WHERE quote_id = ?", [(status, q) for q in quote_ids])
+
+    def delete_many(self, quote_ids: Iterable[str]) -> None:
+        self.ensure()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM orders WHERE quote_id = ?", [(q,) for q in quote_ids])
+
+    def query_rows(
+        self,
+        limit: int,
+        sort: str = "created_at",
+        descending: bool = True,
+        after: Optional[Tuple[Any, str]] = None,
+        status: Optional[str] = None,
+        program_type: Optional[str] = None,
+        created_from: Optional[float] = None,
+        created_to: Optional[float] = None,
+        search: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        One page of rows, filtered and sorted in SQLite. `after` is the
+        (sort value, quote_id) of the last row of the previous page.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort}")
+        self.ensure()
+
+        where: List[str] = []
+        params: List[Any] = []
+
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if program_type:
+            where.append("program_type = ?")
+            params.append(program_type)
+        if created_from is not None:
+            where.append("created_at >= ?")
+            params.append(created_from)
+        if created_to is not None:
+            where.append("created_at < ?")
+            params.append(created_to)
+        if search:
+            # Substring match: LIKE '%...%' can't use an index, so this is a
+            # full scan of the (small, local) orders table
+            columns = ("quote_id", "grower_name", "status", "program_type")
+            where.append("(" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in columns) + ")")
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            params.extend([pattern] * len(columns))
+
+        direction = "DESC" if descending else "ASC"
+        if sort == "quote_id":
+            order_by = f"quote_id {direction}"
+            if after is not None:
+                where.append("quote_id < ?" if descending else "quote_id > ?")
+                params.append(after[1])
+        else:
+            order_by = f"{sort} {direction}, quote_id {direction}"
+            if after is not None:
+                op = "<" if descending else ">"
+                where.append(f"({sort}, quote_id) {op} (?, ?)")
+                params.extend([after[0], after[1]])
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM orders"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by} LIMIT ?"
+        params.append(limit)
+
+        with closing(self._connect()) as conn:
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+    def iter_rows(self, batch_size: int = 500, **filters) -> Iterator[Dict]:
+        """
+        Every matching row, newest first, fetched one keyset page at a
+        time so memory stays flat however many orders match.
+        """
+        after = None
+        while True:
+            rows = self.query_rows(limit=batch_size, after=after, **filters)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["quote_id"])
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Make the index match the folder tree: upsert every complete order
+        folder and drop rows whose folder no longer exists.
+        """
+        self.ensure()
+        return self._reconcile()
+
+    def _reconcile(self) -> Dict[str, int]:
+        rows: List[Dict] = []
+        for order_dir in iter_order_dirs(self.orders_root):
+            row = read_order_row(order_dir)
+            if row is not None:
+                rows.append(row)
+
+        on_disk = {r["quote_id"] for r in rows}
+        placeholders = ", ".join("?" for _ in COLUMNS)
+
+        with closing(self._connect()) as conn, conn:
+            indexed = {r[0] for r in conn.execute("SELECT quote_id FROM orders")}
+            stale = indexed - on_disk
+            conn.executemany(
+                f"INSERT OR REPLACE INTO orders ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                [[r[c] for c in COLUMNS] for r in rows],
+            )
+            conn.executemany("DELETE FROM orders WHERE quote_id = ?", [(q,) for q in stale])
+
+        return {"indexed": len(rows), "removed": len(stale)}
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) != 1 or argv[0] not in ("rebuild", "reconcile"):
+        print("usage: python -m app.order_index rebuild")
+        return 2
+
+    from .routers.orders import ORDER_INDEX
+
+    result = ORDER_INDEX.reconcile()
+    print(f"Indexed {result['indexed']} orders, removed {result['removed']} stale rows "
+          f"({ORDER_INDEX.db_path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
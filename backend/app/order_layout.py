@@ -0,0 +1,161 @@
+"""
+Where order folders live under ORDERS_ROOT.
+
+Orders are sharded into SHARD_WIDTH-hex-character folders by a hash of
+the quote ID, like git's object store:
+
+    orders/3f/q_Smith_1731000000/
+
+With 256 shards a million orders is ~4k folders per directory instead of
+a million in one. The shard only depends on the quote ID, so any lookup
+is one path computation and no directory is ever scanned.
+
+Folders from the old flat layout (orders/q_.../) keep working: lookups
+try the sharded path and fall back to the flat one, and listings walk
+both. Move them with (run from backend/, safe while the API is running):
+
+    python -m app.order_layout migrate [--dry-run]
+
+Each order is moved with a single rename. A reader racing the rename
+checks the sharded path again after missing the flat one. If an order
+exists in both places (re-saved under the flat path mid-migration), the
+newer copy wins on the next run.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+SHARD_WIDTH = 2
+SHARD_NAME_RE = re.compile(r"^[0-9a-f]{%d}$" % SHARD_WIDTH)
+
+
+def is_valid_quote_id(quote_id: str) -> bool:
+    return bool(quote_id) and quote_id not in (".", "..") and not quote_id.startswith(".") \
+        and "/" not in quote_id and "\\" not in quote_id and "\0" not in quote_id
+
+
+def shard_name(quote_id: str) -> str:
+    return hashlib.sha1(quote_id.encode("utf-8")).hexdigest()[:SHARD_WIDTH]
+
+
+def sharded_path(root: Path, quote_id: str) -> Path:
+    return root / shard_name(quote_id) / quote_id
+
+
+def resolve_order_dir(root: Path, quote_id: str) -> Path:
+    """
+    The folder of an order: its sharded path, or its flat-layout path if
+    it hasn't been migrated yet. For an order that doesn't exist, the
+    sharded path it should be created at. Raises ValueError for IDs that
+    aren't a single plain path component.
+    """
+    if not is_valid_quote_id(quote_id):
+        raise ValueError(f"Invalid quote id: {quote_id!r}")
+    sharded = sharded_path(root, quote_id)
+    if sharded.is_dir():
+        return sharded
+    flat = root / quote_id
+    if flat.is_dir():
+        return flat
+    # Moved between the two checks by a running migration
+    return sharded
+
+
+def iter_order_dirs(root: Path) -> Iterator[Path]:
+    """
+    Every order folder, in either layout. Hidden folders (export staging,
+    retired copies) are skipped.
+    """
+    if not root.exists():
+        return
+    for child in root.iterdir():
+        if child.name.startswith(".") or not child.is_dir():
+            continue
+        if SHARD_NAME_RE.match(child.name):
+            for order_dir in child.iterdir():
+                if not order_dir.name.startswith(".") and order_dir.is_dir():
+                    yield order_dir
+        else:
+            yield child
+
+
+def iter_flat_order_dirs(root: Path) -> Iterator[Path]:
+    if not root.exists():
+        return
+    for child in root.iterdir():
+        if child.name.startswith(".") or not child.is_dir() or SHARD_NAME_RE.match(child.name):
+            continue
+        yield child
+
+
+# -------------------------------------------------------------------
+# Migration
+# -------------------------------------------------------------------
+
+
+def migrate_order(root: Path, flat_dir: Path, dry_run: bool = False) -> str:
+    """
+    Move one flat-layout order into its shard. Returns "moved",
+    "replaced" (a stale sharded copy was swapped for the newer flat one)
+    or "dropped" (the flat copy was the stale one).
+    """
+    target = sharded_path(root, flat_dir.name)
+    if not target.exists():
+        if not dry_run:
+            target.parent.mkdir(exist_ok=True)
+            os.rename(flat_dir, target)
+        return "moved"
+
+    if flat_dir.stat().st_mtime > target.stat().st_mtime:
+        if not dry_run:
+            retired = target.parent / f".retired-{target.name}"
+            os.rename(target, retired)
+            os.rename(flat_dir, target)
+            shutil.rmtree(retired, ignore_errors=True)
+        return "replaced"
+
+    if not dry_run:
+        shutil.rmtree(flat_dir)
+    return "dropped"
+
+
+def migrate(root: Path, dry_run: bool = False) -> Dict[str, int]:
+    counts = {"moved": 0, "replaced": 0, "dropped": 0, "failed": 0}
+    for flat_dir in list(iter_flat_order_dirs(root)):
+        try:
+            counts[migrate_order(root, flat_dir, dry_run)] += 1
+        except OSError as e:
+            counts["failed"] += 1
+            print(f"{flat_dir.name}: failed ({e})")
+    return counts
+
+
+def main(argv: List[str]) -> int:
+    args = [a for a in argv if not a.startswith("--")]
+    flags = {a for a in argv if a.startswith("--")}
+    if args != ["migrate"] or flags - {"--dry-run"}:
+        print("usage: python -m app.order_layout migrate [--dry-run]")
+        return 2
+
+    from .routers.orders import ORDERS_ROOT
+
+    dry_run = "--dry-run" in flags
+    counts = migrate(ORDERS_ROOT, dry_run=dry_run)
+    verb = "Would move" if dry_run else "Moved"
+    print(f"{verb} {counts['moved']} orders into shards under {ORDERS_ROOT}")
+    if counts["replaced"] or counts["dropped"]:
+        print(f"Duplicates: {counts['replaced']} sharded copies replaced by newer flat ones, "
+              f"{counts['dropped']} stale flat copies removed")
+    if counts["failed"]:
+        print(f"{counts['failed']} orders failed and were left in place")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
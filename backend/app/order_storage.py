@@ -0,0 +1,387 @@
+"""
+On-disk storage format for order folders.
+
+Legacy orders store pretty-printed JSON, and every field's geometry is
+written three times: in checkout_start.json, in fields.geojson and in
+fields_geojson/<id>.geojson. In compact mode:
+
+- JSON is minified, and checkout_start.json / fields.geojson can be
+  gzip-compressed (stored as "<name>.gz");
+- checkout_start.json keeps no geometry. Snapshot fields point at their
+  feature in fields.geojson with {"$ref": "fields.geojson", "field_id": ...};
+- per-field files are kept in a single container (see app/field_store.py)
+  instead of fields_geojson/. It's stored uncompressed so that reading
+  one field is a seek; orders without one fall back to scanning
+  fields.geojson, and their per-field files are generated from it when a
+  packet is built.
+
+Readers go through read_snapshot() / open_stored(), which accept either
+layout, so old and new orders can sit side by side. Existing orders are
+converted with:
+
+    python -m app.order_storage migrate [--no-compress] [--dry-run]
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import shutil
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Tuple
+
+from .field_store import FieldContainer
+from .order_layout import iter_order_dirs
+
+# Write new orders in the compact layout
+COMPACT_STORAGE = True
+# In compact mode, also gzip the snapshot and the geometry store
+COMPRESS_STORED_JSON = True
+GZIP_LEVEL = 6
+
+SNAPSHOT_FILENAME = "checkout_start.json"
+GEOMETRY_STORE_FILENAME = "fields.geojson"
+FIELDS_GEOJSON_DIR = "fields_geojson"
+COMPRESSED_SUFFIX = ".gz"
+REF_KEY = "$ref"
+
+
+# -------------------------------------------------------------------
+# Stored files (plain or gzip)
+# -------------------------------------------------------------------
+
+
+def stored_path(order_dir: Path, name: str) -> Optional[Path]:
+    """
+    The file actually holding `name` in this order: the plain file if
+    present, else its .gz variant, else None.
+    """
+    plain = order_dir / name
+    if plain.exists():
+        return plain
+    packed = order_dir / (name + COMPRESSED_SUFFIX)
+    if packed.exists():
+        return packed
+    return None
+
+
+def is_compressed(path: Path) -> bool:
+    return path.name.endswith(COMPRESSED_SUFFIX)
+
+
+def open_stored(order_dir: Path, name: str) -> IO[bytes]:
+    """
+    Binary reader for `name`, decompressing on the fly when it's stored as
+    .gz. Raises FileNotFoundError if neither variant exists.
+    """
+    path = stored_path(order_dir, name)
+    if path is None:
+        raise FileNotFoundError(order_dir / name)
+    if is_compressed(path):
+        return gzip.open(path, "rb")
+    return path.open("rb")
+
+
+def read_stored_bytes(order_dir: Path, name: str) -> bytes:
+    with open_stored(order_dir, name) as f:
+        return f.read()
+
+
+def read_stored_json(order_dir: Path, name: str):
+    with open_stored(order_dir, name) as f:
+        return json.load(f)
+
+
+def write_stored_json(
+    target_dir: Path,
+    name: str,
+    obj,
+    compact: bool = COMPACT_STORAGE,
+    compress: bool = COMPRESS_STORED_JSON,
+) -> Path:
+    """
+    Write `obj` as `name` (pretty) or, in compact mode, minified and
+    optionally as `name`.gz. Writes go through a temp file and replace the
+    previous file atomically; the other variant is removed afterwards.
+    """
+    if not compact:
+        data = json.dumps(obj, indent=2).encode("utf-8")
+        compress = False
+    else:
+        data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    final = target_dir / (name + COMPRESSED_SUFFIX if compress else name)
+    tmp = target_dir / f".{final.name}.tmp"
+    if compress:
+        # mtime=0 keeps the bytes stable for identical content
+        with tmp.open("wb") as raw, gzip.GzipFile(
+            filename="", mode="wb", fileobj=raw, compresslevel=GZIP_LEVEL, mtime=0
+        ) as f:
+            f.write(data)
+    else:
+        tmp.write_bytes(data)
+    os.replace(tmp, final)
+
+    other = target_dir / (name if compress else name + COMPRESSED_SUFFIX)
+    if other.exists():
+        other.unlink()
+    return final
+
+
+# -------------------------------------------------------------------
+# Geometry references
+# -------------------------------------------------------------------
+
+
+def load_geometry_store(order_dir: Path) -> List[dict]:
+    try:
+        return read_stored_json(order_dir, GEOMETRY_STORE_FILENAME).get("features", [])
+    except FileNotFoundError:
+        return []
+
+
+def features_by_field_id(features: List[dict]) -> Dict[object, dict]:
+    return {
+        (feat.get("properties") or {}).get("field_id"): feat
+        for feat in features
+    }
+
+
+def geometry_ref(field: dict) -> Optional[dict]:
+    """
+    Reference replacing field["geometry"], or None if this geometry can't
+    be rebuilt exactly from its fields.geojson feature.
+    """
+    geom = field.get("geometry")
+    field_id = field.get("id")
+    if not isinstance(geom, dict) or not field_id or REF_KEY in geom:
+        return None
+    if geom.get("type") != "Feature":
+        return {REF_KEY: GEOMETRY_STORE_FILENAME, "field_id": field_id}
+    if set(geom) - {"type", "properties", "geometry"}:
+        return None
+    return {
+        REF_KEY: GEOMETRY_STORE_FILENAME,
+        "field_id": field_id,
+        "properties": geom.get("properties") or {},
+    }
+
+
+def with_geometry_refs(snapshot: dict, store_features: Optional[List[dict]] = None) -> dict:
+    """
+    Copy of `snapshot` whose field geometry is replaced by references into
+    fields.geojson. Fields with a missing or duplicate id keep their
+    geometry inline. When `store_features` is given, only geometry equal
+    to its stored feature is referenced (used when migrating orders whose
+    fields.geojson may have been simplified).
+    """
+    fields = snapshot.get("fields") or []
+    id_counts = Counter(f.get("id") for f in fields if isinstance(f, dict) and f.get("geometry"))
+    duplicates = {i for i, n in id_counts.items() if n > 1}
+    stored = features_by_field_id(store_features) if store_features is not None else None
+
+    out_fields = []
+    for field in fields:
+        ref = geometry_ref(field) if isinstance(field, dict) else None
+        if ref is not None and field.get("id") in duplicates:
+            ref = None
+        if ref is not None and stored is not None:
+            feat = stored.get(field.get("id"))
+            if feat is None or resolve_geometry_ref(ref, feat) != field["geometry"]:
+                ref = None
+        out_fields.append(dict(field, geometry=ref) if ref is not None else field)
+
+    return dict(snapshot, fields=out_fields)
+
+
+def resolve_geometry_ref(ref: dict, feature: dict) -> dict:
+    if "properties" in ref:
+        return {
+            "type": "Feature",
+            "properties": ref["properties"],
+            "geometry": feature.get("geometry"),
+        }
+    return feature.get("geometry")
+
+
+def has_geometry_refs(snapshot: dict) -> bool:
+    return any(
+        isinstance(f, dict) and isinstance(f.get("geometry"), dict) and REF_KEY in f["geometry"]
+        for f in snapshot.get("fields") or []
+    )
+
+
+# -------------------------------------------------------------------
+# Snapshots
+# -------------------------------------------------------------------
+
+
+def has_snapshot(order_dir: Path) -> bool:
+    return stored_path(order_dir, SNAPSHOT_FILENAME) is not None
+
+
+def write_snapshot(
+    target_dir: Path,
+    snapshot: dict,
+    compact: bool = COMPACT_STORAGE,
+    geometry_refs: bool = True,
+) -> Path:
+    """
+    Write checkout_start.json. In compact mode field geometry is stored as
+    a reference unless `geometry_refs` is False (fields.geojson doesn't
+    hold the exact geometry, e.g. it was simplified).
+    """
+    if compact and geometry_refs:
+        snapshot = with_geometry_refs(snapshot)
+    return write_stored_json(target_dir, SNAPSHOT_FILENAME, snapshot, compact=compact)
+
+
+def read_snapshot(order_dir: Path, store_features: Optional[List[dict]] = None) -> dict:
+    """
+    checkout_start.json in either layout, with geometry references
+    resolved. Pass `store_features` if fields.geojson was already loaded.
+    Raises FileNotFoundError if the order has no snapshot.
+    """
+    snapshot = read_stored_json(order_dir, SNAPSHOT_FILENAME)
+    if not has_geometry_refs(snapshot):
+        return snapshot
+    if store_features is None:
+        store_features = load_geometry_store(order_dir)
+    return resolve_geometry_refs(snapshot, store_features)
+
+
+def resolve_geometry_refs(snapshot: dict, store_features: List[dict]) -> dict:
+    """
+    Replace geometry references in `snapshot` (in place) with the geometry
+    they point at; a reference to a missing feature becomes None.
+    """
+    stored = features_by_field_id(store_features)
+    for field in snapshot.get("fields") or []:
+        ref = field.get("geometry") if isinstance(field, dict) else None
+        if isinstance(ref, dict) and REF_KEY in ref:
+            feat = stored.get(ref.get("field_id"))
+            field["geometry"] = resolve_geometry_ref(ref, feat) if feat is not None else None
+    return snapshot
+
+
+# -------------------------------------------------------------------
+# Migration
+# -------------------------------------------------------------------
+
+
+def tree_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def per_field_records(order_dir: Path) -> List[Tuple[str, bytes]]:
+    """
+    (field_id, minified single-field GeoJSON) from the field container or
+    a legacy fields_geojson/ folder.
+    """
+    container = FieldContainer(order_dir)
+    if container.exists():
+        return list(container.iter_records())
+
+    records = []
+    fields_dir = order_dir / FIELDS_GEOJSON_DIR
+    if fields_dir.is_dir():
+        for path in sorted(fields_dir.glob("*.geojson")):
+            with path.open("r", encoding="utf-8") as f:
+                fc = json.load(f)
+            records.append((path.stem, json.dumps(fc, separators=(",", ":")).encode("utf-8")))
+    return records
+
+
+def store_field_records(store_features: List[dict]) -> List[Tuple[str, bytes]]:
+    """
+    (field_id, minified single-field GeoJSON) generated from fields.geojson.
+    """
+    return [
+        (str((feature.get("properties") or {}).get("field_id") or "field"),
+         json.dumps({"type": "FeatureCollection", "features": [feature]},
+                    separators=(",", ":")).encode("utf-8"))
+        for feature in store_features
+    ]
+
+
+def migrate_order(order_dir: Path, compress: bool = True, dry_run: bool = False) -> dict:
+    """
+    Convert one order folder to the compact layout. The folder's mtime
+    (used as the order's created_at) is preserved.
+    """
+    before = tree_size(order_dir)
+    st = order_dir.stat()
+
+    store_features = load_geometry_store(order_dir)
+    snapshot = read_snapshot(order_dir, store_features)
+    fields_dir = order_dir / FIELDS_GEOJSON_DIR
+    container = FieldContainer(order_dir)
+    records = per_field_records(order_dir)
+
+    if dry_run:
+        return {"quote_id": order_dir.name, "bytes_before": before, "bytes_after": None}
+
+    if stored_path(order_dir, GEOMETRY_STORE_FILENAME) is not None:
+        store = read_stored_json(order_dir, GEOMETRY_STORE_FILENAME)
+        write_stored_json(order_dir, GEOMETRY_STORE_FILENAME, store, compact=True, compress=compress)
+    write_stored_json(
+        order_dir,
+        SNAPSHOT_FILENAME,
+        with_geometry_refs(snapshot, store_features),
+        compact=True,
+        compress=compress,
+    )
+    # Per-field files go into a single container, generated from
+    # fields.geojson if the order had none
+    if not container.exists():
+        records = records or store_field_records(store_features)
+        if records:
+            container.write_all(records)
+    if fields_dir.is_dir() and container.exists():
+        shutil.rmtree(fields_dir)
+
+    os.utime(order_dir, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return {"quote_id": order_dir.name, "bytes_before": before, "bytes_after": tree_size(order_dir)}
+
+
+def main(argv: List[str]) -> int:
+    args = [a for a in argv if not a.startswith("--")]
+    flags = {a for a in argv if a.startswith("--")}
+    if args != ["migrate"] or flags - {"--no-compress", "--dry-run"}:
+        print("usage: python -m app.order_storage migrate [--no-compress] [--dry-run]")
+        return 2
+
+    from .routers.orders import ORDERS_ROOT
+
+    compress = "--no-compress" not in flags
+    dry_run = "--dry-run" in flags
+    total_before = total_after = migrated = failed = 0
+
+    for order_dir in sorted(iter_order_dirs(ORDERS_ROOT)):
+        if not has_snapshot(order_dir):
+            continue
+        try:
+            result = migrate_order(order_dir, compress=compress, dry_run=dry_run)
+        except Exception as e:
+            failed += 1
+            print(f"{order_dir.name}: failed ({e})")
+            continue
+        migrated += 1
+        total_before += result["bytes_before"]
+        total_after += result["bytes_after"] or 0
+
+    if dry_run:
+        print(f"Would migrate {migrated} orders ({total_before} bytes)")
+    else:
+        print(f"Migrated {migrated} orders: {total_before} -> {total_after} bytes")
+    if failed:
+        print(f"{failed} orders failed and were skipped")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,173 @@
+"""
+Manifest-based reuse of onboarding packets.
+
+Next to each onboarding_packet.zip we keep a manifest of the stored files
+it was built from (size and mtime), the SHA-256 of every archive member
+and the ZIP's own size and mtime. On the next build:
+
+- if no input file moved and the ZIP is the one we wrote, it is reused
+  without reading anything else;
+- otherwise members are hashed (files whose size and mtime match are
+  trusted without reading them) and compared by digest; members
+  generated from compact storage are hashed from their bytes;
+- if no member changed the ZIP is still reused;
+- otherwise a new ZIP is written in which unchanged members are copied
+  from the old archive as raw compressed bytes and only changed or new
+  members are compressed again.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import struct
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+MANIFEST_FILENAME = ".packet_manifest.json"
+MANIFEST_VERSION = 2
+
+HASH_CHUNK = 1024 * 1024
+
+# ZIP general-purpose flag: sizes/CRC follow the data in a descriptor
+_FLAG_DATA_DESCRIPTOR = 0x08
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stat_entry(path: Path) -> Dict[str, int]:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_manifest(order_dir: Path) -> Optional[dict]:
+    path = order_dir / MANIFEST_FILENAME
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(order_dir: Path, manifest: dict) -> None:
+    tmp = order_dir / (MANIFEST_FILENAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(order_dir / MANIFEST_FILENAME)
+
+
+def input_stats(order_dir: Path, paths: List[Path]) -> Dict[str, Dict[str, int]]:
+    """
+    {path relative to order_dir: size/mtime} for the stored files a packet
+    is built from.
+    """
+    return {path.relative_to(order_dir).as_posix(): stat_entry(path) for path in paths}
+
+
+def inputs_unchanged(manifest: Optional[dict], stats: Dict[str, Dict[str, int]]) -> bool:
+    return manifest is not None and manifest.get("inputs") == stats
+
+
+def diff_members(
+    order_dir: Path,
+    members: List[Tuple[Union[Path, bytes], str]],
+    stats: Dict[str, Dict[str, int]],
+    manifest: Optional[dict],
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    SHA-256 per arcname for `members` and the arcnames that changed (or
+    are new) relative to `manifest`. A member read straight from an input
+    file whose size and mtime match the manifest keeps its recorded digest
+    without being read; generated members are hashed from their bytes.
+    """
+    old_members = (manifest or {}).get("members", {})
+    old_inputs = (manifest or {}).get("inputs", {})
+    digests: Dict[str, str] = {}
+    changed: List[str] = []
+
+    for source, arcname in members:
+        prev = old_members.get(arcname)
+        if isinstance(source, Path):
+            rel = source.relative_to(order_dir).as_posix()
+            if prev and rel in stats and old_inputs.get(rel) == stats[rel]:
+                digest = prev
+            else:
+                digest = file_digest(source)
+        else:
+            digest = hashlib.sha256(source).hexdigest()
+        if prev != digest:
+            changed.append(arcname)
+        digests[arcname] = digest
+
+    return digests, changed
+
+
+def zip_matches_manifest(zip_path: Path, manifest: Optional[dict], compression: int) -> bool:
+    if manifest is None or not zip_path.exists():
+        return False
+    if manifest.get("compression") != compression:
+        return False
+    return manifest.get("zip") == stat_entry(zip_path)
+
+
+def copy_raw_member(src: zipfile.ZipFile, info: zipfile.ZipInfo, dst: zipfile.ZipFile) -> bool:
+    """
+    Append one member of `src` to `dst` without decompressing it: the local
+    header and compressed bytes are copied verbatim and the central
+    directory entry is re-pointed at the new offset. Returns False (and
+    writes nothing) for members this can't handle safely.
+    """
+    if info.flag_bits & _FLAG_DATA_DESCRIPTOR:
+        return False
+
+    src.fp.seek(info.header_offset)
+    header = src.fp.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader:
+        return False
+    fields = struct.unpack(zipfile.structFileHeader, header)
+    if fields[0] != zipfile.stringFileHeader:
+        return False
+    name_len, extra_len = fields[10], fields[11]
+
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    for attr in ("compress_type", "flag_bits", "create_system", "create_version",
+                 "extract_version", "external_attr", "internal_attr", "extra",
+                 "CRC", "compress_size", "file_size", "comment"):
+        setattr(new_info, attr, getattr(info, attr))
+
+    new_info.header_offset = dst.fp.tell()
+    dst.fp.write(header)
+    remaining = name_len + extra_len + info.compress_size
+    shutil.copyfileobj(_LimitedReader(src.fp, remaining), dst.fp, HASH_CHUNK)
+
+    dst.filelist.append(new_info)
+    dst.NameToInfo[new_info.filename] = new_info
+    dst.start_dir = dst.fp.tell()
+    return True
+
+
+class _LimitedReader:
+    def __init__(self, fp, limit: int):
+        self.fp = fp
+        self.remaining = limit
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fp.read(size)
+        self.remaining -= len(data)
+        return data
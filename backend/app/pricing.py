@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Tuple
 from .models import ProgramType, FieldInput, QuoteLine, Quote
 
 
@@ -8,6 +8,23 @@ SPRAYER_RATE = 5.0            # $/ac/year
 SPRAYER_SETUP_FEE = 2000.0    # one-time
 
 
+def pricing_version() -> tuple:
+    """
+    Fingerprint of the current pricing constants. Anything that caches
+    priced results keys on this so a rate change invalidates it.
+    """
+    return (REMOTE_ONLY_RATE, SPRAYER_RATE, SPRAYER_SETUP_FEE)
+
+
+def program_rates(program_type: ProgramType) -> Tuple[float, float]:
+    """
+    (per-acre rate, one-time sprayer fee) for a program.
+    """
+    if program_type == "REMOTE_ONLY":
+        return REMOTE_ONLY_RATE, 0.0
+    return SPRAYER_RATE, SPRAYER_SETUP_FEE
+
+
 def calculate_quote(
     quote_id: str,
     grower_id: str,
@@ -18,12 +35,7 @@ def calculate_quote(
     Core pricing engine for TerraNet onboarding MVP.
     """
 
-    if program_type == "REMOTE_ONLY":
-        per_acre_rate = REMOTE_ONLY_RATE
-        sprayer_fee = 0.0
-    else:
-        per_acre_rate = SPRAYER_RATE
-        sprayer_fee = SPRAYER_SETUP_FEE
+    per_acre_rate, sprayer_fee = program_rates(program_type)
 
     lines: List[QuoteLine] = []
     annual_total = 0.0
@@ -0,0 +1,318 @@
+"""
+Opt-in per-request profiling.
+
+With PROFILING_ENABLED set, a request is run under cProfile when it
+carries the PROFILE_HEADER header (any value but "0"), or at random with
+probability PROFILE_SAMPLE_RATE. Each capture is saved under PROFILE_DIR
+as <id>.prof (pstats format: python -m pstats, snakeviz, ...) plus
+<id>.json with the request, its timing and a top-N summary. Only the
+newest PROFILE_MAX_CAPTURES are kept. The response of a profiled request
+carries its id in the PROFILE_HEADER header; GET /admin/profiles lists
+the captures.
+
+A capture is recorded by exactly one profiler. It starts on the event
+loop (routing, validation, async endpoints). A sync endpoint that runs in
+a worker thread (routers using ProfiledRoute, and @limited endpoints via
+app/admission.py) takes the capture over: the loop profiler is stopped
+and dropped, and one enabled in the worker thread records the endpoint
+call only. cProfile can't do both at once: before Python 3.12 it only
+sees the thread it's enabled in, and from 3.12 on a second enable() while
+one is active raises ValueError. If a profiler can't be enabled (another
+profiling tool is active) the request is served unprofiled. Other
+requests served concurrently can show up in a capture; work done while
+streaming a response body after the endpoint returned isn't captured.
+One capture runs at a time; requests asking for one meanwhile are served
+unprofiled.
+
+When profiling is disabled the middleware costs one flag check.
+"""
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+PROFILING_ENABLED = False
+PROFILE_HEADER = "X-Profile"
+# Fraction of requests profiled without the header (0 = header only)
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_MAX_CAPTURES = 50
+PROFILE_TOP_N = 30
+PROFILE_DIR = BACKEND_DIR / "profiles"
+# Never profile these (the admin endpoints themselves, metrics scrapes, the
+# change feed stream, which would hold the one capture slot indefinitely)
+PROFILE_SKIP_PREFIXES = ("/admin/profiles", "/metrics", "/orders/changes/stream")
+
+CAPTURE_ID_RE = re.compile(r"^[0-9]{13}-[0-9a-f]{8}$")
+
+_prune_lock = threading.Lock()
+# One capture at a time (and cProfile allows only one active profiler)
+_loop_profiler_busy = threading.Lock()
+
+
+class Capture:
+    def __init__(self):
+        self.capture_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        # Set once a sync endpoint's worker thread has taken the capture over
+        self.in_thread = False
+        self._profiler: Optional[cProfile.Profile] = None
+        self._active = False
+
+    def start(self) -> bool:
+        """
+        Enable the capture's profiler in the calling thread. False if
+        another one is already active (Python 3.12+ allows only one).
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return False
+        self._profiler, self._active = profiler, True
+        return True
+
+    def stop(self) -> None:
+        if self._active:
+            self._profiler.disable()
+            self._active = False
+
+    def hand_off(self) -> None:
+        """
+        Called on the event loop just before a sync endpoint runs in a
+        worker thread: drop the loop profiler, run_profiled starts the
+        capture's only profiler in that thread.
+        """
+        self.stop()
+        self._profiler = None
+        self.in_thread = True
+
+    def stats(self) -> Optional[pstats.Stats]:
+        if self._profiler is None:
+            return None
+        self._profiler.create_stats()
+        if not self._profiler.stats:
+            return None
+        return pstats.Stats(self._profiler)
+
+
+CURRENT_CAPTURE: contextvars.ContextVar[Optional[Capture]] = contextvars.ContextVar(
+    "profiling_capture", default=None
+)
+
+
+def should_profile(scope: Dict[str, Any]) -> Optional[str]:
+    """
+    Why this request should be profiled ("header" / "sampled"), or None.
+    """
+    if any(scope["path"].startswith(p) for p in PROFILE_SKIP_PREFIXES):
+        return None
+    header = PROFILE_HEADER.lower().encode("latin-1")
+    for name, value in scope.get("headers", ()):
+        if name == header:
+            return "header" if value.strip() not in (b"", b"0") else None
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+# -------------------------------------------------------------------
+# Sync endpoints
+# -------------------------------------------------------------------
+
+
+def hand_off_to_thread() -> None:
+    """
+    Inside a capture, hand it over to the worker thread the caller is
+    about to run a sync endpoint in (under run_profiled).
+    """
+    capture = CURRENT_CAPTURE.get()
+    if capture is not None:
+        capture.hand_off()
+
+
+def run_profiled(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Call fn; inside a capture handed off to this thread, under its profiler.
+    """
+    capture = CURRENT_CAPTURE.get()
+    if capture is None or not capture.in_thread or not capture.start():
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        capture.stop()
+
+
+def profiled_endpoint(endpoint: Callable) -> Callable:
+    """
+    Wrap a sync endpoint so that, inside a capture, it runs under the
+    capture's profiler in its worker thread. Async endpoints are returned
+    unchanged.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        hand_off_to_thread()
+        return await run_in_threadpool(run_profiled, endpoint, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    route_class for routers whose sync endpoints should be profiled.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, profiled_endpoint(endpoint), **kwargs)
+
+
+# -------------------------------------------------------------------
+# Storage
+# -------------------------------------------------------------------
+
+
+def summarize(stats: pstats.Stats, top_n: int = PROFILE_TOP_N) -> Dict[str, Any]:
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(top_n)
+
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({func})",
+            "calls": nc,
+            "primitive_calls": cc,
+            "tottime_s": round(tt, 6),
+            "cumtime_s": round(ct, 6),
+        })
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return {
+        "total_calls": stats.total_calls,
+        "total_time_s": round(stats.total_tt, 6),
+        "top": rows[:top_n],
+        "text": out.getvalue(),
+    }
+
+
+def save_capture(capture: Capture, meta: Dict[str, Any]) -> None:
+    stats = capture.stats()
+    if stats is None:
+        return
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stats.dump_stats(str(PROFILE_DIR / f"{capture.capture_id}.prof"))
+    record = dict(meta, id=capture.capture_id, summary=summarize(stats))
+    tmp = PROFILE_DIR / f".{capture.capture_id}.json.tmp"
+    tmp.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    tmp.replace(PROFILE_DIR / f"{capture.capture_id}.json")
+    prune_captures()
+
+
+def capture_ids() -> List[str]:
+    """
+    Stored capture ids, newest first (ids start with a millisecond timestamp).
+    """
+    if not PROFILE_DIR.exists():
+        return []
+    ids = [p.stem for p in PROFILE_DIR.glob("*.json") if CAPTURE_ID_RE.match(p.stem)]
+    return sorted(ids, reverse=True)
+
+
+def prune_captures(keep: Optional[int] = None) -> None:
+    keep = PROFILE_MAX_CAPTURES if keep is None else keep
+    with _prune_lock:
+        for capture_id in capture_ids()[keep:]:
+            for suffix in (".json", ".prof"):
+                (PROFILE_DIR / f"{capture_id}{suffix}").unlink(missing_ok=True)
+
+
+def capture_path(capture_id: str, suffix: str) -> Optional[Path]:
+    if not CAPTURE_ID_RE.match(capture_id):
+        return None
+    path = PROFILE_DIR / f"{capture_id}{suffix}"
+    return path if path.exists() else None
+
+
+def read_capture(capture_id: str) -> Optional[Dict[str, Any]]:
+    path = capture_path(capture_id, ".json")
+    if path is None:
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+# -------------------------------------------------------------------
+# Middleware
+# -------------------------------------------------------------------
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILING_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = should_profile(scope)
+        if trigger is None or not _loop_profiler_busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, trigger)
+        finally:
+            _loop_profiler_busy.release()
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        capture = Capture()
+        status = {"code": 500}
+        header = (PROFILE_HEADER.lower().encode("latin-1"), capture.capture_id.encode("latin-1"))
+
+        async def tagging_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [header])
+            await send(message)
+
+        token = CURRENT_CAPTURE.set(capture)
+        started_at = time.time()
+        t0 = time.perf_counter()
+        capture.start()
+        try:
+            await self.app(scope, receive, tagging_send)
+        finally:
+            capture.stop()
+            elapsed = time.perf_counter() - t0
+            CURRENT_CAPTURE.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            await run_in_threadpool(save_capture, capture, {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "route": route,
+                "status": status["code"],
+                "trigger": trigger,
+                "started_at": started_at,
+                "duration_ms": round(elapsed * 1000, 3),
+            })
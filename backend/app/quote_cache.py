@@ -0,0 +1,71 @@
+"""
+Bounded LRU cache of priced quotes for /quote/preview.
+
+Entries are keyed by a SHA-256 of the pricing constants, the program type
+and the sorted (field_id, acres) pairs, so the same field set hits the
+cache regardless of quote_id, grower_id, field names or field order.
+Entries hold per-field amounts only; totals depend on summation order and
+are added up again for each hit (see quote_from_cache_entry).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .pricing import pricing_version
+
+QUOTE_CACHE_MAXSIZE = 4096
+
+
+def quote_cache_key(program_type: str, pairs: Iterable[Tuple[str, float]]) -> str:
+    canonical = json.dumps(
+        [list(pricing_version()), program_type, sorted(pairs)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class QuoteCache:
+    def __init__(self, maxsize: int = QUOTE_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
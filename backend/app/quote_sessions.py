@@ -0,0 +1,264 @@
+"""
+In-memory quote preview sessions.
+
+A session holds one grower's priced lines and running totals, so the
+client can send only field deltas (upsert / remove) instead of the whole
+field list on every map click. Sessions expire after a TTL of inactivity,
+and the store is capped in sessions, in fields per session and in lines
+across all sessions (MAX_TOTAL_LINES, the actual memory bound). When a
+session would take the store over its line budget, sessions idle for at
+least MIN_IDLE_BEFORE_EVICT_S are evicted, least recently used first; if
+that isn't enough the request is refused with StoreFull.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .models import FieldInput, ProgramType, Quote, QuoteLine
+from .pricing import program_rates, pricing_version
+
+SESSION_TTL_SECONDS = 30 * 60
+MAX_SESSIONS = 1000
+MAX_FIELDS_PER_SESSION = 20000
+# Priced lines held by all sessions together (~0.7 KB each, so ~350 MB)
+MAX_TOTAL_LINES = 500000
+# Sessions used more recently than this are never evicted to make room
+MIN_IDLE_BEFORE_EVICT_S = 60.0
+
+# Running totals drift slightly with repeated add/subtract; re-sum from
+# the lines after this many deltas to keep them honest.
+RESYNC_EVERY = 256
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class SessionFull(ValueError):
+    pass
+
+
+class StoreFull(RuntimeError):
+    """
+    The store's line budget is used up by sessions too recent to evict.
+    """
+
+
+class QuoteSession:
+    def __init__(self, session_id: str, quote_id: str, grower_id: str, program_type: ProgramType):
+        self.session_id = session_id
+        self.quote_id = quote_id
+        self.grower_id = grower_id
+        self.program_type = program_type
+        self.lines: Dict[str, QuoteLine] = {}
+        self.annual_total = 0.0
+        self.total_acres = 0.0
+        self.last_used = time.monotonic()
+        self._pricing = pricing_version()
+        self._deltas = 0
+        self.lock = threading.Lock()  # serializes deltas on one session
+        # Lines counted against the store's budget, and the store's hook
+        # for changing that (set once the session is stored)
+        self.charged = 0
+        self._charge: Callable[[QuoteSession, int], None] = lambda session, n: None
+
+    @property
+    def sprayer_fee(self) -> float:
+        return program_rates(self.program_type)[1]
+
+    @property
+    def total_due_first_year(self) -> float:
+        return self.annual_total + self.sprayer_fee
+
+    def _price(self, f: FieldInput) -> QuoteLine:
+        rate, _ = program_rates(self.program_type)
+        return QuoteLine(
+            field_id=f.field_id,
+            field_name=f.name,
+            acres=f.acres,
+            annual_amount=f.acres * rate,
+        )
+
+    def _resync(self) -> None:
+        self.annual_total = math.fsum(line.annual_amount for line in self.lines.values())
+        self.total_acres = math.fsum(line.acres for line in self.lines.values())
+        self._deltas = 0
+
+    def reprice_all(self) -> List[QuoteLine]:
+        rate, _ = program_rates(self.program_type)
+        for line in self.lines.values():
+            line.annual_amount = line.acres * rate
+        self._pricing = pricing_version()
+        self._resync()
+        return list(self.lines.values())
+
+    def apply(
+        self,
+        upsert: Iterable[FieldInput],
+        remove: Iterable[str],
+        program_type: Optional[ProgramType] = None,
+    ) -> Tuple[List[QuoteLine], List[str]]:
+        """
+        Apply one delta and return (changed lines, removed field ids).
+        A program change or a pricing-constant change reprices every line.
+        """
+        upsert = list(upsert)
+        remove = list(remove)
+
+        new_ids = {f.field_id for f in upsert} - self.lines.keys() - set(remove)
+        if len(self.lines) + len(new_ids) > MAX_FIELDS_PER_SESSION:
+            raise SessionFull(f"Sessions are limited to {MAX_FIELDS_PER_SESSION} fields")
+        # Reserve the new lines up front (may raise StoreFull), hand back
+        # what the removals freed afterwards
+        before = len(self.lines)
+        self._charge(self, len(new_ids))
+
+        removed: List[str] = []
+        for field_id in remove:
+            line = self.lines.pop(field_id, None)
+            if line is not None:
+                self.annual_total -= line.annual_amount
+                self.total_acres -= line.acres
+                removed.append(field_id)
+
+        changed: Dict[str, QuoteLine] = {}
+        for f in upsert:
+            old = self.lines.get(f.field_id)
+            if old is not None:
+                self.annual_total -= old.annual_amount
+                self.total_acres -= old.acres
+            line = self._price(f)
+            self.lines[f.field_id] = line
+            self.annual_total += line.annual_amount
+            self.total_acres += line.acres
+            changed[f.field_id] = line
+
+        self._charge(self, len(self.lines) - before - len(new_ids))
+        self._deltas += len(removed) + len(changed)
+
+        if (program_type and program_type != self.program_type) or self._pricing != pricing_version():
+            if program_type:
+                self.program_type = program_type
+            return self.reprice_all(), removed
+
+        if self._deltas >= RESYNC_EVERY:
+            self._resync()
+
+        return list(changed.values()), removed
+
+    def to_quote(self) -> Quote:
+        return Quote(
+            quote_id=self.quote_id,
+            grower_id=self.grower_id,
+            program_type=self.program_type,
+            lines=list(self.lines.values()),
+            annual_total=self.annual_total,
+            sprayer_fee=self.sprayer_fee,
+            total_due_first_year=self.total_due_first_year,
+        )
+
+
+class QuoteSessionStore:
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_sessions: int = MAX_SESSIONS,
+        max_lines: int = MAX_TOTAL_LINES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_lines = max_lines
+        self._sessions: "OrderedDict[str, QuoteSession]" = OrderedDict()
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._lines -= session.charged
+
+    def _expire(self, now: float) -> None:
+        # Oldest-used first, so stop at the first live session
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.ttl_seconds:
+                break
+            self._drop(session_id)
+
+    def _make_room(self, n: int, now: float, keep: Optional[QuoteSession] = None) -> None:
+        self._expire(now)
+        for session_id, session in list(self._sessions.items()):
+            if self._lines + n <= self.max_lines:
+                return
+            if session is keep:
+                continue
+            if now - session.last_used < MIN_IDLE_BEFORE_EVICT_S:
+                break
+            self._drop(session_id)
+        if self._lines + n > self.max_lines:
+            raise StoreFull("Too many quote session fields in use, retry shortly")
+
+    def _charge(self, session: QuoteSession, n: int) -> None:
+        with self._lock:
+            if self._sessions.get(session.session_id) is not session:
+                # Evicted meanwhile: nothing to give back, no room to take
+                if n > 0:
+                    raise SessionNotFound(session.session_id)
+                return
+            if n > 0:
+                self._make_room(n, time.monotonic(), keep=session)
+            self._lines += n
+            session.charged += n
+
+    def create(
+        self,
+        quote_id: str,
+        grower_id: str,
+        program_type: ProgramType,
+        fields: List[FieldInput],
+    ) -> QuoteSession:
+        session = QuoteSession(uuid.uuid4().hex, quote_id, grower_id, program_type)
+        session.apply(fields, [])
+        session._resync()
+
+        with self._lock:
+            now = time.monotonic()
+            self._make_room(len(session.lines), now)
+            while len(self._sessions) >= self.max_sessions:
+                self._drop(next(iter(self._sessions)))
+            session.last_used = now
+            session.charged = len(session.lines)
+            session._charge = self._charge
+            self._sessions[session.session_id] = session
+            self._lines += session.charged
+        return session
+
+    def get(self, session_id: str) -> QuoteSession:
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise SessionNotFound(session_id)
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._drop(session_id)
+            return True
+
+    @property
+    def total_lines(self) -> int:
+        return self._lines
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,229 @@
+"""
+Bulk exports across all orders.
+
+Each endpoint streams its output one order at a time: matching orders
+come from the order index in keyset pages, and only one order's files
+are open or parsed at any moment, so memory stays flat and the first
+bytes go out immediately regardless of how many orders match.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from ..admission import limited, limited_stream
+from ..order_storage import load_geometry_store
+from ..profiling import ProfiledRoute
+from . import orders
+
+router = APIRouter(route_class=ProfiledRoute)
+
+EXPORT_BATCH_SIZE = 500
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def iter_matching_orders(
+    status: Optional[str],
+    program_type: Optional[str],
+    created_from: Optional[str],
+    created_to: Optional[str],
+) -> Iterator[dict]:
+    return orders.ORDER_INDEX.iter_rows(
+        batch_size=EXPORT_BATCH_SIZE,
+        status=status,
+        program_type=program_type,
+        created_from=orders.parse_date_param(created_from, "created_from"),
+        created_to=orders.parse_date_param(created_to, "created_to"),
+    )
+
+
+def with_order_dirs(rows: Iterable[dict]) -> Iterator[Tuple[dict, Path]]:
+    """
+    Pair each index row with its order folder. Rows whose quote_id (read
+    from client_info.csv) isn't a plain folder name are skipped: raising
+    here would cut off a response that has already started.
+    """
+    for row in rows:
+        order_dir = orders.find_order_path(row["quote_id"])
+        if order_dir is not None:
+            yield row, order_dir
+
+
+def read_csv_rows(path: Path) -> List[Dict[str, str]]:
+    if not path.exists():
+        return []
+    try:
+        with path.open(newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    except Exception:
+        return []
+
+
+def read_features(order_dir: Path) -> List[dict]:
+    try:
+        return load_geometry_store(order_dir)
+    except Exception:
+        return []
+
+
+def order_meta(row: dict) -> dict:
+    return {
+        "status": row["status"],
+        "created_at": datetime.fromtimestamp(row["created_at"]).isoformat(),
+    }
+
+
+def csv_chunk(writer_fields: List[str], rows: List[dict], header: bool = False) -> str:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=writer_fields, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def streaming(body: Iterator[str], media_type: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        limited_stream(chunk.encode("utf-8") for chunk in body),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# -------------------------------------------------------------------
+# Endpoints
+# -------------------------------------------------------------------
+
+
+@router.get("/exports/orders.ndjson")
+@limited("bulk_export")
+def export_orders_ndjson(
+    status: Optional[str] = None,
+    program_type: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    include_geometry: bool = True,
+):
+    """
+    One JSON object per line per order: client row, status, and every
+    field with its fields.csv columns joined to its GeoJSON geometry.
+    """
+    rows = iter_matching_orders(status, program_type, created_from, created_to)
+
+    def body() -> Iterator[str]:
+        for row, order_dir in with_order_dirs(rows):
+            client_rows = read_csv_rows(order_dir / "client_info.csv")
+            geometry_by_id = {}
+            if include_geometry:
+                geometry_by_id = {
+                    (feat.get("properties") or {}).get("field_id"): feat.get("geometry")
+                    for feat in read_features(order_dir)
+                }
+
+            fields = []
+            for field in read_csv_rows(order_dir / "fields.csv"):
+                if include_geometry:
+                    field["geometry"] = geometry_by_id.get(field.get("field_id"))
+                fields.append(field)
+
+            record = {
+                "quote_id": row["quote_id"],
+                **order_meta(row),
+                "client": client_rows[0] if client_rows else None,
+                "fields": fields,
+            }
+            yield json.dumps(record, separators=(",", ":")) + "\n"
+
+    return streaming(body(), "application/x-ndjson", "orders.ndjson")
+
+
+@router.get("/exports/clients.csv")
+@limited("bulk_export")
+def export_clients_csv(
+    status: Optional[str] = None,
+    program_type: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+):
+    """
+    Every matching order's client_info.csv row plus status/created_at.
+    """
+    headers = orders.CLIENT_CSV_HEADERS + ["status", "created_at"]
+    rows = iter_matching_orders(status, program_type, created_from, created_to)
+
+    def body() -> Iterator[str]:
+        yield csv_chunk(headers, [], header=True)
+        for row, order_dir in with_order_dirs(rows):
+            client_rows = read_csv_rows(order_dir / "client_info.csv")
+            meta = order_meta(row)
+            yield csv_chunk(headers, [{**r, **meta} for r in client_rows])
+
+    return streaming(body(), "text/csv", "clients.csv")
+
+
+@router.get("/exports/fields.csv")
+@limited("bulk_export")
+def export_fields_csv(
+    status: Optional[str] = None,
+    program_type: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+):
+    """
+    Every matching order's fields.csv rows plus status/created_at.
+    """
+    headers = orders.FIELDS_CSV_HEADERS + ["status", "created_at"]
+    rows = iter_matching_orders(status, program_type, created_from, created_to)
+
+    def body() -> Iterator[str]:
+        yield csv_chunk(headers, [], header=True)
+        for row, order_dir in with_order_dirs(rows):
+            field_rows = read_csv_rows(order_dir / "fields.csv")
+            meta = order_meta(row)
+            yield csv_chunk(headers, [{**r, **meta} for r in field_rows])
+
+    return streaming(body(), "text/csv", "fields.csv")
+
+
+@router.get("/exports/fields.geojson")
+@limited("bulk_export")
+def export_fields_geojson(
+    status: Optional[str] = None,
+    program_type: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+):
+    """
+    One FeatureCollection of every matching order's fields, each feature
+    tagged with its order's quote_id, grower, program and status.
+    """
+    rows = iter_matching_orders(status, program_type, created_from, created_to)
+
+    def body() -> Iterator[str]:
+        yield '{"type":"FeatureCollection","features":['
+        first = True
+        for row, order_dir in with_order_dirs(rows):
+            tags = {
+                "quote_id": row["quote_id"],
+                "grower_name": row["grower_name"],
+                "program_type": row["program_type"],
+                **order_meta(row),
+            }
+            for feature in read_features(order_dir):
+                feature["properties"] = {**(feature.get("properties") or {}), **tags}
+                yield ("" if first else ",") + json.dumps(feature, separators=(",", ":"))
+                first = False
+        yield "]}"
+
+    return streaming(body(), "application/geo+json", "fields.geojson")
@@ -0,0 +1,73 @@
+"""
+Location queries over every stored field, served from the in-memory
+spatial index (see app/spatial_index.py).
+"""
+from __future__ import annotations
+
+import math
+
+from fastapi import APIRouter, HTTPException, Query
+
+from ..profiling import ProfiledRoute
+from ..spatial_index import SEARCH_LIMIT_DEFAULT, BBox
+from . import orders
+
+router = APIRouter(route_class=ProfiledRoute)
+
+SEARCH_LIMIT_MAX = 10000
+
+
+def clamp(v: float, lo: float, hi: float) -> float:
+    return min(max(v, lo), hi)
+
+
+def parse_bbox(value: str) -> BBox:
+    try:
+        minx, miny, maxx, maxy = (float(v) for v in value.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    if not all(math.isfinite(v) for v in (minx, miny, maxx, maxy)):
+        raise HTTPException(status_code=400, detail="bbox values must be finite numbers")
+    if minx > maxx or miny > maxy:
+        raise HTTPException(status_code=400, detail="bbox min must not exceed max")
+    # Clamped to the range /fields/at accepts; nothing is stored beyond it
+    return (clamp(minx, -180.0, 180.0), clamp(miny, -90.0, 90.0),
+            clamp(maxx, -180.0, 180.0), clamp(maxy, -90.0, 90.0))
+
+
+@router.get("/fields/search")
+def search_fields(
+    bbox: str,
+    limit: int = Query(SEARCH_LIMIT_DEFAULT, ge=1, le=SEARCH_LIMIT_MAX),
+):
+    """
+    Fields whose geometry intersects the box (touching counts).
+    """
+    hits = orders.FIELD_INDEX.search_bbox(parse_bbox(bbox), limit=limit)
+    return {
+        "fields": [hit.to_dict() for hit in hits],
+        "truncated": len(hits) >= limit,
+    }
+
+
+@router.get("/fields/at")
+def fields_at_point(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+):
+    """
+    Fields containing the point.
+    """
+    hits = orders.FIELD_INDEX.search_point(lon, lat)
+    return {"fields": [hit.to_dict() for hit in hits]}
+
+
+@router.post("/fields/index/rebuild")
+def rebuild_field_index():
+    """
+    Re-read every order's geometry, e.g. after orders were copied in by
+    hand. Cached map tiles are dropped as well.
+    """
+    result = orders.FIELD_INDEX.rebuild()
+    orders.TILE_CACHE.clear()
+    return result
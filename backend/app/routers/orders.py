@@ -1,20 +1,79 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import csv
+import itertools
 import json
-import time
+import math
+import os
+import re
 import zipfile
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Literal, Optional
 
 import shutil
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, EmailStr
-
-router = APIRouter()
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field
+from starlette.concurrency import run_in_threadpool
+
+from ..admission import limited, limited_stream
+from ..checkout_keys import (
+    IDEMPOTENCY_KEY_TTL_S,
+    MAX_KEY_LENGTH,
+    PAYLOAD_KEY_TTL_S,
+    CheckoutKeys,
+    Claim,
+    KeyReused,
+    payload_hash,
+)
+from ..export_pipeline import run_export_pipeline
+from ..zip_stream import iter_zip_stream
+from ..field_store import CONTAINER_FILENAME, PER_FIELD_CONTAINER, FieldContainer
+from ..geometry import compact_geometry, compaction_report, field_acres, unwrap_geometry
+from ..jobs import PACKET_BUILD_WORKERS, PACKET_MAX_ACTIVE_JOBS, Job, JobQueue, JobQueueFull
+from ..metrics import time_stage
+from ..order_events import EVENT_CREATED, EVENT_DELETED, EVENT_STATUS, OrderJournal
+from ..order_index import STATUS_FILENAME, TEXT_SORT_COLUMNS, OrderIndex, read_order_row, read_status_file
+from ..order_layout import resolve_order_dir
+from ..order_storage import (
+    COMPACT_STORAGE,
+    GEOMETRY_STORE_FILENAME,
+    SNAPSHOT_FILENAME,
+    has_geometry_refs,
+    has_snapshot,
+    is_compressed,
+    load_geometry_store,
+    open_stored,
+    read_snapshot,
+    read_stored_bytes,
+    read_stored_json,
+    resolve_geometry_refs,
+    stored_path,
+    write_snapshot,
+    write_stored_json,
+)
+from ..packet_cache import (
+    MANIFEST_VERSION,
+    copy_raw_member,
+    diff_members,
+    input_stats,
+    inputs_unchanged,
+    load_manifest,
+    save_manifest,
+    stat_entry,
+    zip_matches_manifest,
+)
+from ..pricing import program_rates
+from ..profiling import ProfiledRoute
+from ..spatial_index import FieldSpatialIndex, geometry_problem
+from ..tiles import TileCache
+
+router = APIRouter(route_class=ProfiledRoute)
 
 # -------------------------------------------------------------------
 # Constants & paths
@@ -22,8 +81,56 @@ router = APIRouter()
 
 # This file is backend/app/routers/orders.py
 # parent = routers, parent.parent = app, parent.parent.parent = backend
-ORDERS_ROOT = Path(__file__).resolve().parent.parent.parent / "orders"
-STATUS_FILENAME = "status.txt"
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+ORDERS_ROOT = BACKEND_DIR / "orders"
+ORDER_INDEX = OrderIndex(BACKEND_DIR / "orders_index.sqlite3", ORDERS_ROOT)
+# Idempotency keys of checkout submissions and the quote ID sequence
+CHECKOUT_KEYS = CheckoutKeys(BACKEND_DIR / "checkout_keys.sqlite3")
+# Append-only log of checkouts, status changes and deletes (the change feed)
+ORDER_EVENTS = OrderJournal(BACKEND_DIR / "order_events.sqlite3")
+# How long a retry waits for the same submission still being saved
+CHECKOUT_RETRY_WAIT_S = 15.0
+
+# Every stored field's geometry, for location queries and overlap checks
+FIELD_INDEX = FieldSpatialIndex(ORDERS_ROOT)
+# Overview map tiles built from FIELD_INDEX
+TILE_CACHE = TileCache(BACKEND_DIR / "tile_cache")
+
+# Onboarding packet builds run here, at most PACKET_BUILD_WORKERS at once
+PACKET_JOBS = JobQueue("onboarding_packet", PACKET_BUILD_WORKERS, max_active=PACKET_MAX_ACTIVE_JOBS)
+PACKET_JOBS_RETRY_AFTER_S = 10
+
+
+def find_order_path(quote_id: str) -> Optional[Path]:
+    """
+    Folder of an order, existing or to be created, or None for an ID that
+    isn't a plain folder name. Every lookup by quote ID goes through here
+    (sharded layout, see app/order_layout.py).
+    """
+    try:
+        return resolve_order_dir(ORDERS_ROOT, quote_id)
+    except ValueError:
+        return None
+
+
+def order_path(quote_id: str) -> Path:
+    """
+    find_order_path for request handlers: an invalid ID is answered with 404.
+    """
+    path = find_order_path(quote_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return path
+
+# Recompute each field's acres (and annualCost) from its geometry at
+# checkout instead of trusting the browser's flat-earth estimate.
+AUTHORITATIVE_ACREAGE = True
+
+# Server-side default compaction per geometry export; a checkout request
+# can override it per export. Empty = store geometry exactly as sent.
+# The checkout_start.json snapshot is never compacted.
+DEFAULT_GEOMETRY_COMPACTION: Dict[str, "GeometryCompaction"] = {}
+GEOMETRY_COMPACTION_FILENAME = "geometry_compaction.json"
 
 ALLOWED_STATUSES = [
     "Quoted",
@@ -33,6 +140,60 @@ ALLOWED_STATUSES = [
     "Completed",
 ]
 
+CLIENT_CSV_HEADERS = [
+    "quote_id",
+    "grower_name",
+    "grower_email",
+    "farm_name",
+    "phone",
+    "notes",
+    "address1",
+    "address2",
+    "city",
+    "state",
+    "postal_code",
+    "country",
+    "program_type",
+    "field_count",
+    "total_acres",
+    "total_annual_cost",
+]
+
+FIELDS_CSV_HEADERS = [
+    "quote_id",
+    "field_id",
+    "name",
+    "acres",
+    "crop_program",
+    "notes",
+    "annual_cost",
+    "program_type",
+    "grower_name",
+]
+
+ORDERS_PAGE_DEFAULT = 50
+ORDERS_PAGE_MAX = 500
+
+# Change feed: events per response, longest long-poll wait, and how often
+# an idle event stream sends a keep-alive comment
+CHANGES_PAGE_MAX = 500
+CHANGES_WAIT_MAX_S = 30.0
+CHANGES_HEARTBEAT_S = 15.0
+
+# Most orders one bulk status update / delete may touch
+BULK_MAX_ORDERS = 10000
+
+OrderSortKey = Literal[
+    "created_at",
+    "grower_name",
+    "program_type",
+    "status",
+    "field_count",
+    "total_acres",
+    "total_annual_cost",
+    "quote_id",
+]
+
 VALID_EXPORT_FILES = {
     "client_info.csv",
     "fields.csv",
@@ -60,15 +221,38 @@ class GrowerInfo(BaseModel):
 
 
 
+class GeometryCompaction(BaseModel):
+    """
+    Per-export geometry compaction. tolerance_m drives Douglas-Peucker
+    simplification (0 = off), precision rounds coordinates to that many
+    decimals (6 ~ 0.1 m). A ring whose area would change by more than
+    max_area_change (fraction) is simplified less or left alone.
+    """
+    tolerance_m: float = Field(0.0, ge=0)
+    precision: Optional[int] = Field(None, ge=0, le=15)
+    max_area_change: float = 0.005
+    minify: bool = True
+
+
 class CheckoutStartRequest(BaseModel):
     grower: GrowerInfo
     program_type: str  # "REMOTE_ONLY" / "SPRAYER_PLUS_REMOTE" etc.
     fields: List[dict]
+    # Keyed by export: "fields_geojson" (combined) / "fields_geojson_dir"
+    geometry_compaction: Optional[Dict[str, GeometryCompaction]] = None
+
+
+class FieldOverlap(BaseModel):
+    field_id: Optional[str] = None
+    name: str = ""
+    overlaps: List[dict]
 
 
 class CheckoutStartResponse(BaseModel):
     quote_id: str
     message: str
+    geometry_compaction: Optional[dict] = None
+    overlaps: Optional[List[FieldOverlap]] = None
 
 
 class OrderSummary(BaseModel):
@@ -82,6 +266,11 @@ class OrderSummary(BaseModel):
     status: str
 
 
+class OrderPage(BaseModel):
+    orders: List[OrderSummary]
+    next_cursor: Optional[str] = None
+
+
 class OrderDetail(BaseModel):
     quote_id: str
     grower: GrowerInfo
@@ -90,12 +279,62 @@ class OrderDetail(BaseModel):
     created_at: str
     exports: dict
     status: str
+    geometry_compaction: Optional[dict] = None
 
 
 class StatusUpdate(BaseModel):
     status: str
 
 
+class OrderFilter(BaseModel):
+    """
+    Same filters as GET /orders.
+    """
+    status: Optional[str] = None
+    program_type: Optional[str] = None
+    created_from: Optional[str] = None
+    created_to: Optional[str] = None
+    search: Optional[str] = None
+
+
+class BulkSelection(BaseModel):
+    # Either explicit IDs or a (non-empty) filter
+    quote_ids: Optional[List[str]] = None
+    filter: Optional[OrderFilter] = None
+
+
+class BulkStatusUpdate(BulkSelection):
+    status: str
+
+
+class BulkItemResult(BaseModel):
+    quote_id: str
+    ok: bool
+    error: Optional[str] = None
+    previous_status: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    results: List[BulkItemResult]
+    succeeded: int
+    failed: int
+
+
+class OrderEvent(BaseModel):
+    seq: int
+    ts: float
+    type: str  # "created" / "status" / "deleted"
+    quote_id: str
+    data: dict
+
+
+class OrderChanges(BaseModel):
+    events: List[OrderEvent]
+    cursor: int
+    # The journal is behind `since` (e.g. it was reset): reload the listing
+    reset: bool = False
+
+
 # -------------------------------------------------------------------
 # Helpers: saving checkout + exports
 # -------------------------------------------------------------------
@@ -122,27 +361,8 @@ def write_client_csv(order_dir: Path, quote_id: str, payload: CheckoutStartReque
             annual = 0.0
         total_annual += annual
 
-    headers = [
-        "quote_id",
-        "grower_name",
-        "grower_email",
-        "farm_name",
-        "phone",
-        "notes",
-        "address1",
-        "address2",
-        "city",
-        "state",
-        "postal_code",
-        "country",
-        "program_type",
-        "field_count",
-        "total_acres",
-        "total_annual_cost",
-    ]
-
     with csv_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
+        writer = csv.DictWriter(f, fieldnames=CLIENT_CSV_HEADERS)
         writer.writeheader()
         writer.writerow({
             "quote_id": quote_id,
@@ -167,20 +387,9 @@ def write_client_csv(order_dir: Path, quote_id: str, payload: CheckoutStartReque
 def write_fields_csv(order_dir: Path, quote_id: str, payload: CheckoutStartRequest) -> None:
     csv_path = order_dir / "fields.csv"
     g = payload.grower
-    headers = [
-        "quote_id",
-        "field_id",
-        "name",
-        "acres",
-        "crop_program",
-        "notes",
-        "annual_cost",
-        "program_type",
-        "grower_name",
-    ]
 
     with csv_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
+        writer = csv.DictWriter(f, fieldnames=FIELDS_CSV_HEADERS)
         writer.writeheader()
 
         for field in payload.fields or []:
@@ -197,20 +406,64 @@ def write_fields_csv(order_dir: Path, quote_id: str, payload: CheckoutStartReque
             })
 
 
-def write_fields_geojson(order_dir: Path, payload: CheckoutStartRequest) -> None:
+def compact_features(features: List[dict], options: Optional[GeometryCompaction]):
+    """
+    (features, report) after applying one export's compaction settings.
+    With no options the features come back unchanged and report is None.
+    """
+    if options is None or (options.tolerance_m <= 0 and options.precision is None):
+        return features, None
+
+    compacted = [
+        compact_geometry(
+            feature,
+            tolerance_m=options.tolerance_m,
+            precision=options.precision,
+            max_area_change=options.max_area_change,
+        )
+        for feature in features
+    ]
+    return compacted, compaction_report(features, compacted)
+
+
+def dump_geojson(obj: dict, f, options: Optional[GeometryCompaction]) -> None:
+    if options is not None and options.minify:
+        json.dump(obj, f, separators=(",", ":"))
+    else:
+        json.dump(obj, f, indent=2)
+
+
+def write_fields_geojson(
+    order_dir: Path,
+    payload: CheckoutStartRequest,
+    compaction: Optional[Dict[str, GeometryCompaction]] = None,
+    compact: bool = COMPACT_STORAGE,
+) -> Optional[dict]:
     """
     Geometry-focused export.
     - Writes a combined fields.geojson (all fields)
     - Writes one GeoJSON per field under fields_geojson/
+
+    `compaction` maps an export name ("fields_geojson" or
+    "fields_geojson_dir") to its simplification/quantization settings.
+    Returns a size/acreage report per compacted export, or None.
+
+    With `compact` storage fields.geojson is minified (and possibly
+    gzipped). With PER_FIELD_CONTAINER the per-field files go into a
+    single container (see app/field_store.py) instead of fields_geojson/;
+    compact orders always get one, since it's what makes reading a single
+    field a seek rather than a pass over the gzipped fields.geojson.
+    Without the container, compact orders only write per-field files
+    when they're compacted differently; otherwise the packet builder
+    generates them.
     """
+    compaction = compaction or {}
     fields = payload.fields or []
     if not fields:
-        return
-
-    fields_dir = order_dir / "fields_geojson"
-    fields_dir.mkdir(exist_ok=True)
+        return None
 
     all_features = []
+    field_ids = []
 
     for field in fields:
         geom_feature = field.get("geometry")
@@ -238,162 +491,356 @@ def write_fields_geojson(order_dir: Path, payload: CheckoutStartRequest) -> None
         })
 
         all_features.append(feature)
-
-        # Write single-field GeoJSON
-        single_fc = {
-            "type": "FeatureCollection",
-            "features": [feature],
-        }
-        field_id = field.get("id") or "field"
-        per_path = fields_dir / f"{field_id}.geojson"
-        with per_path.open("w", encoding="utf-8") as f:
-            json.dump(single_fc, f, indent=2)
+        field_ids.append(field.get("id") or "field")
+
+    report = {}
+
+    # Write single-field GeoJSON
+    per_options = compaction.get("fields_geojson_dir")
+    if not compact or per_options is not None or PER_FIELD_CONTAINER:
+        per_features, per_report = compact_features(all_features, per_options)
+        if per_report:
+            report["fields_geojson_dir"] = per_report
+
+        if PER_FIELD_CONTAINER:
+            # One container + offset index instead of a file per field
+            FieldContainer(order_dir).write_all([
+                (field_id, json.dumps(
+                    {"type": "FeatureCollection", "features": [feature]},
+                    separators=(",", ":"),
+                ).encode("utf-8"))
+                for field_id, feature in zip(field_ids, per_features)
+            ])
+        else:
+            fields_dir = order_dir / "fields_geojson"
+            fields_dir.mkdir(exist_ok=True)
+            for field_id, feature in zip(field_ids, per_features):
+                single_fc = {
+                    "type": "FeatureCollection",
+                    "features": [feature],
+                }
+                per_path = fields_dir / f"{field_id}.geojson"
+                with per_path.open("w", encoding="utf-8") as f:
+                    dump_geojson(single_fc, f, per_options)
 
     # Write combined GeoJSON (all fields)
     if all_features:
+        combined_options = compaction.get("fields_geojson")
+        combined_features, combined_report = compact_features(all_features, combined_options)
+        if combined_report:
+            report["fields_geojson"] = combined_report
+
         geojson_obj = {
             "type": "FeatureCollection",
-            "features": all_features,
+            "features": combined_features,
         }
-        geojson_path = order_dir / "fields.geojson"
-        with geojson_path.open("w", encoding="utf-8") as f:
-            json.dump(geojson_obj, f, indent=2)
+        if compact:
+            write_stored_json(order_dir, GEOMETRY_STORE_FILENAME, geojson_obj, compact=True)
+        else:
+            geojson_path = order_dir / GEOMETRY_STORE_FILENAME
+            with geojson_path.open("w", encoding="utf-8") as f:
+                dump_geojson(geojson_obj, f, combined_options)
 
+    return report or None
 
-def save_checkout_start(quote_id: str, payload: CheckoutStartRequest) -> None:
-    ORDERS_ROOT.mkdir(exist_ok=True)
-    order_dir = ORDERS_ROOT / quote_id
-    order_dir.mkdir(exist_ok=True)
 
-    # 1) Raw JSON snapshot
-    out_path = order_dir / "checkout_start.json"
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(payload.dict(), f, indent=2)
+def apply_geometry_acres(payload: CheckoutStartRequest) -> None:
+    """
+    Overwrite client acres with server-side geodesic acreage for fields
+    whose geometry can be measured. The browser's value is kept as
+    client_acres, and annualCost is re-derived from the new acreage.
+    """
+    fields = [f for f in payload.fields or [] if isinstance(f, dict) and f.get("geometry")]
+    if not fields:
+        return
+
+    per_acre_rate, _ = program_rates(payload.program_type)
+    for field, acres in zip(fields, field_acres([f["geometry"] for f in fields])):
+        if acres is None:
+            continue
+        field["client_acres"] = field.get("acres")
+        field["acres"] = acres
+        field["annualCost"] = acres * per_acre_rate
+
+
+def check_field_geometries(payload: CheckoutStartRequest) -> None:
+    """
+    Reject fields with out-of-range coordinates or an implausible size
+    before anything is stored or indexed.
+    """
+    for f in payload.fields or []:
+        if not isinstance(f, dict) or not f.get("geometry"):
+            continue
+        problem = geometry_problem(f["geometry"])
+        if problem:
+            label = f.get("name") or f.get("id") or "field"
+            raise HTTPException(status_code=400, detail=f"Invalid geometry for {label}: {problem}")
+
+
+def index_features(payload: CheckoutStartRequest) -> List[dict]:
+    return [
+        {
+            "type": "Feature",
+            "properties": {"field_id": f.get("id", ""), "name": f.get("name", "")},
+            "geometry": unwrap_geometry(f.get("geometry")),
+        }
+        for f in payload.fields or []
+        if isinstance(f, dict) and f.get("geometry")
+    ]
+
+
+def find_field_overlaps(payload: CheckoutStartRequest) -> List[FieldOverlap]:
+    """
+    Fields of this checkout whose area overlaps a field of an existing
+    order. Fields that only share a boundary aren't reported.
+    """
+    results = []
+    statuses: Dict[str, str] = {}
+    for feature in index_features(payload):
+        hits = FIELD_INDEX.overlapping(feature["geometry"])
+        if not hits:
+            continue
+        overlaps = []
+        for hit in hits:
+            if hit.quote_id not in statuses:
+                statuses[hit.quote_id] = read_status(order_path(hit.quote_id))
+            overlaps.append({
+                "quote_id": hit.quote_id,
+                "field_id": hit.field_id,
+                "name": hit.name,
+                "status": statuses[hit.quote_id],
+            })
+        props = feature["properties"]
+        results.append(FieldOverlap(
+            field_id=props["field_id"] or None,
+            name=props["name"] or "",
+            overlaps=overlaps,
+        ))
+    return results
 
-    # 2–4) Exports
-    write_client_csv(order_dir, quote_id, payload)
-    write_fields_csv(order_dir, quote_id, payload)
-    write_fields_geojson(order_dir, payload)
 
-    # 5) Initialize status if not present
+def write_initial_status(order_dir: Path) -> None:
     status_path = order_dir / STATUS_FILENAME
     if not status_path.exists():
         status_path.write_text("Quoted", encoding="utf-8")
 
 
+def save_checkout_start(quote_id: str, payload: CheckoutStartRequest) -> Optional[dict]:
+    """
+    Writes every export for an order through the staged export pipeline:
+    writers run in parallel into a staging folder that is renamed into
+    place only once all of them succeed.
+    """
+    ORDERS_ROOT.mkdir(exist_ok=True)
+    order_dir = order_path(quote_id)
+
+    # Snapshot first: write_fields_geojson annotates feature properties
+    snapshot = payload.dict()
+    compaction = {**DEFAULT_GEOMETRY_COMPACTION, **(payload.geometry_compaction or {})}
+    # The snapshot can only point at fields.geojson if it holds the exact geometry
+    geometry_refs = "fields_geojson" not in compaction
+
+    def write_geojson(staging_dir: Path) -> Optional[dict]:
+        result = write_fields_geojson(staging_dir, payload, compaction)
+        if result:
+            (staging_dir / GEOMETRY_COMPACTION_FILENAME).write_text(
+                json.dumps(result, indent=2), encoding="utf-8"
+            )
+        return result
+
+    results = run_export_pipeline(
+        order_dir,
+        [
+            (SNAPSHOT_FILENAME, lambda d: write_snapshot(d, snapshot, geometry_refs=geometry_refs)),
+            ("client_info.csv", lambda d: write_client_csv(d, quote_id, payload)),
+            ("fields.csv", lambda d: write_fields_csv(d, quote_id, payload)),
+            ("fields.geojson", write_geojson),
+            (STATUS_FILENAME, write_initial_status),
+        ],
+        # Re-saving an existing order keeps its status
+        carry_over=(STATUS_FILENAME,),
+        operation="checkout",
+    )
+
+    # Keep the listing index in sync
+    with time_stage("checkout", "order_index"):
+        row = read_order_row(order_dir)
+        if row is not None:
+            ORDER_INDEX.upsert(row)
+
+    with time_stage("checkout", "journal"):
+        ORDER_EVENTS.append(EVENT_CREATED, quote_id, summary_from_row(row).dict() if row else None)
+
+    return results["fields.geojson"]
+
+
 # -------------------------------------------------------------------
 # Helpers: order listing & detail
 # -------------------------------------------------------------------
 
 
 def read_status(order_dir: Path) -> str:
-    status_path = order_dir / STATUS_FILENAME
-    if status_path.exists():
-        text = status_path.read_text(encoding="utf-8").strip()
-        return text or "Quoted"
-    return "Quoted"
+    return read_status_file(order_dir)
 
 
-def write_status(order_dir: Path, status: str) -> None:
+def write_status_file(order_dir: Path, status: str) -> str:
+    """
+    Write an order's status file only (no index or journal update).
+    Returns the status it replaced.
+    """
+    previous = read_status_file(order_dir)
     status_path = order_dir / STATUS_FILENAME
     status_path.write_text(status, encoding="utf-8")
+    return previous
 
 
-def build_order_summaries() -> List[OrderSummary]:
-    summaries: List[OrderSummary] = []
-
-    if not ORDERS_ROOT.exists():
-        return summaries
-
-    for order_dir in ORDERS_ROOT.iterdir():
-        if not order_dir.is_dir():
-            continue
+def write_status(order_dir: Path, status: str) -> None:
+    previous = write_status_file(order_dir, status)
+    ORDER_INDEX.set_status(order_dir.name, status)
+    if status != previous:
+        ORDER_EVENTS.append(EVENT_STATUS, order_dir.name, {"from": previous, "to": status})
+
+
+def summary_from_row(row: dict) -> OrderSummary:
+    return OrderSummary(
+        quote_id=row["quote_id"],
+        grower_name=row["grower_name"],
+        program_type=row["program_type"],
+        field_count=row["field_count"],
+        total_acres=row["total_acres"],
+        total_annual_cost=row["total_annual_cost"],
+        created_at=datetime.fromtimestamp(row["created_at"]).isoformat(),
+        status=row["status"],
+    )
 
-        client_csv = order_dir / "client_info.csv"
-        if not client_csv.exists():
-            continue
 
-        try:
-            with client_csv.open(newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                row = next(reader, None)
-        except Exception:
-            continue
+def encode_cursor(sort: str, row: dict) -> str:
+    raw = json.dumps([sort, row[sort], row["quote_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
 
-        if not row:
-            continue
 
-        quote_id = row.get("quote_id") or order_dir.name
-        grower_name = row.get("grower_name") or ""
-        program_type = row.get("program_type") or ""
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, quote_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if cursor_sort != sort or not isinstance(quote_id, str):
+        raise HTTPException(status_code=400, detail="Cursor does not match sort")
+
+    # The value is compared against the sort column in SQL, so it must
+    # have that column's type (bools are ints to isinstance)
+    if sort in TEXT_SORT_COLUMNS:
+        valid = isinstance(value, str)
+    else:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, quote_id
+
+
+def parse_date_param(value: Optional[str], name: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected ISO date")
+
+
+def build_order_page(
+    limit: int = ORDERS_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    descending: bool = True,
+    status: Optional[str] = None,
+    program_type: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    search: Optional[str] = None,
+) -> OrderPage:
+    """
+    One page of orders. Filtering, sorting and the keyset cursor are all
+    applied inside the index, so a page costs the same at any order count.
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+
+    # Fetch one extra row to know whether another page exists
+    rows = ORDER_INDEX.query_rows(
+        limit=limit + 1,
+        sort=sort,
+        descending=descending,
+        after=after,
+        status=status,
+        program_type=program_type,
+        created_from=parse_date_param(created_from, "created_from"),
+        created_to=parse_date_param(created_to, "created_to"),
+        search=search,
+    )
 
-        try:
-            field_count = int(row.get("field_count") or 0)
-        except ValueError:
-            field_count = 0
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1])
 
-        try:
-            total_acres = float(row.get("total_acres") or 0)
-        except ValueError:
-            total_acres = 0.0
+    return OrderPage(
+        orders=[summary_from_row(row) for row in rows],
+        next_cursor=next_cursor,
+    )
 
-        try:
-            total_annual_cost = float(row.get("total_annual_cost") or 0)
-        except ValueError:
-            total_annual_cost = 0.0
-
-        created_at = datetime.fromtimestamp(order_dir.stat().st_mtime).isoformat()
-        status = read_status(order_dir)
-
-        summaries.append(
-            OrderSummary(
-                quote_id=quote_id,
-                grower_name=grower_name,
-                program_type=program_type,
-                field_count=field_count,
-                total_acres=total_acres,
-                total_annual_cost=total_annual_cost,
-                created_at=created_at,
-                status=status,
-            )
-        )
 
-    summaries.sort(key=lambda s: s.created_at, reverse=True)
-    return summaries
+DETAIL_EXPORT_FILES = {
+    "client_info_csv": "client_info.csv",
+    "fields_csv": "fields.csv",
+    "fields_geojson": GEOMETRY_STORE_FILENAME,
+    "fields_geojson_dir": "fields_geojson",
+    "fields_geojson_container": CONTAINER_FILENAME,
+    "onboarding_zip": "onboarding_packet.zip",
+}
 
 
-def build_order_detail(quote_id: str) -> OrderDetail:
-    order_dir = ORDERS_ROOT / quote_id
+def build_order_detail(
+    quote_id: str,
+    compaction: Optional[GeometryCompaction] = None,
+) -> OrderDetail:
+    order_dir = order_path(quote_id)
     if not order_dir.exists() or not order_dir.is_dir():
         raise HTTPException(status_code=404, detail="Order not found")
 
-    checkout_path = order_dir / "checkout_start.json"
-    if not checkout_path.exists():
+    if not has_snapshot(order_dir):
         raise HTTPException(status_code=500, detail="Order missing checkout_start.json")
 
-    with checkout_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_snapshot(order_dir)
 
     created_at = datetime.fromtimestamp(order_dir.stat().st_mtime).isoformat()
 
-    exports = {
-        "client_info_csv": str(order_dir / "client_info.csv"),
-        "fields_csv": str(order_dir / "fields.csv"),
-        "fields_geojson": str(order_dir / "fields.geojson"),
-        "fields_geojson_dir": str(order_dir / "fields_geojson"),
-        "onboarding_zip": str(order_dir / "onboarding_packet.zip"),
-    }
+    # Files as actually stored (plain or .gz); ones the order doesn't have are left out
+    exports = {}
+    for key, name in DETAIL_EXPORT_FILES.items():
+        path = stored_path(order_dir, name)
+        if path is not None:
+            exports[key] = str(path)
 
     status = read_status(order_dir)
 
+    fields = data.get("fields", [])
+    report = None
+    if compaction is not None:
+        with_geometry = [f for f in fields if isinstance(f, dict) and f.get("geometry")]
+        geometries, report = compact_features([f["geometry"] for f in with_geometry], compaction)
+        for f, geometry in zip(with_geometry, geometries):
+            f["geometry"] = geometry
+
     return OrderDetail(
         quote_id=quote_id,
         grower=data.get("grower", {}),
         program_type=data.get("program_type", ""),
-        fields=data.get("fields", []),
+        fields=fields,
         created_at=created_at,
         exports=exports,
         status=status,
+        geometry_compaction=report,
     )
 
 
@@ -402,38 +849,334 @@ def build_order_detail(quote_id: str) -> OrderDetail:
 # -------------------------------------------------------------------
 
 
+def quote_id_prefix(grower_name: str) -> str:
+    short_name = re.sub(r"[^A-Za-z0-9_-]+", "_", (grower_name or "").strip())[:12].strip("_")
+    return f"q_{short_name or 'grower'}_"
+
+
+def checkout_claim(payload: CheckoutStartRequest, idempotency_key: Optional[str]) -> Claim:
+    """
+    Claim this submission in CHECKOUT_KEYS, keyed by the Idempotency-Key
+    header or else by a hash of the body (see app/checkout_keys.py).
+    """
+    body_hash = payload_hash(payload.dict())
+    if idempotency_key is not None:
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        key, ttl_s = f"key:{idempotency_key}", IDEMPOTENCY_KEY_TTL_S
+    else:
+        key, ttl_s = f"payload:{body_hash}", PAYLOAD_KEY_TTL_S
+
+    prefix = quote_id_prefix(payload.grower.name)
+
+    def new_quote_id(number: int) -> Optional[str]:
+        quote_id = f"{prefix}{number}"
+        return None if order_path(quote_id).exists() else quote_id
+
+    try:
+        return CHECKOUT_KEYS.claim(key, body_hash, ttl_s, new_quote_id)
+    except KeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different checkout")
+
+
+def replayed_checkout(claim: Claim) -> JSONResponse:
+    return JSONResponse(content=claim.response, headers={"Idempotent-Replayed": "true"})
+
+
 @router.post("/checkout/start", response_model=CheckoutStartResponse)
-def checkout_start(payload: CheckoutStartRequest):
+@limited("checkout")
+def checkout_start(
+    payload: CheckoutStartRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """
+    Save a new order. Retrying with the same Idempotency-Key (or, without
+    one, the same body) returns the original response with an
+    Idempotent-Replayed header instead of creating another order.
+    """
     if not payload.fields:
         raise HTTPException(status_code=400, detail="At least one field is required")
+    check_field_geometries(payload)
+
+    with time_stage("checkout", "claim"):
+        claim = checkout_claim(payload, idempotency_key)
+        if not claim.owner and claim.response is None:
+            # The same submission is still being saved by another request
+            finished = CHECKOUT_KEYS.wait(claim, CHECKOUT_RETRY_WAIT_S)
+            if finished is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="This checkout is still being processed, retry shortly",
+                    headers={"Retry-After": "2"},
+                )
+            claim = finished
+        if not claim.owner:
+            if order_path(claim.quote_id).is_dir():
+                return replayed_checkout(claim)
+            # Deleted since: treat the retry as a new submission
+            CHECKOUT_KEYS.release(claim)
+            claim = checkout_claim(payload, idempotency_key)
+            if not claim.owner:
+                return replayed_checkout(claim)
+
+    quote_id = claim.quote_id
+    try:
+        if AUTHORITATIVE_ACREAGE:
+            with time_stage("checkout", "acreage"):
+                apply_geometry_acres(payload)
+
+        # Check against existing orders before this one is indexed
+        with time_stage("checkout", "overlaps"):
+            overlaps = find_field_overlaps(payload)
+
+        compaction_result = save_checkout_start(quote_id, payload)
+        with time_stage("checkout", "field_index"):
+            TILE_CACHE.invalidate(FIELD_INDEX.index_order(quote_id, index_features(payload)))
+
+        response = CheckoutStartResponse(
+            quote_id=quote_id,
+            message="Checkout draft saved. Next step: start payment session.",
+            geometry_compaction=compaction_result,
+            overlaps=overlaps or None,
+        )
+    except BaseException:
+        CHECKOUT_KEYS.release(claim)
+        raise
+
+    CHECKOUT_KEYS.complete(claim, jsonable_encoder(response))
+    return response
+
+
+@router.get("/orders", response_model=OrderPage)
+def list_orders(
+    limit: int = Query(ORDERS_PAGE_DEFAULT, ge=1, le=ORDERS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    sort: OrderSortKey = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    status: Optional[str] = None,
+    program_type: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    search: Optional[str] = None,
+):
+    """
+    Paginated order listing. Pass back `next_cursor` as `cursor` to get the
+    following page; `created_from` is inclusive, `created_to` exclusive.
+    """
+    return build_order_page(
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        descending=(order == "desc"),
+        status=status,
+        program_type=program_type,
+        created_from=created_from,
+        created_to=created_to,
+        search=search,
+    )
 
-    ts = int(time.time())
-    short_name = (payload.grower.name or "grower").strip().replace(" ", "_")[:12]
-    quote_id = f"q_{short_name}_{ts}"
 
-    save_checkout_start(quote_id, payload)
+@router.get("/orders/changes", response_model=OrderChanges)
+async def order_changes(
+    since: Optional[int] = Query(None, ge=0),
+    timeout: float = Query(25.0, ge=0, le=CHANGES_WAIT_MAX_S),
+    limit: int = Query(CHANGES_PAGE_MAX, ge=1, le=CHANGES_PAGE_MAX),
+):
+    """
+    Long-poll change feed (see app/order_events.py). Without `since`, returns
+    the current cursor at once: take it before loading GET /orders. With it,
+    returns the events after it as soon as there are any, or none after
+    `timeout` seconds. Pass back `cursor` as `since`.
+    """
+    head = await run_in_threadpool(ORDER_EVENTS.latest_seq)
+    if since is None:
+        return OrderChanges(events=[], cursor=head)
+    if since > head:
+        return OrderChanges(events=[], cursor=head, reset=True)
 
-    return CheckoutStartResponse(
-        quote_id=quote_id,
-        message="Checkout draft saved. Next step: start payment session.",
+    events = await ORDER_EVENTS.wait_since(since, limit, timeout)
+    return OrderChanges(events=events, cursor=events[-1]["seq"] if events else since)
+
+
+def sse_message(event: str, data: str, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {data}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/orders/changes/stream")
+async def order_changes_stream(request: Request, since: Optional[int] = Query(None, ge=0)):
+    """
+    The change feed as Server-Sent Events, one SSE event per journal event
+    (id = seq, event = type). Starts after `since`, or from now; a
+    reconnecting EventSource resumes from its Last-Event-ID.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    head = await run_in_threadpool(ORDER_EVENTS.latest_seq)
+
+    async def stream():
+        cursor = head if since is None else since
+        if cursor > head:
+            cursor = head
+            yield sse_message("reset", json.dumps({"cursor": head}), head)
+        while not await request.is_disconnected():
+            events = await ORDER_EVENTS.wait_since(cursor, CHANGES_PAGE_MAX, CHANGES_HEARTBEAT_S)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                yield sse_message(event["type"], json.dumps(event, separators=(",", ":")), event["seq"])
+            cursor = events[-1]["seq"]
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
-@router.get("/orders", response_model=List[OrderSummary])
-def list_orders():
-    return build_order_summaries()
+@router.get("/orders/{quote_id}/history")
+def get_order_history(quote_id: str):
+    """
+    Every journaled event of one order, oldest first: its checkout, each
+    status transition and its deletion. Orders placed before the journal
+    existed only have the events since.
+    """
+    events = ORDER_EVENTS.history(quote_id)
+    if not events and not order_path(quote_id).is_dir():
+        raise HTTPException(status_code=404, detail="Order not found")
+    return {"quote_id": quote_id, "events": events}
+
+
+def bulk_quote_ids(selection: BulkSelection) -> List[str]:
+    """
+    The orders a bulk request applies to, without duplicates: its
+    quote_ids as given, or every indexed order matching its filter.
+    """
+    if (selection.quote_ids is None) == (selection.filter is None):
+        raise HTTPException(status_code=400, detail="Pass either quote_ids or filter")
+
+    if selection.quote_ids is not None:
+        quote_ids = list(dict.fromkeys(selection.quote_ids))
+    else:
+        f = selection.filter
+        if not any(f.dict().values()):
+            raise HTTPException(status_code=400, detail="Filter must set at least one criterion")
+        rows = ORDER_INDEX.iter_rows(
+            status=f.status,
+            program_type=f.program_type,
+            created_from=parse_date_param(f.created_from, "created_from"),
+            created_to=parse_date_param(f.created_to, "created_to"),
+            search=f.search,
+        )
+        quote_ids = [row["quote_id"] for row in itertools.islice(rows, BULK_MAX_ORDERS + 1)]
+
+    if len(quote_ids) > BULK_MAX_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ORDERS} orders per request")
+    return quote_ids
+
+
+def bulk_result(results: List[BulkItemResult]) -> BulkResult:
+    succeeded = sum(1 for r in results if r.ok)
+    return BulkResult(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+
+@router.post("/orders/bulk/status", response_model=BulkResult)
+@limited("bulk_orders")
+def bulk_update_order_status(payload: BulkStatusUpdate):
+    """
+    Set one status on many orders. The status files are written one by
+    one; the index update and the journal events are one transaction each.
+    """
+    if payload.status not in ALLOWED_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+
+    results: List[BulkItemResult] = []
+    transitions = []
+    for quote_id in bulk_quote_ids(payload):
+        order_dir = find_order_path(quote_id)
+        if order_dir is None or not order_dir.is_dir():
+            results.append(BulkItemResult(quote_id=quote_id, ok=False, error="Order not found"))
+            continue
+        try:
+            previous = write_status_file(order_dir, payload.status)
+        except OSError as e:
+            results.append(BulkItemResult(quote_id=quote_id, ok=False, error=f"Failed to write status: {e}"))
+            continue
+        results.append(BulkItemResult(quote_id=quote_id, ok=True, previous_status=previous))
+        if previous != payload.status:
+            transitions.append((EVENT_STATUS, quote_id, {"from": previous, "to": payload.status}))
+
+    ORDER_INDEX.set_status_many([r.quote_id for r in results if r.ok], payload.status)
+    ORDER_EVENTS.append_many(transitions)
+    return bulk_result(results)
+
+
+@router.post("/orders/bulk/delete", response_model=BulkResult)
+@limited("bulk_orders")
+def bulk_delete_orders(payload: BulkSelection):
+    """
+    Permanently delete many orders. The folders are removed one by one;
+    index, field index, map tiles and journal are updated once at the end.
+    """
+    results: List[BulkItemResult] = []
+    for quote_id in bulk_quote_ids(payload):
+        order_dir = find_order_path(quote_id)
+        if order_dir is None or not order_dir.is_dir():
+            results.append(BulkItemResult(quote_id=quote_id, ok=False, error="Order not found"))
+            continue
+        try:
+            shutil.rmtree(order_dir)
+        except Exception as e:
+            results.append(BulkItemResult(quote_id=quote_id, ok=False, error=f"Failed to delete order: {e}"))
+            continue
+        results.append(BulkItemResult(quote_id=quote_id, ok=True))
+
+    deleted = [r.quote_id for r in results if r.ok]
+    ORDER_INDEX.delete_many(deleted)
+    bboxes = []
+    for quote_id in deleted:
+        bboxes.extend(FIELD_INDEX.remove_order(quote_id))
+    TILE_CACHE.invalidate(bboxes)
+    ORDER_EVENTS.append_many([(EVENT_DELETED, quote_id, None) for quote_id in deleted])
+    return bulk_result(results)
+
+
+def compaction_from_query(
+    simplify_m: Optional[float],
+    precision: Optional[int],
+) -> Optional[GeometryCompaction]:
+    if not simplify_m and precision is None:
+        return None
+    return GeometryCompaction(tolerance_m=simplify_m or 0.0, precision=precision)
 
 
 @router.get("/orders/{quote_id}", response_model=OrderDetail)
-def get_order_detail(quote_id: str):
-    return build_order_detail(quote_id)
+@limited("files")
+def get_order_detail(
+    quote_id: str,
+    simplify_m: Optional[float] = Query(None, ge=0),
+    precision: Optional[int] = Query(None, ge=0, le=15),
+):
+    """
+    Order detail. simplify_m / precision compact the field geometry in
+    the response only; the stored order is not changed.
+    """
+    return build_order_detail(quote_id, compaction_from_query(simplify_m, precision))
 
 @router.delete("/orders/{quote_id}")
+@limited("delete")
 def delete_order(quote_id: str):
     """
     Permanently delete an order folder and all its exports.
     """
-    order_dir = ORDERS_ROOT / quote_id
+    order_dir = order_path(quote_id)
     if not order_dir.exists() or not order_dir.is_dir():
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -442,12 +1185,15 @@ def delete_order(quote_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete order: {e}")
 
+    ORDER_INDEX.delete(quote_id)
+    TILE_CACHE.invalidate(FIELD_INDEX.remove_order(quote_id))
+    ORDER_EVENTS.append(EVENT_DELETED, quote_id)
     return {"quote_id": quote_id, "deleted": True}
 
 
 @router.get("/orders/{quote_id}/status")
 def get_order_status(quote_id: str):
-    order_dir = ORDERS_ROOT / quote_id
+    order_dir = order_path(quote_id)
     if not order_dir.exists():
         raise HTTPException(status_code=404, detail="Order not found")
     return {"quote_id": quote_id, "status": read_status(order_dir)}
@@ -458,7 +1204,7 @@ def update_order_status(quote_id: str, payload: StatusUpdate):
     if payload.status not in ALLOWED_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
 
-    order_dir = ORDERS_ROOT / quote_id
+    order_dir = order_path(quote_id)
     if not order_dir.exists():
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -467,18 +1213,54 @@ def update_order_status(quote_id: str, payload: StatusUpdate):
 
 
 @router.get("/orders/{quote_id}/download/{filename}")
-def download_export(quote_id: str, filename: str):
+@limited("files")
+def download_export(
+    request: Request,
+    quote_id: str,
+    filename: str,
+    simplify_m: Optional[float] = Query(None, ge=0),
+    precision: Optional[int] = Query(None, ge=0, le=15),
+):
     if filename not in VALID_EXPORT_FILES:
         raise HTTPException(status_code=400, detail="Invalid export filename")
 
-    order_dir = ORDERS_ROOT / quote_id
+    order_dir = order_path(quote_id)
     if not order_dir.exists() or not order_dir.is_dir():
         raise HTTPException(status_code=404, detail="Order not found")
 
-    file_path = order_dir / filename
-    if not file_path.exists():
+    file_path = stored_path(order_dir, filename)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="File not found")
 
+    compaction = compaction_from_query(simplify_m, precision)
+    if compaction is not None and filename == "fields.geojson":
+        fc = read_stored_json(order_dir, filename)
+        features, report = compact_features(fc.get("features", []), compaction)
+        return Response(
+            content=json.dumps(dict(fc, features=features), separators=(",", ":")),
+            media_type="application/geo+json",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Geometry-Compaction": json.dumps(report, separators=(",", ":")),
+            },
+        )
+
+    if is_compressed(file_path):
+        # Compact storage: hand the gzip bytes over untouched when the
+        # client accepts them, otherwise decompress while streaming
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            return FileResponse(
+                path=file_path,
+                filename=filename,
+                media_type="application/octet-stream",
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+            )
+        return StreamingResponse(
+            limited_stream(iter_stored_chunks(order_dir, filename)),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
     return FileResponse(
         path=file_path,
         filename=filename,
@@ -486,26 +1268,56 @@ def download_export(quote_id: str, filename: str):
     )
 
 
-@router.post("/orders/{quote_id}/onboarding")
-def generate_onboarding_packet(quote_id: str):
+def iter_stored_chunks(order_dir: Path, name: str, chunk_size: int = 64 * 1024):
+    with open_stored(order_dir, name) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def read_field_geojson(order_dir: Path, field_id: str) -> Optional[bytes]:
     """
-    Build an onboarding packet ZIP for this order.
+    One field's GeoJSON: a seek into the field container when the order has
+    one, else the legacy per-field file, else its feature in fields.geojson.
     """
-    order_dir = ORDERS_ROOT / quote_id
+    container = FieldContainer(order_dir)
+    if container.exists():
+        return container.get(field_id)
+
+    fg_dir = order_dir / "fields_geojson"
+    if fg_dir.is_dir():
+        path = fg_dir / f"{field_id}.geojson"
+        # Reject ids that would resolve outside the folder
+        if path.parent == fg_dir and path.is_file():
+            return path.read_bytes()
+        return None
+
+    for feature in load_geometry_store(order_dir):
+        if str((feature.get("properties") or {}).get("field_id") or "field") == field_id:
+            single_fc = {"type": "FeatureCollection", "features": [feature]}
+            return json.dumps(single_fc, separators=(",", ":")).encode("utf-8")
+    return None
+
+
+@router.get("/orders/{quote_id}/fields/{field_id}.geojson")
+@limited("files")
+def get_field_geojson(quote_id: str, field_id: str):
+    order_dir = order_path(quote_id)
     if not order_dir.exists() or not order_dir.is_dir():
         raise HTTPException(status_code=404, detail="Order not found")
 
-    checkout_path = order_dir / "checkout_start.json"
-    if not checkout_path.exists():
-        raise HTTPException(status_code=500, detail="Order missing checkout_start.json")
+    content = read_field_geojson(order_dir, field_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Field not found")
+    return Response(content=content, media_type="application/geo+json")
 
-    # Load base data
-    try:
-        with checkout_path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Failed to read checkout_start.json")
 
+PACKET_CORE_FILES = ["checkout_start.json", "client_info.csv", "fields.csv", "fields.geojson"]
+
+
+def build_summary_text(quote_id: str, data: dict) -> str:
     grower = data.get("grower", {})
     program_type = data.get("program_type", "")
     fields = data.get("fields", [])
@@ -543,30 +1355,259 @@ def generate_onboarding_packet(quote_id: str):
         "- fields_geojson/*.geojson",
         "- summary.txt",
     ]
+    return "\n".join(summary_lines)
 
-    summary_path = order_dir / "summary.txt"
-    summary_path.write_text("\n".join(summary_lines), encoding="utf-8")
 
-    # Create ZIP
-    zip_path = order_dir / "onboarding_packet.zip"
-    if zip_path.exists():
-        zip_path.unlink()
-
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        # Core files
-        for fname in ["checkout_start.json", "client_info.csv", "fields.csv", "fields.geojson", "summary.txt"]:
-            fp = order_dir / fname
-            if fp.exists():
-                zf.write(fp, arcname=fname)
+def packet_inputs(order_dir: Path) -> List[Path]:
+    """
+    Stored files a packet is built from. If none of them moved, the
+    packet can't have changed.
+    """
+    inputs = [stored_path(order_dir, fname) for fname in PACKET_CORE_FILES]
+    inputs.append(stored_path(order_dir, "summary.txt"))
 
-        # Per-field GeoJSONs
+    container = FieldContainer(order_dir)
+    if container.exists():
+        inputs.extend(container.files())
+    else:
         fg_dir = order_dir / "fields_geojson"
         if fg_dir.exists() and fg_dir.is_dir():
-            for child in fg_dir.iterdir():
-                if child.is_file():
-                    zf.write(child, arcname=f"fields_geojson/{child.name}")
+            inputs.extend(child for child in fg_dir.iterdir() if child.is_file())
+    return [p for p in inputs if p is not None]
+
+
+def packet_entries(quote_id: str, order_dir: Path, summary_path: Optional[Path] = None) -> Iterator[tuple]:
+    """
+    (source, arcname) for every packet member, where source is a Path or
+    the member's bytes. Orders in compact storage are expanded so the
+    packet looks the same either way: the snapshot gets its geometry back
+    and the per-field files are generated from fields.geojson.
+
+    The snapshot is read up front (RuntimeError if it can't be); the
+    members are produced lazily, one at a time, so a streamed packet
+    never holds more than one per-field record in memory.
+
+    summary.txt is written to `summary_path` when given (only if its
+    content changed, so its mtime keeps matching the packet manifest),
+    otherwise it's included as bytes.
+
+    Per-field files come from the field container, a legacy
+    fields_geojson/ folder, or fields.geojson, in that order.
+    """
+    try:
+        snapshot = read_stored_json(order_dir, SNAPSHOT_FILENAME)
+        store_features = None
+        if has_geometry_refs(snapshot):
+            store_features = load_geometry_store(order_dir)
+            resolve_geometry_refs(snapshot, store_features)
+    except Exception:
+        raise RuntimeError("Failed to read checkout_start.json")
+
+    return iter_packet_entries(quote_id, order_dir, snapshot, store_features, summary_path)
+
+
+def iter_packet_entries(
+    quote_id: str,
+    order_dir: Path,
+    snapshot: dict,
+    store_features: Optional[List[dict]],
+    summary_path: Optional[Path],
+) -> Iterator[tuple]:
+    for fname in PACKET_CORE_FILES:
+        fp = stored_path(order_dir, fname)
+        if fp is None:
+            continue
+        if fname == SNAPSHOT_FILENAME and store_features is not None:
+            yield json.dumps(snapshot, separators=(",", ":")).encode("utf-8"), fname
+        elif is_compressed(fp):
+            yield read_stored_bytes(order_dir, fname), fname
+        else:
+            yield fp, fname
+
+    with time_stage("packet", "summary"):
+        summary_text = build_summary_text(quote_id, snapshot)
+        if summary_path is not None and (
+            not summary_path.exists() or summary_path.read_text(encoding="utf-8") != summary_text
+        ):
+            summary_path.write_text(summary_text, encoding="utf-8")
+    if summary_path is None:
+        yield summary_text.encode("utf-8"), "summary.txt"
+    else:
+        yield summary_path, "summary.txt"
+
+    container = FieldContainer(order_dir)
+    fg_dir = order_dir / "fields_geojson"
+    if container.exists():
+        # Expand the container back into one member per field
+        for field_id, record in container.iter_records():
+            yield record, f"fields_geojson/{field_id}.geojson"
+    elif fg_dir.exists() and fg_dir.is_dir():
+        for child in fg_dir.iterdir():
+            if child.is_file():
+                yield child, f"fields_geojson/{child.name}"
+    else:
+        if store_features is None:
+            store_features = load_geometry_store(order_dir)
+        for feature in store_features:
+            field_id = (feature.get("properties") or {}).get("field_id") or "field"
+            single_fc = {"type": "FeatureCollection", "features": [feature]}
+            yield (
+                json.dumps(single_fc, separators=(",", ":")).encode("utf-8"),
+                f"fields_geojson/{field_id}.geojson",
+            )
+
+
+def build_onboarding_packet(quote_id: str, job: Optional[Job] = None) -> dict:
+    """
+    Build an onboarding packet ZIP for this order. Runs on the packet job
+    queue; reports per-file progress to `job` when given.
+
+    The existing ZIP is reused when no input changed since it was built,
+    and only changed members are recompressed otherwise (see
+    app/packet_cache.py).
+    """
+    order_dir = order_path(quote_id)
+    summary_path = order_dir / "summary.txt"
+    zip_path = order_dir / "onboarding_packet.zip"
+    compression = zipfile.ZIP_DEFLATED
+
+    result = {
+        "quote_id": quote_id,
+        "packet": "onboarding_packet.zip",
+    }
+
+    with time_stage("packet", "reuse_check"):
+        manifest = load_manifest(order_dir)
+        reusable = zip_matches_manifest(zip_path, manifest, compression)
+        # No stored file moved since the last build: skip parsing the
+        # (possibly large) snapshot altogether
+        unchanged = reusable and inputs_unchanged(manifest, input_stats(order_dir, packet_inputs(order_dir)))
+
+    if unchanged:
+        if job is not None:
+            job.report_progress(len(manifest["members"]), len(manifest["members"]))
+        return dict(result, reused=True, rebuilt_members=0, copied_members=0)
+
+    with time_stage("packet", "entries"):
+        # Listed once here: the members are read twice (diff, then zip)
+        members = list(packet_entries(quote_id, order_dir, summary_path))
+    with time_stage("packet", "diff"):
+        stats = input_stats(order_dir, packet_inputs(order_dir))
+        digests, changed = diff_members(order_dir, members, stats, manifest if reusable else None)
+
+    if reusable and not changed and set(digests) == set(manifest["members"]):
+        # Same content, refreshed mtimes: remember them to skip all reads next time
+        save_manifest(order_dir, dict(manifest, inputs=stats, members=digests))
+        if job is not None:
+            job.report_progress(len(members), len(members))
+        return dict(result, reused=True, rebuilt_members=0, copied_members=0)
+
+    # Create ZIP next to the final path and swap it in, so a download
+    # during a rebuild never sees a half-written archive
+    tmp_path = order_dir / ".onboarding_packet.zip.tmp"
+    changed_set = set(changed)
+    rebuilt = copied = 0
+
+    old_zf = zipfile.ZipFile(zip_path) if reusable else None
+    try:
+        with time_stage("packet", "zip"), zipfile.ZipFile(tmp_path, "w", compression) as zf:
+            for i, (source, arcname) in enumerate(members):
+                old_info = None
+                if old_zf is not None and arcname not in changed_set:
+                    old_info = old_zf.NameToInfo.get(arcname)
+                if old_info is not None and copy_raw_member(old_zf, old_info, zf):
+                    copied += 1
+                elif isinstance(source, Path):
+                    zf.write(source, arcname=arcname)
+                    rebuilt += 1
+                else:
+                    zf.writestr(arcname, source)
+                    rebuilt += 1
+                if job is not None:
+                    job.report_progress(i + 1, len(members))
+    finally:
+        if old_zf is not None:
+            old_zf.close()
+
+    with time_stage("packet", "publish"):
+        os.replace(tmp_path, zip_path)
+        save_manifest(order_dir, {
+            "version": MANIFEST_VERSION,
+            "compression": compression,
+            "zip": stat_entry(zip_path),
+            "inputs": stats,
+            "members": digests,
+        })
+
+    return dict(result, reused=False, rebuilt_members=rebuilt, copied_members=copied)
+
+
+@router.post("/orders/{quote_id}/onboarding", status_code=202)
+def generate_onboarding_packet(quote_id: str):
+    """
+    Queue an onboarding packet build and return its job immediately.
+    Poll GET /jobs/{job_id} for progress. A build already queued or
+    running for this order is returned instead of starting another.
+    """
+    order_dir = order_path(quote_id)
+    if not order_dir.exists() or not order_dir.is_dir():
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    if not has_snapshot(order_dir):
+        raise HTTPException(status_code=500, detail="Order missing checkout_start.json")
+
+    try:
+        job = PACKET_JOBS.submit(quote_id, lambda j: build_onboarding_packet(quote_id, j))
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many packet builds queued, retry shortly",
+            headers={"Retry-After": str(PACKET_JOBS_RETRY_AFTER_S)},
+        )
 
     return {
         "quote_id": quote_id,
         "packet": "onboarding_packet.zip",
+        "job_id": job.job_id,
+        "status": job.status,
     }
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = PACKET_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get("/orders/{quote_id}/onboarding/stream")
+@limited("packet")
+def stream_onboarding_packet(
+    quote_id: str,
+    compression: Literal["deflate", "stored"] = "deflate",
+):
+    """
+    Stream the onboarding packet as a ZIP built on the fly from the order
+    folder. Nothing is written to disk. Use compression=stored for
+    already-compact data on a fast LAN.
+    """
+    order_dir = order_path(quote_id)
+    if not order_dir.exists() or not order_dir.is_dir():
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    if not has_snapshot(order_dir):
+        raise HTTPException(status_code=500, detail="Order missing checkout_start.json")
+
+    try:
+        entries = packet_entries(quote_id, order_dir)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    method = zipfile.ZIP_STORED if compression == "stored" else zipfile.ZIP_DEFLATED
+
+    return StreamingResponse(
+        limited_stream(iter_zip_stream(entries, method)),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="onboarding_packet.zip"'},
+    )
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from .. import profiling
+
+router = APIRouter()
+
+
+@router.get("/admin/profiles")
+def list_profiles():
+    """
+    Stored request profiles, newest first (without the top-N summaries).
+    """
+    captures = []
+    for capture_id in profiling.capture_ids():
+        record = profiling.read_capture(capture_id)
+        if record is None:
+            continue
+        record.pop("summary", None)
+        captures.append(record)
+    return {
+        "enabled": profiling.PROFILING_ENABLED,
+        "header": profiling.PROFILE_HEADER,
+        "sample_rate": profiling.PROFILE_SAMPLE_RATE,
+        "max_captures": profiling.PROFILE_MAX_CAPTURES,
+        "captures": captures,
+    }
+
+
+@router.get("/admin/profiles/{capture_id}.prof")
+def download_profile(capture_id: str):
+    """
+    Raw cProfile output, for python -m pstats / snakeviz.
+    """
+    path = profiling.capture_path(capture_id, ".prof")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{capture_id}.prof")
+
+
+@router.get("/admin/profiles/{capture_id}")
+def get_profile(capture_id: str):
+    """
+    One capture: the request, its timing and the top-N functions by
+    cumulative time.
+    """
+    record = profiling.read_capture(capture_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
@@ -1,12 +1,33 @@
-from typing import List
+import json
+from typing import List, Optional
 
-from fastapi import APIRouter
-from pydantic import BaseModel
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 
-from ..models import ProgramType, FieldInput, Quote
+from ..batch_pricing import offsets_from_lengths, price_batch
+from ..geometry import field_acres
+from ..models import ProgramType, FieldInput, Quote, QuoteLine
 from ..pricing import calculate_quote
+from ..profiling import ProfiledRoute
+from ..quote_cache import QuoteCache, quote_cache_key
+from ..quote_sessions import (
+    SESSION_TTL_SECONDS,
+    QuoteSession,
+    QuoteSessionStore,
+    SessionFull,
+    SessionNotFound,
+    StoreFull,
+)
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+QUOTE_CACHE = QuoteCache()
+QUOTE_SESSIONS = QuoteSessionStore()
+QUOTE_SESSIONS_RETRY_AFTER_S = 30
 
 
 class QuoteRequest(BaseModel):
@@ -16,14 +37,342 @@ class QuoteRequest(BaseModel):
     fields: List[FieldInput]
 
 
-@router.post("/quote/preview", response_model=Quote)
-def quote_preview(payload: QuoteRequest):
+def resolve_field_acres(fields: List[FieldInput]) -> None:
     """
-    Takes a list of fields + chosen program, returns pricing breakdown.
+    Replace client-computed acres with server-side geodesic acreage for
+    every field that carries a measurable geometry (one vectorized pass).
+    """
+    with_geometry = [f for f in fields if f.geometry]
+    if not with_geometry:
+        return
+    for f, acres in zip(with_geometry, field_acres([f.geometry for f in with_geometry])):
+        if acres is not None:
+            f.acres = acres
+
+
+def cache_key_from_raw(data) -> Optional[str]:
+    """
+    Cache key straight from the decoded JSON body, without building any
+    models. Returns None when the payload doesn't have the expected shape;
+    the caller then takes the normal validating path.
+    """
+    if not isinstance(data, dict):
+        return None
+    if not isinstance(data.get("quote_id"), str) or not isinstance(data.get("grower_id"), str):
+        return None
+    program_type = data.get("program_type")
+    fields = data.get("fields")
+    if program_type not in ("REMOTE_ONLY", "SPRAYER_PLUS_REMOTE") or not isinstance(fields, list):
+        return None
+
+    pairs = []
+    for f in fields:
+        if not isinstance(f, dict):
+            return None
+        if f.get("geometry"):
+            return None  # acres come from the geometry, not the payload
+        field_id, name, acres = f.get("field_id"), f.get("name"), f.get("acres")
+        if not isinstance(field_id, str) or not isinstance(name, str):
+            return None
+        if isinstance(acres, bool) or not isinstance(acres, (int, float)):
+            return None
+        pairs.append((field_id, float(acres)))
+
+    return quote_cache_key(program_type, pairs)
+
+
+def quote_from_cache_entry(data: dict, entry: dict) -> dict:
     """
-    return calculate_quote(
+    Rebuild a quote from cached per-field amounts. The entry is shared by
+    every ordering of the same fields, so the total is summed here in this
+    request's field order, exactly as calculate_quote would.
+    """
+    amounts = entry["amounts"]
+    lines = []
+    annual_total = 0.0
+    for f in data["fields"]:
+        annual_amount = amounts[(f["field_id"], float(f["acres"]))]
+        annual_total += annual_amount
+        lines.append({
+            "field_id": f["field_id"],
+            "field_name": f["name"],
+            "acres": float(f["acres"]),
+            "annual_amount": annual_amount,
+        })
+    return {
+        "quote_id": data["quote_id"],
+        "grower_id": data["grower_id"],
+        "program_type": data["program_type"],
+        "lines": lines,
+        "annual_total": annual_total,
+        "sprayer_fee": entry["sprayer_fee"],
+        "total_due_first_year": annual_total + entry["sprayer_fee"],
+    }
+
+
+def price_preview(data, key) -> dict:
+    """
+    Cache miss of quote_preview: validate, price and memoize. Runs in the
+    threadpool so a large field list doesn't hold up the event loop.
+    """
+    try:
+        payload = QuoteRequest(**data) if isinstance(data, dict) else QuoteRequest()
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    resolve_field_acres(payload.fields)
+    quote = calculate_quote(
         quote_id=payload.quote_id,
         grower_id=payload.grower_id,
         program_type=payload.program_type,
         fields=payload.fields,
     )
+
+    if key is not None:
+        QUOTE_CACHE.put(key, {
+            "amounts": {(line.field_id, line.acres): line.annual_amount for line in quote.lines},
+            "sprayer_fee": quote.sprayer_fee,
+        })
+
+    return quote.dict()
+
+
+@router.post("/quote/preview", response_model=Quote)
+async def quote_preview(request: Request):
+    """
+    Takes a list of fields + chosen program, returns pricing breakdown.
+
+    Body is a QuoteRequest. Results are memoized on program type + the
+    (field_id, acres) set, so a repeated field set is answered from the
+    cache without running validation or pricing. Fields that include
+    geometry are priced on server-computed acreage and skip the cache.
+    """
+    try:
+        data = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Request body is not valid JSON")
+
+    key = cache_key_from_raw(data)
+    if key is not None:
+        entry = QUOTE_CACHE.get(key)
+        if entry is not None:
+            return JSONResponse(content=quote_from_cache_entry(data, entry))
+
+    return JSONResponse(content=await run_in_threadpool(price_preview, data, key))
+
+
+@router.get("/quote/preview/cache")
+def quote_preview_cache_stats():
+    return QUOTE_CACHE.stats()
+
+
+@router.delete("/quote/preview/cache")
+def quote_preview_cache_clear():
+    QUOTE_CACHE.clear()
+    return QUOTE_CACHE.stats()
+
+
+# -------------------------------------------------------------------
+# Delta preview sessions
+# -------------------------------------------------------------------
+
+
+class QuoteSessionDelta(BaseModel):
+    """
+    Fields to add or update (by field_id) and field ids to remove.
+    Changing program_type reprices every line in the session.
+    """
+    upsert: List[FieldInput] = []
+    remove: List[str] = []
+    program_type: Optional[ProgramType] = None
+
+
+class QuoteSessionResponse(BaseModel):
+    session_id: str
+    expires_in: int
+    program_type: ProgramType
+    changed: List[QuoteLine]
+    removed: List[str]
+    field_count: int
+    total_acres: float
+    annual_total: float
+    sprayer_fee: float
+    total_due_first_year: float
+
+
+def session_response(
+    session: QuoteSession,
+    changed: List[QuoteLine],
+    removed: List[str],
+) -> QuoteSessionResponse:
+    return QuoteSessionResponse(
+        session_id=session.session_id,
+        expires_in=SESSION_TTL_SECONDS,
+        program_type=session.program_type,
+        changed=changed,
+        removed=removed,
+        field_count=len(session.lines),
+        total_acres=session.total_acres,
+        annual_total=session.annual_total,
+        sprayer_fee=session.sprayer_fee,
+        total_due_first_year=session.total_due_first_year,
+    )
+
+
+def store_full(e: StoreFull) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(QUOTE_SESSIONS_RETRY_AFTER_S)},
+    )
+
+
+def get_session_or_404(session_id: str) -> QuoteSession:
+    try:
+        return QUOTE_SESSIONS.get(session_id)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Quote session not found or expired")
+
+
+@router.post("/quote/sessions", response_model=QuoteSessionResponse)
+def open_quote_session(payload: QuoteRequest):
+    """
+    Opens a preview session with the initial field list. Every line is
+    returned once here; later PATCH calls only return what changed.
+    """
+    resolve_field_acres(payload.fields)
+    try:
+        session = QUOTE_SESSIONS.create(
+            quote_id=payload.quote_id,
+            grower_id=payload.grower_id,
+            program_type=payload.program_type,
+            fields=payload.fields,
+        )
+    except SessionFull as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except StoreFull as e:
+        raise store_full(e)
+
+    return session_response(session, list(session.lines.values()), [])
+
+
+@router.patch("/quote/sessions/{session_id}", response_model=QuoteSessionResponse)
+def apply_quote_session_delta(session_id: str, delta: QuoteSessionDelta):
+    resolve_field_acres(delta.upsert)
+    session = get_session_or_404(session_id)
+    with session.lock:
+        try:
+            changed, removed = session.apply(delta.upsert, delta.remove, delta.program_type)
+        except SessionFull as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except StoreFull as e:
+            raise store_full(e)
+        except SessionNotFound:
+            # Evicted to make room while this delta waited for the lock
+            raise HTTPException(status_code=404, detail="Quote session not found or expired")
+        return session_response(session, changed, removed)
+
+
+@router.get("/quote/sessions/{session_id}", response_model=Quote)
+def get_quote_session(session_id: str):
+    session = get_session_or_404(session_id)
+    with session.lock:
+        return session.to_quote()
+
+
+@router.delete("/quote/sessions/{session_id}")
+def close_quote_session(session_id: str):
+    if not QUOTE_SESSIONS.delete(session_id):
+        raise HTTPException(status_code=404, detail="Quote session not found or expired")
+    return {"session_id": session_id, "closed": True}
+
+
+# -------------------------------------------------------------------
+# Batch pricing
+# -------------------------------------------------------------------
+
+
+class BatchQuoteItem(BaseModel):
+    """
+    One quote in columnar form: acres[i] belongs to field_ids[i].
+    field_ids is optional and only echoed back with the lines.
+    """
+    quote_id: str
+    grower_id: str
+    program_type: ProgramType
+    acres: List[float]
+    field_ids: Optional[List[str]] = None
+
+
+class BatchQuoteRequest(BaseModel):
+    quotes: List[BatchQuoteItem]
+    include_lines: bool = False
+
+
+class BatchQuoteResult(BaseModel):
+    quote_id: str
+    grower_id: str
+    program_type: ProgramType
+    field_count: int
+    annual_total: float
+    sprayer_fee: float
+    total_due_first_year: float
+    field_ids: Optional[List[str]] = None
+    line_amounts: Optional[List[float]] = None  # aligned with the request's acres
+
+
+class BatchQuoteResponse(BaseModel):
+    quotes: List[BatchQuoteResult]
+    annual_total: float
+    total_due_first_year: float
+
+
+@router.post("/quote/preview/batch", response_model=BatchQuoteResponse)
+def quote_preview_batch(payload: BatchQuoteRequest):
+    """
+    Prices many quotes in one call (portfolio re-pricing, large growers).
+    Per-quote totals match /quote/preview exactly.
+    """
+    for item in payload.quotes:
+        if item.field_ids is not None and len(item.field_ids) != len(item.acres):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Quote {item.quote_id}: field_ids and acres differ in length",
+            )
+
+    lengths = [len(item.acres) for item in payload.quotes]
+    offsets = offsets_from_lengths(lengths)
+    acres = np.fromiter(
+        (a for item in payload.quotes for a in item.acres),
+        dtype=np.float64,
+        count=int(offsets[-1]),
+    )
+
+    totals = price_batch([item.program_type for item in payload.quotes], acres, offsets)
+
+    annual = totals.annual_total.tolist()
+    fees = totals.sprayer_fee.tolist()
+    due = totals.total_due_first_year.tolist()
+    amounts = totals.line_amounts.tolist() if payload.include_lines else None
+
+    results = []
+    for i, item in enumerate(payload.quotes):
+        results.append(
+            BatchQuoteResult(
+                quote_id=item.quote_id,
+                grower_id=item.grower_id,
+                program_type=item.program_type,
+                field_count=lengths[i],
+                annual_total=annual[i],
+                sprayer_fee=fees[i],
+                total_due_first_year=due[i],
+                field_ids=item.field_ids if payload.include_lines else None,
+                line_amounts=amounts[offsets[i]:offsets[i + 1]] if amounts is not None else None,
+            )
+        )
+
+    return BatchQuoteResponse(
+        quotes=results,
+        annual_total=sum(annual),
+        total_due_first_year=sum(due),
+    )
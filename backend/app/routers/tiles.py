@@ -0,0 +1,41 @@
+"""
+Overview map tiles of every stored field (see app/tiles.py).
+"""
+from __future__ import annotations
+
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+
+from ..profiling import ProfiledRoute
+from ..tiles import MAX_TILE_ZOOM, build_tile
+from . import orders
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.get("/tiles/{z}/{x}/{y}.geojson")
+def get_tile(z: int, x: int, y: int):
+    """
+    One z/x/y tile: cluster points at low zoom, simplified field polygons
+    from CLUSTER_MAX_ZOOM up. Served from the disk cache when present.
+    """
+    if not 0 <= z <= MAX_TILE_ZOOM or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    cache = orders.TILE_CACHE
+    content = cache.get(z, x, y)
+    source = "hit"
+    if content is None:
+        epoch = cache.epoch
+        tile = build_tile(orders.FIELD_INDEX, z, x, y)
+        content = json.dumps(tile, separators=(",", ":")).encode("utf-8")
+        cache.put(z, x, y, content, epoch)
+        source = "miss"
+
+    return Response(
+        content=content,
+        media_type="application/geo+json",
+        headers={"X-Tile-Cache": source},
+    )
@@ -0,0 +1,456 @@
+"""
+In-memory spatial index over every stored field.
+
+Fields are bucketed into a uniform lon/lat grid by bounding box. A query
+looks up only the cells its box or point falls in, drops candidates whose
+bounding box misses, and then runs an exact polygon test on the few that
+remain. The index is built from each order's fields.geojson at startup
+(or on first use) and kept current by checkout and delete.
+
+Overlap tests are strict: fields that only share an edge or a corner, as
+neighbouring fields drawn on the map usually do, don't count.
+"""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .geometry import points_in_rings, polygons_of, ring_to_array, unwrap_geometry
+from .order_layout import iter_order_dirs
+from .order_storage import load_geometry_store
+
+# Grid cell size in degrees (~2 km north-south); a typical field spans 1-4 cells
+GRID_CELL_DEG = 0.02
+SEARCH_LIMIT_DEFAULT = 1000
+# Vertex-on-edge tolerance, in degrees (~1 cm)
+BOUNDARY_EPS_DEG = 1e-7
+# Checkout rejects fields whose bounding box is wider or taller than this
+# (~110 km; real fields are a few hundred metres)
+MAX_FIELD_SPAN_DEG = 1.0
+# Fields covering more grid cells than this (e.g. stored before the span
+# check) are kept in a separate list that every query scans linearly
+MAX_CELLS_PER_FIELD = 2500
+
+BBox = Tuple[float, float, float, float]
+
+
+# -------------------------------------------------------------------
+# Exact polygon tests (planar lon/lat)
+# -------------------------------------------------------------------
+
+
+def geometry_polygons(obj: Any) -> List[List[np.ndarray]]:
+    """
+    Polygons of a Feature or geometry as lists of (n, 2) closed rings;
+    empty for anything that isn't areal or can't be parsed.
+    """
+    geom = unwrap_geometry(obj)
+    polygons = polygons_of(geom) if geom is not None else None
+    out = []
+    for polygon in polygons or []:
+        try:
+            rings = [ring_to_array(ring) for ring in polygon]
+        except (ValueError, TypeError):
+            continue
+        rings = [close_ring(r) for r in rings if len(r) >= 3]
+        if rings:
+            out.append(rings)
+    return out
+
+
+def geometry_problem(obj: Any) -> Optional[str]:
+    """
+    Why a field geometry can't be accepted at checkout, or None: every
+    coordinate must be a finite lon/lat within +-180 / +-90, and the field
+    must fit in MAX_FIELD_SPAN_DEG.
+    """
+    polygons = geometry_polygons(obj)
+    if not polygons:
+        return None
+    coords = np.vstack([ring for rings in polygons for ring in rings])
+    lon, lat = coords[:, 0], coords[:, 1]
+    if not (np.isfinite(coords).all() and (np.abs(lon) <= 180).all() and (np.abs(lat) <= 90).all()):
+        return "coordinates must be lon within +-180 and lat within +-90"
+    x0, y0, x1, y1 = polygons_bbox(polygons)
+    if x1 - x0 > MAX_FIELD_SPAN_DEG or y1 - y0 > MAX_FIELD_SPAN_DEG:
+        return f"field spans more than {MAX_FIELD_SPAN_DEG} degrees"
+    return None
+
+
+def close_ring(ring: np.ndarray) -> np.ndarray:
+    if ring[0, 0] != ring[-1, 0] or ring[0, 1] != ring[-1, 1]:
+        ring = np.vstack([ring, ring[:1]])
+    return ring
+
+
+def polygons_bbox(polygons: List[List[np.ndarray]]) -> BBox:
+    outer = np.vstack([rings[0] for rings in polygons])
+    return (float(outer[:, 0].min()), float(outer[:, 1].min()),
+            float(outer[:, 0].max()), float(outer[:, 1].max()))
+
+
+def bbox_intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def points_on_rings(points: np.ndarray, rings: List[np.ndarray], eps: float = BOUNDARY_EPS_DEG) -> np.ndarray:
+    on = np.zeros(len(points), dtype=bool)
+    p = points[:, None, :]
+    for ring in rings:
+        a = ring[:-1][None, :, :]
+        d = (ring[1:] - ring[:-1])[None, :, :]
+        seg_len2 = np.maximum((d ** 2).sum(axis=2), 1e-30)
+        t = np.clip(((p - a) * d).sum(axis=2) / seg_len2, 0.0, 1.0)
+        dist2 = ((a + t[..., None] * d - p) ** 2).sum(axis=2)
+        on |= (dist2 <= eps * eps).any(axis=1)
+    return on
+
+
+def points_strictly_inside(points: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    if len(points) == 0:
+        return np.zeros(0, dtype=bool)
+    inside = points_in_rings(points, rings)
+    if inside.any():
+        inside[inside] = ~points_on_rings(points[inside], rings)
+    return inside
+
+
+def edges_cross(a: np.ndarray, b: np.ndarray) -> bool:
+    """
+    True if any edge of ring `a` properly crosses an edge of ring `b`
+    (touching or collinear overlap doesn't count).
+    """
+    a0, a1 = a[:-1], a[1:]
+    b0, b1 = b[:-1], b[1:]
+
+    # Only edges that reach into the other ring's bbox can cross it
+    bmin, bmax = b.min(axis=0), b.max(axis=0)
+    amin, amax = a.min(axis=0), a.max(axis=0)
+    keep_a = ~((np.maximum(a0, a1) < bmin).any(axis=1) | (np.minimum(a0, a1) > bmax).any(axis=1))
+    keep_b = ~((np.maximum(b0, b1) < amin).any(axis=1) | (np.minimum(b0, b1) > amax).any(axis=1))
+    a0, a1, b0, b1 = a0[keep_a], a1[keep_a], b0[keep_b], b1[keep_b]
+    if len(a0) == 0 or len(b0) == 0:
+        return False
+
+    def orient(p, q, r):
+        return (q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0])
+
+    A0, A1 = a0[:, None, :], a1[:, None, :]
+    B0, B1 = b0[None, :, :], b1[None, :, :]
+    d1 = orient(A0, A1, B0)
+    d2 = orient(A0, A1, B1)
+    d3 = orient(B0, B1, A0)
+    d4 = orient(B0, B1, A1)
+    b_straddles_a = ((d1 > 0) & (d2 < 0)) | ((d1 < 0) & (d2 > 0))
+    a_straddles_b = ((d3 > 0) & (d4 < 0)) | ((d3 < 0) & (d4 > 0))
+    return bool((b_straddles_a & a_straddles_b).any())
+
+
+def interior_point(rings: List[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    A point strictly inside the polygon: the outer ring's vertex average if
+    that lies inside, else a point nudged in from one of its corners.
+    """
+    outer = rings[0][:-1]
+    candidates = [outer.mean(axis=0)]
+    for i in range(min(len(outer), 8)):
+        prev, cur, nxt = outer[i - 1], outer[i], outer[(i + 1) % len(outer)]
+        candidates.append(cur + ((prev - cur) + (nxt - cur)) * 0.01)
+    points = np.array(candidates)
+    inside = points_strictly_inside(points, rings)
+    hits = np.flatnonzero(inside)
+    return points[hits[0]] if len(hits) else None
+
+
+def polygons_overlap(a: List[List[np.ndarray]], b: List[List[np.ndarray]]) -> bool:
+    """
+    True if the interiors of two (multi)polygons overlap: an edge crossing,
+    a vertex strictly inside the other, or (for identical or nested
+    shapes) an interior point of one inside the other.
+    """
+    for rings_a in a:
+        for rings_b in b:
+            if polygon_pair_overlaps(rings_a, rings_b):
+                return True
+    return False
+
+
+def points_in_bbox(points: np.ndarray, bbox: BBox) -> np.ndarray:
+    return points[
+        (points[:, 0] >= bbox[0]) & (points[:, 0] <= bbox[2])
+        & (points[:, 1] >= bbox[1]) & (points[:, 1] <= bbox[3])
+    ]
+
+
+def polygon_pair_overlaps(rings_a: List[np.ndarray], rings_b: List[np.ndarray]) -> bool:
+    bbox_a, bbox_b = polygons_bbox([rings_a]), polygons_bbox([rings_b])
+    if not bbox_intersects(bbox_a, bbox_b):
+        return False
+    for ra in rings_a:
+        for rb in rings_b:
+            if edges_cross(ra, rb):
+                return True
+    if points_strictly_inside(points_in_bbox(rings_a[0][:-1], bbox_b), rings_b).any():
+        return True
+    if points_strictly_inside(points_in_bbox(rings_b[0][:-1], bbox_a), rings_a).any():
+        return True
+    for src, dst in ((rings_a, rings_b), (rings_b, rings_a)):
+        p = interior_point(src)
+        if p is not None and points_strictly_inside(p[None, :], dst)[0]:
+            return True
+    return False
+
+
+def polygons_contain_point(polygons: List[List[np.ndarray]], lon: float, lat: float) -> bool:
+    point = np.array([[lon, lat]])
+    return any(points_in_rings(point, rings)[0] for rings in polygons)
+
+
+def bbox_polygon(bbox: BBox) -> List[List[np.ndarray]]:
+    minx, miny, maxx, maxy = bbox
+    ring = np.array([[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]])
+    return [[ring]]
+
+
+def polygons_intersect_bbox(polygons: List[List[np.ndarray]], bbox: BBox) -> bool:
+    """
+    Non-strict: a field touching the box counts as a hit.
+    """
+    minx, miny, maxx, maxy = bbox
+    box = bbox_polygon(bbox)[0][0]
+    for rings in polygons:
+        outer = rings[0]
+        inside = ((outer[:, 0] >= minx) & (outer[:, 0] <= maxx)
+                  & (outer[:, 1] >= miny) & (outer[:, 1] <= maxy))
+        if inside.any():
+            return True
+        if points_in_rings(box[:-1], rings).any():
+            return True
+        if any(edges_cross(ring, box) for ring in rings):
+            return True
+    return False
+
+
+# -------------------------------------------------------------------
+# Index
+# -------------------------------------------------------------------
+
+
+class IndexedField:
+    __slots__ = ("quote_id", "field_id", "name", "bbox", "polygons")
+
+    def __init__(self, quote_id: str, field_id: Any, name: str, bbox: BBox, polygons):
+        self.quote_id = quote_id
+        self.field_id = field_id
+        self.name = name
+        self.bbox = bbox
+        self.polygons = polygons
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "quote_id": self.quote_id,
+            "field_id": self.field_id,
+            "name": self.name,
+            "bbox": list(self.bbox),
+        }
+
+
+class FieldSpatialIndex:
+    def __init__(self, orders_root: Path, cell_deg: float = GRID_CELL_DEG):
+        self.orders_root = orders_root
+        self.cell_deg = cell_deg
+        self._entries: Dict[int, IndexedField] = {}
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._by_order: Dict[str, List[int]] = {}
+        # Fields too big for the grid (see MAX_CELLS_PER_FIELD)
+        self._oversize: Set[int] = set()
+        self._next_id = 0
+        self._built = False
+        self._lock = threading.RLock()
+
+    # ---------------------------------------------------------------
+    # Maintenance
+    # ---------------------------------------------------------------
+
+    def ensure(self) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                self.rebuild()
+
+    def warm_in_background(self) -> None:
+        """
+        Build the index on a daemon thread so the first query doesn't pay
+        for it; queries arriving meanwhile wait for the build to finish.
+        """
+        threading.Thread(target=self.ensure, name="field-index-build", daemon=True).start()
+
+    def rebuild(self) -> Dict[str, int]:
+        """
+        Re-read every order's fields.geojson. Returns {orders, fields}.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._cells.clear()
+            self._by_order.clear()
+            self._oversize.clear()
+            for order_dir in iter_order_dirs(self.orders_root):
+                try:
+                    features = load_geometry_store(order_dir)
+                except Exception:
+                    continue
+                self._add_order(order_dir.name, features)
+            self._built = True
+            return {"orders": len(self._by_order), "fields": len(self._entries)}
+
+    def index_order(self, quote_id: str, features: Iterable[dict]) -> List[BBox]:
+        """
+        (Re)index one order from its GeoJSON features; properties.field_id
+        and properties.name identify each field. Returns the bounding boxes
+        of the fields replaced and added.
+        """
+        with self._lock:
+            # Checked under the lock: a build in progress holds it, so this
+            # waits for the build instead of racing past an order folder
+            # the build has already walked
+            if not self._built:
+                # No build has started yet; the full build will read this order from disk
+                return [polygons_bbox(p) for p in map(geometry_polygons, features) if p]
+            removed = self._remove_order(quote_id)
+            added = self._add_order(quote_id, features)
+            return removed + added
+
+    def remove_order(self, quote_id: str) -> List[BBox]:
+        """
+        Drop one order's fields; returns their bounding boxes.
+        """
+        with self._lock:
+            return self._remove_order(quote_id)
+
+    def _add_order(self, quote_id: str, features: Iterable[dict]) -> List[BBox]:
+        ids = []
+        for feature in features:
+            polygons = geometry_polygons(feature)
+            if not polygons:
+                continue
+            props = feature.get("properties") or {}
+            entry = IndexedField(quote_id, props.get("field_id"), props.get("name", ""),
+                                 polygons_bbox(polygons), polygons)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            if self._cell_count(entry.bbox) > MAX_CELLS_PER_FIELD:
+                self._oversize.add(entry_id)
+            else:
+                for cell in self._cells_for(entry.bbox):
+                    self._cells.setdefault(cell, set()).add(entry_id)
+            ids.append(entry_id)
+        if ids:
+            self._by_order[quote_id] = ids
+        return [self._entries[i].bbox for i in ids]
+
+    def _remove_order(self, quote_id: str) -> List[BBox]:
+        bboxes = []
+        for entry_id in self._by_order.pop(quote_id, []):
+            entry = self._entries.pop(entry_id)
+            bboxes.append(entry.bbox)
+            if entry_id in self._oversize:
+                self._oversize.discard(entry_id)
+                continue
+            for cell in self._cells_for(entry.bbox):
+                bucket = self._cells.get(cell)
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del self._cells[cell]
+        return bboxes
+
+    def _cells_for(self, bbox: BBox) -> List[Tuple[int, int]]:
+        x0, y0, x1, y1 = self._cell_range(bbox)
+        return [(i, j) for i in range(x0, x1 + 1) for j in range(y0, y1 + 1)]
+
+    def _cell_count(self, bbox: BBox) -> int:
+        x0, y0, x1, y1 = self._cell_range(bbox)
+        return (x1 - x0 + 1) * (y1 - y0 + 1)
+
+    def _cell_range(self, bbox: BBox) -> Tuple[int, int, int, int]:
+        c = self.cell_deg
+        return (int(np.floor(bbox[0] / c)), int(np.floor(bbox[1] / c)),
+                int(np.floor(bbox[2] / c)), int(np.floor(bbox[3] / c)))
+
+    # ---------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------
+
+    def _candidates(self, bbox: BBox) -> List[IndexedField]:
+        x0, y0, x1, y1 = self._cell_range(bbox)
+        ids: Set[int] = set(self._oversize)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            # Huge box: walking the occupied cells is cheaper
+            for (i, j), bucket in self._cells.items():
+                if x0 <= i <= x1 and y0 <= j <= y1:
+                    ids.update(bucket)
+        else:
+            for i in range(x0, x1 + 1):
+                for j in range(y0, y1 + 1):
+                    bucket = self._cells.get((i, j))
+                    if bucket:
+                        ids.update(bucket)
+        return [self._entries[i] for i in sorted(ids)
+                if bbox_intersects(self._entries[i].bbox, bbox)]
+
+    def fields_in_bbox(self, bbox: BBox) -> List[IndexedField]:
+        """
+        Fields whose bounding box intersects `bbox`, without the exact
+        polygon test (enough for clustering).
+        """
+        self.ensure()
+        with self._lock:
+            return self._candidates(bbox)
+
+    def search_bbox(self, bbox: BBox, limit: int = SEARCH_LIMIT_DEFAULT) -> List[IndexedField]:
+        self.ensure()
+        with self._lock:
+            hits = []
+            for entry in self._candidates(bbox):
+                if polygons_intersect_bbox(entry.polygons, bbox):
+                    hits.append(entry)
+                    if len(hits) >= limit:
+                        break
+            return hits
+
+    def search_point(self, lon: float, lat: float) -> List[IndexedField]:
+        self.ensure()
+        with self._lock:
+            return [
+                entry for entry in self._candidates((lon, lat, lon, lat))
+                if polygons_contain_point(entry.polygons, lon, lat)
+            ]
+
+    def overlapping(self, geometry: Any, exclude_quote_id: Optional[str] = None) -> List[IndexedField]:
+        """
+        Indexed fields whose interior overlaps `geometry` (Feature or
+        geometry).
+        """
+        polygons = geometry_polygons(geometry)
+        if not polygons:
+            return []
+        self.ensure()
+        with self._lock:
+            return [
+                entry for entry in self._candidates(polygons_bbox(polygons))
+                if entry.quote_id != exclude_quote_id and polygons_overlap(polygons, entry.polygons)
+            ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "orders": len(self._by_order),
+                "fields": len(self._entries),
+                "cells": len(self._cells),
+                "oversize": len(self._oversize),
+            }
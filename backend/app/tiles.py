@@ -0,0 +1,251 @@
+"""
+Map tiles of every stored field, for an overview map.
+
+Tiles use the usual web-mercator z/x/y scheme and are GeoJSON
+FeatureCollections:
+
+- below CLUSTER_MAX_ZOOM each tile holds cluster points: fields are binned
+  by the centre of their bounding box into a CLUSTER_CELL_PX pixel grid,
+  and each bin becomes one Point with a count (a bin of one also carries
+  the field's quote_id / field_id / name);
+- from CLUSTER_MAX_ZOOM up, tiles hold the field polygons, simplified to
+  about one pixel at that zoom and rounded to matching precision.
+
+Tiles are built from the in-memory spatial index and cached on disk.
+Checkout and delete invalidate only the tiles covering the fields they
+touched, at every zoom level.
+"""
+from __future__ import annotations
+
+import math
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .geometry import compact_polygons
+from .spatial_index import BBox, FieldSpatialIndex
+
+TILE_SIZE_PX = 256
+MAX_TILE_ZOOM = 18
+CLUSTER_MAX_ZOOM = 12
+CLUSTER_CELL_PX = 32
+MAX_FEATURES_PER_TILE = 5000
+# Display tiles may change a field's shape a little more than exports
+TILE_MAX_AREA_CHANGE = 0.05
+# Bump when the tile content changes so old cached tiles are ignored
+TILE_FORMAT_VERSION = 2
+# Above this many tiles per zoom, invalidate() scans the cached tiles
+# instead of probing each tile the boxes cover
+INVALIDATE_PROBE_MAX = 4096
+
+EARTH_CIRCUMFERENCE_M = 40075016.686
+MAX_MERCATOR_LAT = 85.0511287798
+
+
+# -------------------------------------------------------------------
+# Tile math
+# -------------------------------------------------------------------
+
+
+def lonlat_to_pixel(lon: float, lat: float, z: int) -> Tuple[float, float]:
+    """
+    Global pixel coordinates at zoom z.
+    """
+    scale = TILE_SIZE_PX * (1 << z)
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = (lon + 180.0) / 360.0 * scale
+    s = math.sin(math.radians(lat))
+    y = (0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * scale
+    return x, y
+
+
+def tile_bounds(z: int, x: int, y: int) -> BBox:
+    n = 1 << z
+
+    def lat_of(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return (x / n * 360.0 - 180.0, lat_of(y + 1), (x + 1) / n * 360.0 - 180.0, lat_of(y))
+
+
+def tile_range(bbox: BBox, z: int) -> Tuple[int, int, int, int]:
+    """
+    (x0, y0, x1, y1) inclusive range of tiles at zoom z covering bbox.
+    """
+    last = (1 << z) - 1
+    px0, py1 = lonlat_to_pixel(bbox[0], bbox[1], z)
+    px1, py0 = lonlat_to_pixel(bbox[2], bbox[3], z)
+
+    def clamp(v: float) -> int:
+        return max(0, min(last, int(v // TILE_SIZE_PX)))
+
+    return clamp(px0), clamp(py0), clamp(px1), clamp(py1)
+
+
+def meters_per_pixel(lat: float, z: int) -> float:
+    return EARTH_CIRCUMFERENCE_M * math.cos(math.radians(lat)) / (TILE_SIZE_PX * (1 << z))
+
+
+def precision_for_zoom(z: int) -> int:
+    # Decimal places needed to keep roughly one-pixel resolution
+    degrees_per_pixel = 360.0 / (TILE_SIZE_PX * (1 << z))
+    return max(0, int(math.ceil(-math.log10(degrees_per_pixel))) + 1)
+
+
+# -------------------------------------------------------------------
+# Tile content
+# -------------------------------------------------------------------
+
+
+def cluster_features(entries, bounds: BBox, z: int, x: int, y: int) -> List[dict]:
+    bins: Dict[Tuple[int, int], list] = {}
+    minx, miny, maxx, maxy = bounds
+    for entry in entries:
+        cx = (entry.bbox[0] + entry.bbox[2]) / 2
+        cy = (entry.bbox[1] + entry.bbox[3]) / 2
+        # Each field belongs to the one tile holding its centre
+        if not (minx <= cx < maxx and miny < cy <= maxy):
+            continue
+        px, py = lonlat_to_pixel(cx, cy, z)
+        key = (int((px - x * TILE_SIZE_PX) // CLUSTER_CELL_PX),
+               int((py - y * TILE_SIZE_PX) // CLUSTER_CELL_PX))
+        bins.setdefault(key, []).append((cx, cy, entry))
+
+    features = []
+    for members in bins.values():
+        lon = sum(m[0] for m in members) / len(members)
+        lat = sum(m[1] for m in members) / len(members)
+        props = {"cluster": True, "count": len(members)}
+        if len(members) == 1:
+            props.update(members[0][2].to_dict())
+            props.pop("bbox", None)
+        features.append({
+            "type": "Feature",
+            "properties": props,
+            "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+        })
+    return features
+
+
+def field_features(entries, bounds: BBox, z: int) -> List[dict]:
+    tolerance_m = meters_per_pixel((bounds[1] + bounds[3]) / 2, z)
+    precision = precision_for_zoom(z)
+
+    features = []
+    for entry in entries:
+        polygons = [
+            [ring.tolist() for ring in rings]
+            for rings in compact_polygons(entry.polygons, tolerance_m, precision, TILE_MAX_AREA_CHANGE)
+        ]
+        if len(polygons) == 1:
+            geometry = {"type": "Polygon", "coordinates": polygons[0]}
+        else:
+            geometry = {"type": "MultiPolygon", "coordinates": polygons}
+        props = entry.to_dict()
+        props.pop("bbox", None)
+        features.append({"type": "Feature", "properties": props, "geometry": geometry})
+    return features
+
+
+def build_tile(index: FieldSpatialIndex, z: int, x: int, y: int) -> dict:
+    bounds = tile_bounds(z, x, y)
+    if z < CLUSTER_MAX_ZOOM:
+        features = cluster_features(index.fields_in_bbox(bounds), bounds, z, x, y)
+    else:
+        entries = index.search_bbox(bounds, limit=MAX_FEATURES_PER_TILE)
+        features = field_features(entries, bounds, z)
+    return {"type": "FeatureCollection", "features": features}
+
+
+# -------------------------------------------------------------------
+# Disk cache
+# -------------------------------------------------------------------
+
+
+class TileCache:
+    def __init__(self, root: Path):
+        self.root = root
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def path(self, z: int, x: int, y: int) -> Path:
+        return self.root / f"v{TILE_FORMAT_VERSION}" / str(z) / str(x) / f"{y}.geojson"
+
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        try:
+            return self.path(z, x, y).read_bytes()
+        except OSError:
+            return None
+
+    def put(self, z: int, x: int, y: int, data: bytes, epoch: int) -> None:
+        """
+        Store a tile built when the cache was at `epoch`. If anything was
+        invalidated since, the tile may be stale and isn't stored.
+        """
+        path = self.path(z, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        with self._lock:
+            if epoch != self._epoch:
+                tmp.unlink()
+                return
+            os.replace(tmp, path)
+
+    def invalidate(self, bboxes: Iterable[BBox]) -> int:
+        """
+        Drop every cached tile, at every zoom, that covers one of the
+        bounding boxes. Returns the number of tiles removed.
+        """
+        bboxes = list(bboxes)
+        removed = 0
+        with self._lock:
+            self._epoch += 1
+            for z in range(MAX_TILE_ZOOM + 1):
+                ranges = [tile_range(bbox, z) for bbox in bboxes]
+                if sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, y0, x1, y1 in ranges) > INVALIDATE_PROBE_MAX:
+                    # Huge boxes: list what's cached instead of probing every tile
+                    removed += self._remove_cached(z, ranges)
+                    continue
+                seen = set()
+                for x0, y0, x1, y1 in ranges:
+                    for tx in range(x0, x1 + 1):
+                        for ty in range(y0, y1 + 1):
+                            if (tx, ty) in seen:
+                                continue
+                            seen.add((tx, ty))
+                            try:
+                                self.path(z, tx, ty).unlink()
+                                removed += 1
+                            except FileNotFoundError:
+                                pass
+        return removed
+
+    def _remove_cached(self, z: int, ranges: List[Tuple[int, int, int, int]]) -> int:
+        removed = 0
+        z_dir = self.root / f"v{TILE_FORMAT_VERSION}" / str(z)
+        if not z_dir.is_dir():
+            return 0
+        for x_dir in z_dir.iterdir():
+            if not x_dir.name.isdigit():
+                continue
+            tx = int(x_dir.name)
+            y_ranges = [(y0, y1) for x0, y0, x1, y1 in ranges if x0 <= tx <= x1]
+            if not y_ranges:
+                continue
+            for tile in x_dir.glob("*.geojson"):
+                if tile.stem.isdigit() and any(y0 <= int(tile.stem) <= y1 for y0, y1 in y_ranges):
+                    tile.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            shutil.rmtree(self.root, ignore_errors=True)
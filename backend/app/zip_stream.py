@@ -0,0 +1,80 @@
+"""
+Streaming ZIP writer.
+
+Builds a ZIP archive chunk by chunk for a StreamingResponse: zipfile
+writes into a small in-memory sink that is drained after every chunk, so
+memory stays bounded by CHUNK_SIZE and the first bytes go out as soon as
+the first member starts. Because the sink is not seekable, zipfile writes
+sizes and CRCs in data descriptors after each member.
+"""
+from __future__ import annotations
+
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
+
+CHUNK_SIZE = 64 * 1024
+
+# ZIP64 is only needed above 4 GiB; the limit is checked per member
+ZIP64_LIMIT = (1 << 32) - 1
+
+# A member is either a file on disk or bytes built in memory
+ZipEntry = Tuple[Union[Path, bytes], str]
+
+
+class _ChunkSink:
+    """
+    Write-only, non-seekable file object that hands written bytes back.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_zip_stream(entries: Iterable[ZipEntry], compression: int = zipfile.ZIP_DEFLATED) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=compression) as zf:
+        for source, arcname in entries:
+            if isinstance(source, bytes):
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                size = len(source)
+            else:
+                stat = source.stat()
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime(stat.st_mtime)[:6])
+                size = stat.st_size
+            info.compress_type = compression
+
+            with zf.open(info, mode="w", force_zip64=size > ZIP64_LIMIT) as member:
+                if isinstance(source, bytes):
+                    member.write(source)
+                else:
+                    with source.open("rb") as f:
+                        while True:
+                            chunk = f.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            member.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central directory
+    data = sink.drain()
+    if data:
+        yield data
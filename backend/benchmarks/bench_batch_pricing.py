@@ -0,0 +1,78 @@
+"""
+Throughput benchmark: calculate_quote (one quote per call) vs price_batch.
+
+Run from backend/:
+
+    python -m benchmarks.bench_batch_pricing
+    python -m benchmarks.bench_batch_pricing --quotes 5000 --fields 200
+
+Also checks that every batch total equals the calculate_quote total exactly.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.batch_pricing import offsets_from_lengths, price_batch
+from app.models import FieldInput
+from app.pricing import calculate_quote
+
+
+def make_portfolio(n_quotes: int, max_fields: int, seed: int):
+    rng = random.Random(seed)
+    quotes = []
+    for q in range(n_quotes):
+        n_fields = rng.randint(1, max_fields)
+        program = rng.choice(["REMOTE_ONLY", "SPRAYER_PLUS_REMOTE"])
+        acres = [round(rng.uniform(1, 400), 1) for _ in range(n_fields)]
+        quotes.append((f"q_{q}", program, acres))
+    return quotes
+
+
+def run(n_quotes: int, max_fields: int, seed: int) -> None:
+    quotes = make_portfolio(n_quotes, max_fields, seed)
+    n_fields = sum(len(a) for _, _, a in quotes)
+    print(f"{n_quotes} quotes, {n_fields} fields (max {max_fields}/quote)")
+
+    t0 = time.perf_counter()
+    loop_totals = []
+    for quote_id, program, acres in quotes:
+        fields = [FieldInput(field_id=str(i), name="", acres=a) for i, a in enumerate(acres)]
+        q = calculate_quote(quote_id, "grower", program, fields)
+        loop_totals.append((q.annual_total, q.total_due_first_year))
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    offsets = offsets_from_lengths([len(a) for _, _, a in quotes])
+    acres = np.fromiter((x for _, _, a in quotes for x in a), dtype=np.float64, count=n_fields)
+    totals = price_batch([p for _, p, _ in quotes], acres, offsets)
+    batch_s = time.perf_counter() - t0
+
+    mismatches = sum(
+        1
+        for i, (annual, due) in enumerate(loop_totals)
+        if annual != totals.annual_total[i] or due != totals.total_due_first_year[i]
+    )
+
+    print(f"  calculate_quote loop: {loop_s:8.3f} s  {n_fields / loop_s:12,.0f} fields/s")
+    print(f"  price_batch:          {batch_s:8.3f} s  {n_fields / batch_s:12,.0f} fields/s")
+    print(f"  speedup: {loop_s / batch_s:.1f}x   exact mismatches: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quotes", type=int, default=2000)
+    parser.add_argument("--fields", type=int, default=100, help="max fields per quote")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.quotes, args.fields, args.seed)
+    run(max(1, args.quotes // 100), args.fields * 50, args.seed + 1)
+
+
+if __name__ == "__main__":
+    main()
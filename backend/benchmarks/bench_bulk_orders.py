@@ -0,0 +1,85 @@
+"""
+Status updates and deletes: one request per order vs the bulk endpoints.
+
+Run from backend/:
+
+    python -m benchmarks.bench_bulk_orders
+    python -m benchmarks.bench_bulk_orders --orders 5000 --fields 10
+
+Synthetic orders are written to a temporary orders folder and the app is
+driven in-process over HTTP (httpx ASGITransport), so the per-request
+cost of routing, validation and middleware is included, but not network
+round trips; against a real server the gap only widens. Each side works
+on its own half of the orders.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.main import app
+from app.routers import orders
+
+from .synthetic import populate_orders, temporary_orders_root
+
+
+def report(name: str, n: int, loop_s: float, bulk_s: float) -> None:
+    print(f"  {name}")
+    print(f"    one per request: {loop_s:8.3f} s  {n / loop_s:10,.0f} orders/s")
+    print(f"    bulk endpoint:   {bulk_s:8.3f} s  {n / bulk_s:10,.0f} orders/s")
+    print(f"    speedup: {loop_s / bulk_s:.1f}x")
+
+
+async def run(n_orders: int, n_fields: int, seed: int) -> None:
+    with temporary_orders_root():
+        quote_ids = populate_orders(orders.ORDERS_ROOT, n_orders, n_fields, seed=seed)
+        orders.FIELD_INDEX.rebuild()
+        half = len(quote_ids) // 2
+        looped, bulked = quote_ids[:half], quote_ids[half:]
+        print(f"{n_orders} orders, {n_fields} fields each ({half} per side)")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            t0 = time.perf_counter()
+            for quote_id in looped:
+                r = await client.post(f"/orders/{quote_id}/status", json={"status": "Paid"})
+                r.raise_for_status()
+            loop_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            r = await client.post("/orders/bulk/status", json={"status": "Paid", "quote_ids": bulked})
+            r.raise_for_status()
+            bulk_s = time.perf_counter() - t0
+            assert r.json()["succeeded"] == len(bulked)
+            report("status -> Paid", half, loop_s, bulk_s)
+
+            t0 = time.perf_counter()
+            for quote_id in looped:
+                r = await client.delete(f"/orders/{quote_id}")
+                r.raise_for_status()
+            loop_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            r = await client.post("/orders/bulk/delete", json={"quote_ids": bulked})
+            r.raise_for_status()
+            bulk_s = time.perf_counter() - t0
+            assert r.json()["succeeded"] == len(bulked)
+            report("delete", half, loop_s, bulk_s)
+
+        assert not orders.ORDER_INDEX.query_rows(limit=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--fields", type=int, default=5, help="fields per order")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args.orders, args.fields, args.seed))
+
+
+if __name__ == "__main__":
+    main()
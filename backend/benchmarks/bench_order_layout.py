@@ -0,0 +1,93 @@
+"""
+Order folder lookup and listing cost: flat layout vs hash-sharded.
+
+Run from backend/:
+
+    python -m benchmarks.bench_order_layout
+    python -m benchmarks.bench_order_layout --sizes 10000,100000,1000000
+
+For each size, empty order folders are created in a temporary directory
+in both layouts, then timed:
+
+- lookup: resolve_order_dir for existing and missing quote IDs
+- listing: walking every order folder with iter_order_dirs
+- migrate: moving the flat tree into shards (app/order_layout.py)
+
+Timings are warm-cache; a cold cache (after a backup or on a busy disk)
+punishes the huge flat directory far more.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from app.order_layout import iter_order_dirs, migrate, resolve_order_dir, sharded_path
+
+LOOKUPS = 20000
+
+
+def quote_ids(n: int):
+    base = 1_700_000_000
+    return [f"q_Grower{i % 997}_{base + i}" for i in range(n)]
+
+
+def make_tree(root: Path, ids, sharded: bool) -> float:
+    t0 = time.perf_counter()
+    root.mkdir(parents=True)
+    for quote_id in ids:
+        path = sharded_path(root, quote_id) if sharded else root / quote_id
+        path.mkdir(parents=sharded)
+    return time.perf_counter() - t0
+
+
+def time_lookups(root: Path, ids, rng: random.Random) -> float:
+    sample = [rng.choice(ids) for _ in range(LOOKUPS // 2)]
+    sample += [f"q_Missing_{i}" for i in range(LOOKUPS // 2)]
+    rng.shuffle(sample)
+    t0 = time.perf_counter()
+    for quote_id in sample:
+        resolve_order_dir(root, quote_id).is_dir()
+    return (time.perf_counter() - t0) / len(sample)
+
+
+def time_listing(root: Path) -> tuple:
+    t0 = time.perf_counter()
+    count = sum(1 for _ in iter_order_dirs(root))
+    elapsed = time.perf_counter() - t0
+    return elapsed, count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated order counts")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'orders':>9} {'layout':<8} {'create s':>9} {'lookup us':>10} {'listing s':>10}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        ids = quote_ids(n)
+        tmp = Path(tempfile.mkdtemp(prefix="terranet-layout-"))
+        try:
+            for layout in ("flat", "sharded"):
+                root = tmp / layout
+                create_s = make_tree(root, ids, sharded=(layout == "sharded"))
+                lookup_s = time_lookups(root, ids, rng)
+                listing_s, count = time_listing(root)
+                assert count == n
+                print(f"{n:>9} {layout:<8} {create_s:>9.2f} {lookup_s * 1e6:>10.2f} {listing_s:>10.3f}")
+
+            t0 = time.perf_counter()
+            counts = migrate(tmp / "flat")
+            assert counts["moved"] == n
+            print(f"{n:>9} {'migrate':<8} {time.perf_counter() - t0:>9.2f}  (flat -> sharded, {n} renames)")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Load generator replaying the frontend's request mix.
+
+Run from backend/:
+
+    python -m benchmarks.loadgen                        # in-process, 30 s
+    python -m benchmarks.loadgen --rate-scale 4 --duration 60
+    python -m benchmarks.loadgen --route quote.preview=10:40 --route packet.build=0
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --output load.json
+
+Without --url the app is driven in-process (httpx ASGI transport, so
+sync routes run on the same threadpool uvicorn would use) against a
+temporary orders folder seeded with --orders synthetic orders. With --url
+it drives a running server and picks order IDs from GET /orders, so point
+it at a dev instance, not one holding real orders.
+
+Each route gets open-loop arrivals at its own rate (Poisson, requests or
+bursts per second) and its own concurrency cap. Latency is measured from
+when a request was due, so time spent waiting for a free slot counts:
+that is what a browser would see when the server falls behind.
+
+    route           frontend source
+    quote.preview   TCV_V1.html while drawing: bursts of previews, one field
+                    added per request
+    checkout.start  TCV_V1.html checkout
+    orders.list     dashboard.html polling / searching GET /orders
+    orders.detail   order.html
+    orders.status   order.html status dropdown
+    packet.build    order.html packet button: POST, then poll /jobs until done
+    tiles           dashboard.html map
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from app.routers import orders
+from app.tiles import tile_range
+
+from .synthetic import (
+    REGION_CENTER,
+    REGION_DEG,
+    make_checkout_payload,
+    populate_orders,
+    temporary_orders_root,
+)
+
+DEFAULT_DURATION_S = 30.0
+# Max time to let in-flight requests finish after the run
+DRAIN_TIMEOUT_S = 30.0
+REQUEST_TIMEOUT_S = 60.0
+PACKET_POLL_INTERVAL_S = 0.05
+PREVIEW_BURST = 5
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class RouteSpec:
+    name: str
+    rate: float  # arrivals per second
+    concurrency: int
+    description: str = ""
+
+
+# Rough shape of a busy sign-up day, per server
+DEFAULT_MIX = [
+    RouteSpec("quote.preview", 2.0, 20, f"bursts of {PREVIEW_BURST} previews"),
+    RouteSpec("checkout.start", 0.2, 4),
+    RouteSpec("orders.list", 1.0, 10),
+    RouteSpec("orders.detail", 0.5, 10),
+    RouteSpec("orders.status", 0.2, 4),
+    RouteSpec("packet.build", 0.05, 2),
+    RouteSpec("tiles", 2.0, 10),
+]
+
+
+@dataclass
+class RouteStats:
+    name: str
+    latencies_s: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+    skipped: int = 0
+
+    def record(self, due: float, error: Optional[str] = None) -> None:
+        if error is None:
+            self.latencies_s.append(time.perf_counter() - due)
+        else:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def summary(self, elapsed_s: float) -> Dict[str, Any]:
+        ok = len(self.latencies_s)
+        n_errors = sum(self.errors.values())
+        total = ok + n_errors
+        result: Dict[str, Any] = {
+            "route": self.name,
+            "requests": total,
+            "ok": ok,
+            "errors": n_errors,
+            "error_rate": (n_errors / total) if total else 0.0,
+            "error_kinds": dict(self.errors),
+            "skipped": self.skipped,
+            "throughput_rps": ok / elapsed_s if elapsed_s else 0.0,
+        }
+        if ok:
+            values = np.percentile(self.latencies_s, PERCENTILES)
+            for p, v in zip(PERCENTILES, values):
+                result[f"p{p}_ms"] = float(v) * 1000
+            result["max_ms"] = max(self.latencies_s) * 1000
+        return result
+
+
+# -------------------------------------------------------------------
+# Request scenarios
+# -------------------------------------------------------------------
+
+
+class Scenarios:
+    """
+    One coroutine per route. Each gets the time the request was due and
+    records its own latency / errors.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, quote_ids: List[str]):
+        self.client = client
+        self.rng = rng
+        self.quote_ids = quote_ids
+        self.stats: Dict[str, RouteStats] = {}
+        self._grower_counter = 0
+
+    def stats_for(self, route: str) -> RouteStats:
+        if route not in self.stats:
+            self.stats[route] = RouteStats(route)
+        return self.stats[route]
+
+    async def call(self, route: str, due: float, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        stats = self.stats_for(route)
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            stats.record(due, type(exc).__name__)
+            return None
+        stats.record(due, None if response.status_code < 400 else str(response.status_code))
+        return response
+
+    def pick_order(self, route: str) -> Optional[str]:
+        if not self.quote_ids:
+            self.stats_for(route).skipped += 1
+            return None
+        return self.rng.choice(self.quote_ids)
+
+    # ---------------------------------------------------------------
+
+    async def quote_preview(self, due: float) -> None:
+        program = self.rng.choice(["REMOTE_ONLY", "SPRAYER_PLUS_REMOTE"])
+        fields = [
+            {"field_id": f"f{i}", "name": f"Field {i}", "acres": round(self.rng.uniform(20, 200), 1)}
+            for i in range(self.rng.randint(1, 30))
+        ]
+        for _ in range(PREVIEW_BURST):
+            fields.append({
+                "field_id": f"f{len(fields)}",
+                "name": "",
+                "acres": round(self.rng.uniform(20, 200), 1),
+            })
+            await self.call("quote.preview", due, "POST", "/quote/preview", json={
+                "quote_id": f"q_{int(time.time() * 1000)}",
+                "grower_id": "demo_grower",
+                "program_type": program,
+                "fields": fields,
+            })
+            # The next preview is sent as soon as this one is answered
+            due = time.perf_counter()
+
+    async def checkout_start(self, due: float) -> None:
+        self._grower_counter += 1
+        payload = make_checkout_payload(
+            self.rng, 900_000 + self._grower_counter, self.rng.randint(1, 40)
+        )
+        payload["grower"]["name"] = f"Load{self._grower_counter}"
+        # A fresh key per submission, as the checkout page sends
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        response = await self.call("checkout.start", due, "POST", "/checkout/start", json=payload, headers=headers)
+        if response is not None and response.status_code < 400:
+            self.quote_ids.append(response.json()["quote_id"])
+
+    async def orders_list(self, due: float) -> None:
+        params: Dict[str, Any] = {"limit": orders.ORDERS_PAGE_DEFAULT}
+        if self.rng.random() < 0.2:
+            params["search"] = f"Grower {self.rng.randint(1, 99)}"
+        await self.call("orders.list", due, "GET", "/orders", params=params)
+
+    async def orders_detail(self, due: float) -> None:
+        quote_id = self.pick_order("orders.detail")
+        if quote_id:
+            await self.call("orders.detail", due, "GET", f"/orders/{quote_id}")
+
+    async def orders_status(self, due: float) -> None:
+        quote_id = self.pick_order("orders.status")
+        if quote_id:
+            await self.call("orders.status", due, "POST", f"/orders/{quote_id}/status",
+                            json={"status": self.rng.choice(orders.ALLOWED_STATUSES)})
+
+    async def packet_build(self, due: float) -> None:
+        quote_id = self.pick_order("packet.build")
+        if not quote_id:
+            return
+        stats = self.stats_for("packet.build")
+        try:
+            response = await self.client.post(f"/orders/{quote_id}/onboarding")
+            if response.status_code >= 400:
+                stats.record(due, str(response.status_code))
+                return
+            job_id = response.json()["job_id"]
+            while True:
+                job = (await self.client.get(f"/jobs/{job_id}")).json()
+                if job.get("status") in ("done", "failed"):
+                    break
+                await asyncio.sleep(PACKET_POLL_INTERVAL_S)
+        except (httpx.HTTPError, ValueError, KeyError) as exc:
+            stats.record(due, type(exc).__name__)
+            return
+        stats.record(due, None if job["status"] == "done" else "job_failed")
+
+    async def tiles(self, due: float) -> None:
+        z = self.rng.randint(6, 14)
+        lon = REGION_CENTER[0] + self.rng.uniform(-REGION_DEG, REGION_DEG)
+        lat = REGION_CENTER[1] + self.rng.uniform(-REGION_DEG, REGION_DEG)
+        x, y, _, _ = tile_range((lon, lat, lon, lat), z)
+        await self.call("tiles", due, "GET", f"/tiles/{z}/{x}/{y}.geojson")
+
+    def handler(self, route: str) -> Callable[[float], Awaitable[None]]:
+        return getattr(self, route.replace(".", "_"))
+
+
+# -------------------------------------------------------------------
+# Driver
+# -------------------------------------------------------------------
+
+
+async def drive_route(
+    spec: RouteSpec,
+    handler: Callable[[float], Awaitable[None]],
+    rng: random.Random,
+    deadline: float,
+    in_flight: set,
+) -> None:
+    """
+    Open-loop Poisson arrivals; each arrival waits for one of the route's
+    `concurrency` slots.
+    """
+    slots = asyncio.Semaphore(spec.concurrency)
+
+    async def one(due: float) -> None:
+        async with slots:
+            await handler(due)
+
+    next_due = time.perf_counter() + rng.expovariate(spec.rate)
+    while next_due < deadline:
+        delay = next_due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.ensure_future(one(next_due))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        next_due += rng.expovariate(spec.rate)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    mix: List[RouteSpec],
+    duration_s: float,
+    quote_ids: List[str],
+    seed: int,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    scenarios = Scenarios(client, random.Random(seed + 1), quote_ids)
+    in_flight: set = set()
+
+    start = time.perf_counter()
+    deadline = start + duration_s
+    await asyncio.gather(*(
+        drive_route(spec, scenarios.handler(spec.name), random.Random(rng.random()), deadline, in_flight)
+        for spec in mix if spec.rate > 0
+    ))
+    if in_flight:
+        done, pending = await asyncio.wait(in_flight, timeout=DRAIN_TIMEOUT_S)
+        for task in pending:
+            task.cancel()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed_s": elapsed,
+        "routes": [scenarios.stats_for(spec.name).summary(elapsed) for spec in mix if spec.rate > 0],
+    }
+
+
+async def existing_quote_ids(client: httpx.AsyncClient, limit: int = orders.ORDERS_PAGE_MAX) -> List[str]:
+    response = await client.get("/orders", params={"limit": limit})
+    response.raise_for_status()
+    return [o["quote_id"] for o in response.json()["orders"]]
+
+
+async def run_against_url(url: str, mix: List[RouteSpec], duration_s: float, seed: int) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=sum(s.concurrency for s in mix) + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=REQUEST_TIMEOUT_S, limits=limits) as client:
+        quote_ids = await existing_quote_ids(client)
+        return await run_load(client, mix, duration_s, quote_ids, seed)
+
+
+async def run_in_process(mix: List[RouteSpec], duration_s: float, seed: int) -> Dict[str, Any]:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadgen",
+                                 timeout=REQUEST_TIMEOUT_S) as client:
+        quote_ids = await existing_quote_ids(client)
+        return await run_load(client, mix, duration_s, quote_ids, seed)
+
+
+# -------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------
+
+
+def parse_route_override(value: str) -> tuple:
+    """
+    "name=rate" or "name=rate:concurrency".
+    """
+    try:
+        name, spec = value.split("=", 1)
+        rate, _, concurrency = spec.partition(":")
+        return name, float(rate), int(concurrency) if concurrency else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected name=rate[:concurrency], got {value!r}")
+
+
+def build_mix(overrides: List[tuple], rate_scale: float) -> List[RouteSpec]:
+    mix = {spec.name: RouteSpec(spec.name, spec.rate, spec.concurrency, spec.description)
+           for spec in DEFAULT_MIX}
+    for name, rate, concurrency in overrides:
+        if name not in mix:
+            raise SystemExit(f"Unknown route {name!r}; known: {', '.join(mix)}")
+        mix[name].rate = rate
+        if concurrency:
+            mix[name].concurrency = concurrency
+    for spec in mix.values():
+        spec.rate *= rate_scale
+    return list(mix.values())
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'route':<16}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for r in report["routes"]:
+        print(
+            f"{r['route']:<16}{r['requests']:>7}{r['error_rate'] * 100:>6.1f}%{r['throughput_rps']:>8.2f}"
+            + "".join(f"{r.get(k, float('nan')):>10.1f}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        )
+        if r["error_kinds"]:
+            print(f"{'':<16}errors: {r['error_kinds']}")
+        if r["skipped"]:
+            print(f"{'':<16}skipped {r['skipped']} (no orders to act on)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="drive a running server instead of the app in-process")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_S, help="seconds of load")
+    parser.add_argument("--route", action="append", default=[], type=parse_route_override,
+                        help="override one route: name=rate[:concurrency] (rate 0 disables it)")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="multiply every route's rate")
+    parser.add_argument("--orders", type=int, default=200, help="orders to seed (in-process only)")
+    parser.add_argument("--fields", type=int, default=20, help="fields per seeded order")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="write the report JSON here")
+    args = parser.parse_args(argv)
+
+    mix = build_mix(args.route, args.rate_scale)
+    print("Route mix (arrivals/s, concurrency):")
+    for spec in mix:
+        note = f"  {spec.description}" if spec.description else ""
+        print(f"  {spec.name:<16}{spec.rate:>7.2f}{spec.concurrency:>5}{note}")
+
+    if args.url:
+        print(f"Target: {args.url}, {args.duration:.0f} s")
+        report = asyncio.run(run_against_url(args.url, mix, args.duration, args.seed))
+    else:
+        with temporary_orders_root() as root:
+            t0 = time.perf_counter()
+            populate_orders(root, args.orders, args.fields, seed=args.seed)
+            print(f"Target: in-process app, {args.orders} seeded orders "
+                  f"({time.perf_counter() - t0:.1f} s), {args.duration:.0f} s")
+            report = asyncio.run(run_in_process(mix, args.duration, args.seed))
+
+    report["config"] = {
+        "target": args.url or "in-process",
+        "duration_s": args.duration,
+        "seed": args.seed,
+        "mix": [{"route": s.name, "rate": s.rate, "concurrency": s.concurrency} for s in mix],
+    }
+    print_report(report)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Benchmark suite for the pricing, checkout, listing, detail and packet paths.
+
+Run from backend/:
+
+    python -m benchmarks.suite                          # small scale
+    python -m benchmarks.suite --scale full --output results.json
+    python -m benchmarks.suite --baseline baseline.json # exit 1 on regression
+    python -m benchmarks.suite --only orders. --only checkout.
+
+Each case is timed a few times after one warm-up run; the median is what
+gets compared against a baseline. Results are written as JSON with the
+environment they were measured in, so any run can serve as the next
+baseline (--save-baseline).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models import FieldInput
+from app.packet_cache import MANIFEST_FILENAME
+from app.pricing import calculate_quote
+from app.routers import orders
+
+from .synthetic import (
+    DEFAULT_VERTICES,
+    make_checkout_payload,
+    populate_orders,
+    temporary_orders_root,
+)
+
+SCALES = {
+    "small": {"orders": [100, 1000], "fields": [1, 100]},
+    "medium": {"orders": [100, 1000, 10000], "fields": [1, 100, 1000]},
+    "full": {"orders": [100, 1000, 10000, 100000], "fields": [1, 100, 1000, 10000]},
+}
+# Fields per order for the listing benchmarks (listing cost doesn't depend on it)
+LISTING_FIELDS_PER_ORDER = 5
+DEFAULT_REPEAT = 5
+# Stop repeating a case once it has used this much time
+CASE_TIME_BUDGET_S = 10.0
+DEFAULT_THRESHOLD = 0.25
+
+
+@dataclass
+class Case:
+    name: str
+    params: Dict[str, int]
+    run: Callable[[], Any]
+    before_each: Optional[Callable[[], None]] = None
+
+    @property
+    def key(self) -> str:
+        args = ",".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.name}[{args}]"
+
+
+@dataclass
+class CaseResult:
+    key: str
+    name: str
+    params: Dict[str, int]
+    times_s: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "name": self.name,
+            "params": self.params,
+            "runs": len(self.times_s),
+            "min_s": min(self.times_s),
+            "median_s": statistics.median(self.times_s),
+            "mean_s": statistics.fmean(self.times_s),
+            "max_s": max(self.times_s),
+        }
+
+
+def time_case(case: Case, repeat: int) -> CaseResult:
+    result = CaseResult(case.key, case.name, case.params)
+    spent = 0.0
+    for i in range(repeat + 1):
+        if case.before_each is not None:
+            case.before_each()
+        t0 = time.perf_counter()
+        case.run()
+        elapsed = time.perf_counter() - t0
+        spent += elapsed
+        if i > 0:  # first run is warm-up
+            result.times_s.append(elapsed)
+        elif elapsed * repeat > CASE_TIME_BUDGET_S:
+            # Too slow to repeat: keep the single run
+            result.times_s.append(elapsed)
+            break
+        if spent > CASE_TIME_BUDGET_S and result.times_s:
+            break
+    return result
+
+
+# -------------------------------------------------------------------
+# Cases
+# -------------------------------------------------------------------
+
+
+def pricing_cases(n_fields: int) -> List[Case]:
+    fields = [FieldInput(field_id=str(i), name="", acres=10.0 + i % 90) for i in range(n_fields)]
+    return [Case(
+        "pricing.calculate_quote",
+        {"fields": n_fields},
+        lambda: calculate_quote("q_bench", "grower", "REMOTE_ONLY", fields),
+    )]
+
+
+def field_scale_cases(root: Path, n_fields: int, vertices: int, seed: int) -> List[Case]:
+    """
+    Checkout, detail and packet cases for one order with n_fields fields.
+    """
+    payload = make_checkout_payload(random.Random(seed), 0, n_fields, vertices)
+    counter = {"n": 0}
+    pending: Dict[str, Any] = {}
+
+    def new_request() -> None:
+        counter["n"] += 1
+        request = orders.CheckoutStartRequest(**payload)
+        if orders.AUTHORITATIVE_ACREAGE:
+            orders.apply_geometry_acres(request)
+        pending["request"] = request
+
+    def save() -> None:
+        orders.save_checkout_start(f"q_bench_save_{n_fields}_{counter['n']}", pending["request"])
+
+    quote_id = populate_orders(root, 1, n_fields, vertices, seed=seed)[0]
+    order_dir = orders.order_path(quote_id)
+
+    def reset_packet() -> None:
+        for name in ("onboarding_packet.zip", MANIFEST_FILENAME, "summary.txt"):
+            path = order_dir / name
+            if path.exists():
+                path.unlink()
+
+    params = {"fields": n_fields, "vertices": vertices}
+    return [
+        Case("checkout.save", params, save, before_each=new_request),
+        Case("orders.detail", params, lambda: orders.build_order_detail(quote_id)),
+        Case("packet.build_cold", params, lambda: orders.build_onboarding_packet(quote_id),
+             before_each=reset_packet),
+        Case("packet.build_warm", params, lambda: orders.build_onboarding_packet(quote_id)),
+    ]
+
+
+def listing_cases(root: Path, n_orders: int, seed: int) -> List[Case]:
+    populate_orders(root, n_orders, LISTING_FIELDS_PER_ORDER, seed=seed)
+    params = {"orders": n_orders}
+    return [
+        Case("orders.list_all", params,
+             lambda: [orders.summary_from_row(row) for row in orders.ORDER_INDEX.iter_rows()]),
+        Case("orders.page", params, lambda: orders.build_order_page(limit=orders.ORDERS_PAGE_DEFAULT)),
+        Case("orders.page_search", params,
+             lambda: orders.build_order_page(limit=orders.ORDERS_PAGE_DEFAULT, search="Grower 1")),
+    ]
+
+
+# -------------------------------------------------------------------
+# Running & comparing
+# -------------------------------------------------------------------
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def selected(name: str, only: List[str]) -> bool:
+    return not only or any(name.startswith(prefix) for prefix in only)
+
+
+def run_suite(scale: str, repeat: int, vertices: int, seed: int, only: List[str]) -> List[CaseResult]:
+    results: List[CaseResult] = []
+
+    def run_cases(cases: List[Case]) -> None:
+        for case in cases:
+            if not selected(case.name, only):
+                continue
+            result = time_case(case, repeat)
+            results.append(result)
+            print(f"  {result.key:<55} {statistics.median(result.times_s) * 1000:10.2f} ms"
+                  f"  ({len(result.times_s)} runs)", flush=True)
+
+    for n_fields in SCALES[scale]["fields"]:
+        if selected("pricing.", only):
+            run_cases(pricing_cases(n_fields))
+        if any(selected(p, only) for p in ("checkout.", "orders.detail", "packet.")):
+            with temporary_orders_root() as root:
+                run_cases(field_scale_cases(root, n_fields, vertices, seed))
+
+    if selected("orders.", only):
+        for n_orders in SCALES[scale]["orders"]:
+            with temporary_orders_root() as root:
+                t0 = time.perf_counter()
+                cases = listing_cases(root, n_orders, seed)
+                print(f"  (generated {n_orders} orders in {time.perf_counter() - t0:.1f} s)", flush=True)
+                run_cases(cases)
+
+    return results
+
+
+def compare(results: List[dict], baseline: dict, threshold: float) -> List[dict]:
+    """
+    Per-case median ratio against the baseline; cases slower by more than
+    `threshold` (fraction) are marked as regressions.
+    """
+    base = {r["key"]: r for r in baseline.get("results", [])}
+    rows = []
+    for r in results:
+        b = base.get(r["key"])
+        if b is None or not b["median_s"]:
+            continue
+        ratio = r["median_s"] / b["median_s"]
+        rows.append({
+            "key": r["key"],
+            "baseline_s": b["median_s"],
+            "current_s": r["median_s"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--vertices", type=int, default=DEFAULT_VERTICES, help="vertices per field polygon")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", action="append", default=[], help="run cases whose name starts with this")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="compare against this results JSON")
+    parser.add_argument("--save-baseline", type=Path, help="also copy the results JSON here")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a case counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    print(f"Benchmark suite: scale={args.scale} repeat={args.repeat} vertices={args.vertices}")
+    results = run_suite(args.scale, args.repeat, args.vertices, args.seed, args.only)
+
+    report = {
+        "environment": environment(),
+        "config": {
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "vertices": args.vertices,
+            "seed": args.seed,
+        },
+        "results": [r.to_dict() for r in results],
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with args.baseline.open("r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(report["results"], baseline, args.threshold)
+        report["comparison"] = {"baseline": str(args.baseline), "threshold": args.threshold, "cases": rows}
+
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"  {row['key']:<55} {row['baseline_s'] * 1000:10.2f} -> "
+                  f"{row['current_s'] * 1000:10.2f} ms  x{row['ratio']:.2f} {flag}")
+        if any(row["regression"] for row in rows):
+            exit_code = 1
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nWrote {args.output}")
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Saved baseline {args.save_baseline}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Synthetic orders for benchmarks.
+
+Generates growers with M fields each, as irregular polygons with a
+realistic vertex count, scattered over a farm region. Orders are written
+into a temporary ORDERS_ROOT by the real checkout code; for large order
+counts a handful of template orders are saved that way and then copied
+under new quote IDs, which is much faster and produces the same files.
+
+    with temporary_orders_root() as root:
+        quote_ids = populate_orders(root, n_orders=1000, fields_per_order=20)
+"""
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+import random
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from app.checkout_keys import CheckoutKeys
+from app.order_events import OrderJournal
+from app.order_index import OrderIndex
+from app.routers import orders
+from app.spatial_index import FieldSpatialIndex
+from app.tiles import TileCache
+
+# Central Iowa-ish; fields land within REGION_DEG of it
+REGION_CENTER = (-93.5, 42.0)
+REGION_DEG = 1.5
+DEFAULT_VERTICES = 40
+PROGRAMS = ["REMOTE_ONLY", "SPRAYER_PLUS_REMOTE"]
+# Above this many orders, copy template orders instead of saving each
+MAX_TEMPLATE_ORDERS = 25
+
+
+def make_polygon(rng: random.Random, lon: float, lat: float, vertices: int) -> dict:
+    """
+    Closed, non-self-intersecting ring: a jittered circle of 20-200 acres.
+    """
+    radius_deg = rng.uniform(0.003, 0.008)
+    ring = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius_deg * rng.uniform(0.85, 1.0)
+        ring.append([round(lon + r * math.cos(angle) / math.cos(math.radians(lat)), 7),
+                     round(lat + r * math.sin(angle), 7)])
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def make_checkout_payload(
+    rng: random.Random,
+    grower_index: int,
+    n_fields: int,
+    vertices: int = DEFAULT_VERTICES,
+) -> dict:
+    """
+    A /checkout/start body for one grower, fields clustered around a farm.
+    """
+    farm_lon = REGION_CENTER[0] + rng.uniform(-REGION_DEG, REGION_DEG)
+    farm_lat = REGION_CENTER[1] + rng.uniform(-REGION_DEG, REGION_DEG)
+    spread = 0.02 * math.sqrt(max(1, n_fields))
+
+    fields = []
+    for i in range(n_fields):
+        geometry = make_polygon(
+            rng,
+            farm_lon + rng.uniform(-spread, spread),
+            farm_lat + rng.uniform(-spread, spread),
+            vertices,
+        )
+        acres = round(rng.uniform(20, 200), 2)
+        fields.append({
+            "id": f"field_{i}",
+            "name": f"Field {i}",
+            "acres": acres,
+            "cropProgram": rng.choice(["corn", "soy", "wheat"]),
+            "annualCost": round(acres * 7.5, 2),
+            # Leaflet exports features, so mix both shapes
+            "geometry": (
+                {"type": "Feature", "properties": {}, "geometry": geometry}
+                if i % 2 == 0 else geometry
+            ),
+        })
+
+    return {
+        "grower": {
+            "name": f"Grower {grower_index}",
+            "email": f"grower{grower_index}@example.com",
+            "farmName": f"Farm {grower_index}",
+            "phone": "555-0100",
+            "notes": "",
+            "address1": f"{grower_index} County Rd",
+            "city": "Ames",
+            "state": "IA",
+            "postalCode": "50010",
+        },
+        "program_type": rng.choice(PROGRAMS),
+        "fields": fields,
+    }
+
+
+@contextlib.contextmanager
+def temporary_orders_root(keep: bool = False) -> Iterator[Path]:
+    """
+    Point the orders router (and the indexes built on it) at a fresh
+    temporary folder for the duration of the block.
+    """
+    saved = (orders.ORDERS_ROOT, orders.ORDER_INDEX, orders.FIELD_INDEX, orders.TILE_CACHE,
+             orders.CHECKOUT_KEYS, orders.ORDER_EVENTS)
+    tmp = Path(tempfile.mkdtemp(prefix="terranet-bench-"))
+    root = tmp / "orders"
+    root.mkdir()
+    orders.ORDERS_ROOT = root
+    orders.ORDER_INDEX = OrderIndex(tmp / "orders_index.sqlite3", root)
+    orders.FIELD_INDEX = FieldSpatialIndex(root)
+    orders.TILE_CACHE = TileCache(tmp / "tile_cache")
+    orders.CHECKOUT_KEYS = CheckoutKeys(tmp / "checkout_keys.sqlite3")
+    orders.ORDER_EVENTS = OrderJournal(tmp / "order_events.sqlite3")
+    try:
+        yield root
+    finally:
+        (orders.ORDERS_ROOT, orders.ORDER_INDEX, orders.FIELD_INDEX, orders.TILE_CACHE,
+         orders.CHECKOUT_KEYS, orders.ORDER_EVENTS) = saved
+        if not keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def save_order(quote_id: str, payload: dict) -> None:
+    request = orders.CheckoutStartRequest(**payload)
+    if orders.AUTHORITATIVE_ACREAGE:
+        orders.apply_geometry_acres(request)
+    orders.save_checkout_start(quote_id, request)
+
+
+def clone_order(template_dir: Path, quote_id: str) -> Path:
+    """
+    Copy a saved order under a new quote ID; the CSVs are the only files
+    that mention the quote ID.
+    """
+    target = orders.order_path(quote_id)
+    shutil.copytree(template_dir, target)
+    for name in ("client_info.csv", "fields.csv"):
+        path = target / name
+        if path.exists():
+            path.write_text(
+                path.read_text(encoding="utf-8").replace(template_dir.name, quote_id),
+                encoding="utf-8",
+            )
+    return target
+
+
+def populate_orders(
+    root: Path,
+    n_orders: int,
+    fields_per_order: int,
+    vertices: int = DEFAULT_VERTICES,
+    seed: int = 42,
+    templates: Optional[int] = None,
+) -> List[str]:
+    """
+    Write n_orders synthetic orders into root (the active ORDERS_ROOT) and
+    index them. Creation times are spread over one year, so listings
+    sorted by date see a realistic mix.
+    """
+    rng = random.Random(seed)
+    n_templates = min(n_orders, templates or MAX_TEMPLATE_ORDERS)
+
+    quote_ids = []
+    template_dirs = []
+    for i in range(n_templates):
+        quote_id = f"q_bench_{i:06d}"
+        save_order(quote_id, make_checkout_payload(rng, i, fields_per_order, vertices))
+        template_dirs.append(orders.order_path(quote_id))
+        quote_ids.append(quote_id)
+
+    for i in range(n_templates, n_orders):
+        quote_id = f"q_bench_{i:06d}"
+        clone_order(template_dirs[i % n_templates], quote_id)
+        quote_ids.append(quote_id)
+
+    now = 1_700_000_000
+    for quote_id in quote_ids:
+        ts = now - rng.randint(0, 365 * 86400)
+        os.utime(orders.order_path(quote_id), (ts, ts))
+
+    orders.ORDER_INDEX.reconcile()
+    return quote_ids